@@ -1,6 +1,11 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.db.models import Count
+from django.template.response import TemplateResponse
+from django.utils import timezone
 
-from .models import Project, ProjectImage, Tag
+from .models import Comment, ContactMessage, Profile, Project, ProjectImage, Tag
+from .snapshots import invalidate_project_snapshots
 
 # Register your models here.
 
@@ -28,6 +33,112 @@ class TagAdmin(admin.ModelAdmin):
     search_fields = ("name",)
 
 
+class CommentAdmin(admin.ModelAdmin):
+    list_display = ("short_content", "project", "author", "state", "created_at")
+    list_select_related = ("project", "user")  # No query per row.
+    list_filter = ("state", "created_at", "project")
+    date_hierarchy = "created_at"
+    search_fields = ("content", "author_name", "author_email", "user__username")
+    raw_id_fields = ("project", "user")  # No giant <select> on the edit form.
+    ordering = ("-created_at",)
+    list_per_page = 50
+    show_full_result_count = False  # Skip the extra COUNT(*) when filtering.
+    actions = ["hide_comments", "restore_comments", "delete_comments"]
+
+    @admin.display(description="Comment")
+    def short_content(self, obj):
+        return obj.content[:80]
+
+    @admin.display(description="Author")
+    def author(self, obj):
+        return obj.user or obj.author_name or obj.author_email or "Anon"
+
+    def get_actions(self, request):
+        # Replaced by delete_comments: the stock action's confirmation page
+        # lists every selected comment with its related objects.
+        actions = super().get_actions(request)
+        actions.pop("delete_selected", None)
+        return actions
+
+    def _set_state(self, request, queryset, state):
+        # One UPDATE for the whole selection; it sends no post_save, so drop
+        # the affected project snapshots here.
+        invalidate_project_snapshots(queryset.values_list("project_id", flat=True))
+        updated = queryset.update(state=state, updated_at=timezone.now())
+        self.message_user(
+            request, f"Marked {updated} comments as {state}.", messages.SUCCESS
+        )
+
+    @admin.action(description="Hide selected comments", permissions=["change"])
+    def hide_comments(self, request, queryset):
+        self._set_state(request, queryset, Comment.State.HIDDEN)
+
+    @admin.action(description="Restore selected comments", permissions=["change"])
+    def restore_comments(self, request, queryset):
+        self._set_state(request, queryset, Comment.State.VISIBLE)
+
+    @admin.action(
+        description="Permanently delete selected comments", permissions=["delete"]
+    )
+    def delete_comments(self, request, queryset):
+        # Confirm first, as delete_selected does, but show counts per project
+        if request.POST.get("post") == "yes":
+            # queryset.delete() would load every row to send post_delete;
+            # nothing references comments, so one DELETE does, and the
+            # snapshots the receiver would have dropped go here instead.
+            invalidate_project_snapshots(queryset.values_list("project_id", flat=True))
+            deleted = queryset.order_by()._raw_delete(queryset.db)
+            self.message_user(request, f"Deleted {deleted} comments.", messages.SUCCESS)
+            return None
+
+        per_project = (
+            queryset.values("project__title").annotate(n=Count("pk")).order_by("-n")
+        )
+        context = {
+            **self.admin_site.each_context(request),
+            "title": "Are you sure?",
+            "opts": self.model._meta,
+            "count": sum(row["n"] for row in per_project),
+            "per_project": per_project,
+            "action_checkbox_name": ACTION_CHECKBOX_NAME,
+            "selected": request.POST.getlist(ACTION_CHECKBOX_NAME),
+            "select_across": request.POST.get("select_across", "0"),
+        }
+        return TemplateResponse(
+            request, "admin/main/comment/delete_comments_confirmation.html", context
+        )
+
+
+class ProfileAdmin(admin.ModelAdmin):
+    list_display = ("user", "display_name", "joined_at")
+    list_select_related = ("user",)
+    search_fields = ("display_name", "user__username", "user__email")
+    raw_id_fields = ("user",)
+
+
+class ContactMessageAdmin(admin.ModelAdmin):
+    list_display = ("subject", "email", "status", "attempts", "created_at")
+    list_filter = ("status", "created_at")
+    search_fields = ("subject", "email", "name", "message")
+    readonly_fields = ("content_hash", "created_at", "sent_at", "last_error")
+    ordering = ("-created_at",)
+    actions = ["retry_messages"]
+
+    @admin.action(description="Queue selected messages again", permissions=["change"])
+    def retry_messages(self, request, queryset):
+        updated = queryset.exclude(status=ContactMessage.Status.SENT).update(
+            status=ContactMessage.Status.PENDING,
+            attempts=0,
+            next_attempt_at=timezone.now(),
+        )
+        self.message_user(
+            request, f"Queued {updated} messages for delivery.", messages.SUCCESS
+        )
+
+
 admin.site.register(Tag, TagAdmin)
 admin.site.register(Project, ProjectAdmin)
 admin.site.register(ProjectImage)
+admin.site.register(Comment, CommentAdmin)
+admin.site.register(Profile, ProfileAdmin)
+admin.site.register(ContactMessage, ContactMessageAdmin)
@@ -0,0 +1,195 @@
+"""
+Read-only JSON API (v1) for projects, tags, images and comments.
+
+Every endpoint uses `.values()` queries (no model instances), supports
+conditional GETs through an ETag over the response body, and is gzipped
+for clients that accept it.
+"""
+
+import hashlib
+import json
+from functools import wraps
+
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET
+
+from .models import Comment, Project, ProjectImage, Tag
+
+PROJECT_FIELDS = ("id", "title", "description", "link", "github_url")
+COMMENTS_PAGE_SIZE = 20
+PROJECTS_PAGE_SIZE = 50
+
+
+def api_view(view):
+    """
+    GET-only, gzipped JSON endpoint; `view` returns the payload dict.
+    """
+
+    @require_GET
+    @gzip_page
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        payload = view(request, *args, **kwargs)
+        if isinstance(payload, HttpResponse):
+            return payload
+
+        body = json.dumps(payload, cls=DjangoJSONEncoder, separators=(",", ":"))
+        etag = '"%s"' % hashlib.md5(body.encode()).hexdigest()
+
+        response = HttpResponse(body, content_type="application/json")
+        response["ETag"] = etag
+        response["Cache-Control"] = "no-cache"  # always revalidate via ETag
+        return get_conditional_response(request, etag=etag, response=response)
+
+    return wrapper
+
+
+def _error(message, status):
+    return JsonResponse({"error": message}, status=status)
+
+
+def _selected_fields(request, allowed):
+    """
+    Parse `?fields=a,b` against `allowed`; `id` is always included.
+    Returns None if an unknown field was requested.
+    """
+    requested = [f for f in request.GET.get("fields", "").split(",") if f]
+    if not requested:
+        return list(allowed)
+    if set(requested) - set(allowed):
+        return None
+    return ["id"] + [f for f in requested if f != "id"]
+
+
+def _page_info(page):
+    return {
+        "page": page.number,
+        "num_pages": page.paginator.num_pages,
+        "count": page.paginator.count,
+        "has_next": page.has_next(),
+    }
+
+
+def _tags_by_project(project_ids):
+    rows = (
+        Project.tags.through.objects.filter(project_id__in=project_ids)
+        .order_by("tag__name")
+        .values_list("project_id", "tag__name")
+    )
+    tags = {}
+    for project_id, name in rows:
+        tags.setdefault(project_id, []).append(name)
+    return tags
+
+
+def _image_urls(project_id):
+    storage = ProjectImage._meta.get_field("image").storage
+    names = ProjectImage.objects.filter(project_id=project_id).order_by("pk")
+    return [storage.url(name) for name in names.values_list("image", flat=True)]
+
+
+@api_view
+def projects(request):
+    """
+    Paginated project list. Query params: `fields`, `page`.
+    """
+    fields = _selected_fields(request, PROJECT_FIELDS + ("tags",))
+    if fields is None:
+        return _error("Unknown field requested.", 400)
+    columns = [f for f in fields if f != "tags"]
+
+    paginator = Paginator(
+        Project.objects.order_by("title", "pk").values(*columns), PROJECTS_PAGE_SIZE
+    )
+    page = paginator.get_page(request.GET.get("page"))
+    results = list(page.object_list)
+
+    if "tags" in fields:
+        tags = _tags_by_project([p["id"] for p in results])
+        for p in results:
+            p["tags"] = tags.get(p["id"], [])
+
+    return {"results": results, **_page_info(page)}
+
+
+@api_view
+def project_detail(request, id):
+    """
+    A single project with its tag names and image URLs.
+    """
+    project = Project.objects.filter(pk=id).values(*PROJECT_FIELDS).first()
+    if project is None:
+        return _error("Project not found.", 404)
+
+    project["tags"] = _tags_by_project([id]).get(id, [])
+    project["images"] = _image_urls(id)
+    return project
+
+
+@api_view
+def tags(request):
+    """
+    All tags, ordered by name.
+    """
+    return {"results": list(Tag.objects.order_by("name").values("id", "name"))}
+
+
+def _comment_rows(queryset, *extra_fields):
+    return queryset.order_by("-created_at").values(
+        "id", "content", "created_at", "author_name", "user__username", *extra_fields
+    )
+
+
+def _comment_payload(c):
+    return {
+        "id": c["id"],
+        "author": c["user__username"] or c["author_name"] or "Anon",
+        "content": c["content"],
+        "created_at": c["created_at"],
+    }
+
+
+@api_view
+def project_comments(request, id):
+    """
+    Paginated comments for a project, newest first. Query param: `page`.
+    """
+    if not Project.objects.filter(pk=id).exists():
+        return _error("Project not found.", 404)
+
+    rows = _comment_rows(Comment.objects.filter(project_id=id))
+    page = Paginator(rows, COMMENTS_PAGE_SIZE).get_page(request.GET.get("page"))
+
+    results = [_comment_payload(c) for c in page.object_list]
+    return {"results": results, **_page_info(page)}
+
+
+@api_view
+def my_comments(request):
+    """
+    The signed-in viewer's own comments across projects, newest first.
+    Served by the (author_key, -created_at) index for sheet/session users.
+    """
+    viewer = request.viewer
+    if not viewer.can_comment:
+        return _error("Sign in required.", 403)
+
+    rows = _comment_rows(
+        viewer.authored_comments(Comment.objects.all()),
+        "project_id",
+        "project__title",
+    )
+    page = Paginator(rows, COMMENTS_PAGE_SIZE).get_page(request.GET.get("page"))
+
+    results = [
+        {
+            **_comment_payload(c),
+            "project": {"id": c["project_id"], "title": c["project__title"]},
+        }
+        for c in page.object_list
+    ]
+    return {"results": results, **_page_info(page)}
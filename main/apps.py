@@ -8,3 +8,4 @@ class MainConfig(AppConfig):
 
     def ready(self):
         import main.signals  # noqa: F401
+        import main.slow_queries  # noqa: F401
@@ -0,0 +1,305 @@
+"""
+Per-page CSS/JS bundles, built during collectstatic.
+
+`BUNDLES` maps a bundle name (a path under STATIC_ROOT) to the static files
+it concatenates, in order. main.storage.BundledManifestStaticFilesStorage
+writes every bundle before files are hashed and compressed, and the
+`{% bundle %}` tag (main.templatetags.assets) links to it with an SRI hash,
+or to the individual source files when bundling is off (DEBUG).
+
+While building:
+- CSS and JS are minified (rcssmin / rjsmin)
+- relative url()s in CSS are rebased onto the bundle's directory
+- sources in PRUNED_SOURCES lose every rule whose class/id selectors never
+  appear in the templates or scripts
+
+`CRITICAL_CSS` describes the above-the-fold styles inlined per page by
+`{% critical_css %}`: the rules of a page's bundles that match the markup
+before FOLD_MARKER in its templates. With critical CSS inlined, the full
+stylesheets load without blocking first render.
+"""
+
+import posixpath
+import re
+from pathlib import Path
+
+import rcssmin
+import rjsmin
+from django.conf import settings
+from django.template.loader import get_template
+from django.template.utils import get_app_template_dirs
+
+BUNDLES = {
+    "bundles/base.css": (
+        "vendor/fontawesome/css/all.min.css",
+        "vendor/bootstrap/css/bootstrap.min.css",
+        "css/main.css",
+    ),
+    "bundles/home.css": ("css/home.css", "css/project.css"),
+    "bundles/my_work.css": ("css/project.css", "css/my_work.css"),
+    "bundles/contact.css": ("css/contact.css",),
+    "bundles/auth_login.css": ("css/contact.css", "css/home.css"),
+    "bundles/home.js": ("javascript/home.js",),
+    "bundles/project.js": ("javascript/project.js",),
+}
+
+# Critical CSS name -> (templates, bundles it is extracted from)
+CRITICAL_CSS = {
+    "critical/home.css": (
+        ("base.html", "index.html"),
+        ("bundles/base.css", "bundles/home.css"),
+    ),
+    "critical/my_work.css": (
+        ("base.html", "my_work.html"),
+        ("bundles/base.css", "bundles/my_work.css"),
+    ),
+    "critical/project.css": (
+        ("project.html",),
+        ("bundles/base.css", "bundles/home.css"),
+    ),
+    "critical/contact.css": (
+        ("base.html", "contact.html"),
+        ("bundles/base.css", "bundles/contact.css"),
+    ),
+}
+
+# Markup after this comment in a template is ignored for critical CSS
+FOLD_MARKER = "{# below the fold #}"
+
+# Web fonts preloaded by {% resource_hints %} (static paths). Empty while the
+# site renders text in system fonts and uses no icon glyphs.
+PRELOAD_FONTS = ()
+
+# Third-party stylesheets trimmed down to the selectors the site uses
+PRUNED_SOURCES = {
+    "vendor/fontawesome/css/all.min.css",
+    "vendor/bootstrap/css/bootstrap.min.css",
+}
+
+# Scripts (besides bundled ones) that add classes at runtime
+CONTENT_SOURCES = ("vendor/bootstrap/js/bootstrap.bundle.min.js",)
+
+# Classes only produced by Python (message level tags)
+SAFELIST = {"debug", "info", "success", "warning", "error"}
+
+WORD_RE = re.compile(r"[\w-]+")
+# `alert-{{ message.tags }}` keeps every class starting with "alert-"
+INTERPOLATED_PREFIX_RE = re.compile(r"([\w-]+-)\{\{")
+SELECTOR_TOKEN_RE = re.compile(r"[.#](-?[_a-zA-Z][\w-]*)")
+TYPE_SELECTOR_RE = re.compile(r"(?<![\w.#:-])([a-zA-Z][\w-]*)")
+FUNCTIONAL_PSEUDO_RE = re.compile(r":[\w-]+\([^()]*\)")
+ATTRIBUTE_RE = re.compile(r"\[[^\]]*\]")
+ATTRIBUTE_NAME_RE = re.compile(r"\[\s*([\w-]+)")
+URL_RE = re.compile(r"url\(\s*(['\"]?)([^'\")]+)\1\s*\)")
+URL_SUFFIX_RE = re.compile(r"([^?#]*)(.*)")
+ABSOLUTE_URL_RE = re.compile(r"^(?:[a-z][a-z0-9+.-]*:|/|#)", re.I)
+GROUPING_AT_RULES = ("@media", "@supports", "@layer", "@container")
+
+
+def bundles_enabled():
+    return getattr(settings, "ASSET_BUNDLES", not settings.DEBUG)
+
+
+def template_files():
+    dirs = [Path(d) for engine in settings.TEMPLATES for d in engine.get("DIRS", [])]
+    dirs += [Path(d) for d in get_app_template_dirs("templates")]
+    for directory in dirs:
+        yield from directory.rglob("*.html")
+
+
+class UsedSelectors:
+    """
+    Every word found in the templates and scripts, used to decide whether a
+    class/id selector can match anything the site renders.
+    """
+
+    def __init__(self, texts, match_elements=False):
+        self.match_elements = match_elements
+        self.words = set(SAFELIST)
+        prefixes = set()
+        for text in texts:
+            self.words.update(WORD_RE.findall(text))
+            prefixes.update(INTERPOLATED_PREFIX_RE.findall(text))
+        self.prefixes = tuple(prefixes)
+
+    def __contains__(self, token):
+        return token in self.words or token.startswith(self.prefixes)
+
+    def matches(self, selector):
+        """
+        False only if `selector` needs a class or id nobody uses (with
+        `match_elements`, also an element or attribute name). Attribute
+        values and functional pseudo-classes (:not(), :has()) are ignored,
+        which errs on the side of keeping rules.
+        """
+        attributes = ATTRIBUTE_NAME_RE.findall(selector)
+        selector = ATTRIBUTE_RE.sub("", selector)
+        previous = None
+        while previous != selector:
+            previous, selector = selector, FUNCTIONAL_PSEUDO_RE.sub("", selector)
+        tokens = SELECTOR_TOKEN_RE.findall(selector)
+        if self.match_elements:
+            tokens += [t.lower() for t in TYPE_SELECTOR_RE.findall(selector)]
+            tokens += attributes
+        return all(token in self for token in tokens)
+
+
+def _block_end(css, i):
+    """
+    Index just past the brace matching the "{" at `i`, skipping strings.
+    """
+    depth, quote = 0, None
+    while i < len(css):
+        c = css[i]
+        if quote:
+            if c == "\\":
+                i += 1
+            elif c == quote:
+                quote = None
+        elif c in "\"'":
+            quote = c
+        elif c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return i
+
+
+def _rules(css):
+    """
+    Yield (prelude, body) for each top-level rule of minified CSS; body is
+    None for statements such as @charset/@import.
+    """
+    i, start, quote = 0, 0, None
+    while i < len(css):
+        c = css[i]
+        if quote:
+            if c == "\\":
+                i += 1
+            elif c == quote:
+                quote = None
+        elif c in "\"'":
+            quote = c
+        elif c == ";":
+            yield css[start:i].strip(), None
+            start = i + 1
+        elif c == "{":
+            end = _block_end(css, i)
+            yield css[start:i].strip(), css[i + 1 : end - 1]
+            i = start = end
+            continue
+        i += 1
+
+
+def prune_css(css, used, critical=False):
+    """
+    Drop rules from minified `css` that `used` says cannot match. In
+    `critical` mode (CSS inlined into the page) @font-face/@keyframes and
+    rules with relative url()s are dropped too; the full stylesheet that
+    follows provides them.
+    """
+    out = []
+    for prelude, body in _rules(css):
+        if body is None:
+            if not critical:
+                out.append(prelude + ";")
+        elif prelude.startswith(GROUPING_AT_RULES):
+            inner = prune_css(body, used, critical)
+            if inner:
+                out.append(f"{prelude}{{{inner}}}")
+        elif prelude.startswith("@"):
+            if not critical:
+                out.append(f"{prelude}{{{body}}}")  # @font-face, @keyframes, ...
+        elif critical and _has_relative_url(body):
+            continue
+        else:
+            selectors = _split_selectors(prelude)
+            kept = [s for s in selectors if used.matches(s)]
+            if kept:
+                out.append(f"{','.join(kept)}{{{body}}}")
+    return "".join(out)
+
+
+def _split_selectors(prelude):
+    parts, depth, start = [], 0, 0
+    for i, c in enumerate(prelude):
+        if c in "([":
+            depth += 1
+        elif c in ")]":
+            depth -= 1
+        elif c == "," and depth == 0:
+            parts.append(prelude[start:i])
+            start = i + 1
+    parts.append(prelude[start:])
+    return parts
+
+
+def _has_relative_url(css):
+    return any(not ABSOLUTE_URL_RE.match(url.strip()) for _, url in URL_RE.findall(css))
+
+
+def rebase_urls(css, source, bundle):
+    """
+    Rewrite relative url()s in `source` so they resolve from `bundle`.
+    """
+
+    def rebase(match):
+        url = match.group(2).strip()
+        if ABSOLUTE_URL_RE.match(url):
+            return match.group(0)
+        path, suffix = URL_SUFFIX_RE.match(url).groups()  # keep ?query / #hash
+        target = posixpath.normpath(posixpath.join(posixpath.dirname(source), path))
+        rebased = posixpath.relpath(target, posixpath.dirname(bundle))
+        return f'url("{rebased}{suffix}")'
+
+    return URL_RE.sub(rebase, css)
+
+
+def build_bundle(name, read, used=None):
+    """
+    Concatenate and minify the sources of bundle `name`; `read(path)` returns
+    a static file's text.
+    """
+    if name.endswith(".css"):
+        parts = []
+        for source in BUNDLES[name]:
+            css = rcssmin.cssmin(rebase_urls(read(source), source, name))
+            if used is not None and source in PRUNED_SOURCES:
+                css = prune_css(css, used)
+            parts.append(css)
+        return "\n".join(parts)
+    return ";\n".join(rjsmin.jsmin(read(source)) for source in BUNDLES[name])
+
+
+def build_bundles(read):
+    """
+    Build every bundle in BUNDLES, pruning against the current templates.
+    """
+    scripts = {s for n, srcs in BUNDLES.items() if n.endswith(".js") for s in srcs}
+    texts = [path.read_text(encoding="utf-8") for path in template_files()]
+    texts += [read(source) for source in sorted(scripts) + list(CONTENT_SOURCES)]
+    used = UsedSelectors(texts)
+    return {name: build_bundle(name, read, used) for name in BUNDLES}
+
+
+def above_the_fold(template_name):
+    source = get_template(template_name).template.source
+    return source.split(FOLD_MARKER, 1)[0]
+
+
+def build_critical_css(bundles):
+    """
+    Critical CSS for every page in CRITICAL_CSS, extracted from the built
+    `bundles` (name -> CSS).
+    """
+    critical = {}
+    for name, (templates, bundle_names) in CRITICAL_CSS.items():
+        used = UsedSelectors(
+            [above_the_fold(t) for t in templates], match_elements=True
+        )
+        css = "".join(bundles[b] for b in bundle_names)
+        critical[name] = prune_css(css, used, critical=True)
+    return critical
@@ -0,0 +1,221 @@
+"""
+Small timing helpers shared by the benchmark management commands.
+"""
+
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from html.parser import HTMLParser
+
+from django.db import transaction
+from django.test import Client
+
+
+class _Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back():
+    """
+    Run the block in a transaction that is always rolled back, so
+    benchmarks can seed data against the configured database safely.
+    """
+    try:
+        with transaction.atomic():
+            yield
+            raise _Rollback
+    except _Rollback:
+        pass
+
+
+def benchmark_client():
+    """
+    A test Client whose Host header passes ALLOWED_HOSTS outside the test
+    runner (which is what adds "testserver").
+    """
+    return Client(HTTP_HOST="localhost")
+
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile of `values` (pct in 0-100).
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies):
+    """
+    Summary of latencies given in seconds, reported in milliseconds.
+    """
+    ms = [v * 1000 for v in latencies]
+    return {
+        "count": len(ms),
+        "mean_ms": sum(ms) / len(ms) if ms else 0.0,
+        "p50_ms": percentile(ms, 50),
+        "p95_ms": percentile(ms, 95),
+        "max_ms": max(ms, default=0.0),
+    }
+
+
+def time_calls(fn, n):
+    """
+    Call `fn()` n times; return the list of durations in seconds.
+    """
+    durations = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+# Upper bounds (ms) of the latency histogram buckets; the last is open
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+def histogram(latencies, edges=LATENCY_BUCKETS_MS):
+    """
+    Counts of latencies (seconds) per bucket: <= edges[0], ..., > edges[-1].
+    """
+    counts = [0] * (len(edges) + 1)
+    for value in latencies:
+        ms = value * 1000
+        counts[next((i for i, edge in enumerate(edges) if ms <= edge), len(edges))] += 1
+    return counts
+
+
+def format_summary(label, summary):
+    return (
+        f"{label:<24} n={summary['count']:<5} "
+        f"mean={summary['mean_ms']:.2f}ms p50={summary['p50_ms']:.2f}ms "
+        f"p95={summary['p95_ms']:.2f}ms max={summary['max_ms']:.2f}ms"
+    )
+
+
+# Worker boot, as timed by profile_startup(): importing the ASGI app and
+# loading the URLconf (and so main.views), which the first request does.
+STARTUP_SCRIPT = """
+import json, os, sys, time
+start = time.perf_counter()
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "portfolio.settings")
+import {target}
+from django.urls import get_resolver
+get_resolver().url_patterns
+boot_ms = (time.perf_counter() - start) * 1000
+print(json.dumps({{"boot_ms": boot_ms, "modules": sorted(sys.modules)}}))
+"""
+
+# Packages only the sheet-auth views use (main.sheets imports them lazily)
+STARTUP_LAZY_MODULES = ("gspread", "google.auth", "google.oauth2", "requests")
+
+# Boot time allowed by the test suite; generous, since CI machines vary
+STARTUP_BUDGET_MS = 2000
+
+
+def parse_importtime(stderr):
+    """
+    [(module, self_us, cumulative_us)] from `python -X importtime` output.
+    """
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        if self_us.strip().isdigit():
+            imports.append((name.strip(), int(self_us), int(cumulative_us)))
+    return imports
+
+
+def profile_startup(target="portfolio.wsgi"):
+    """
+    Boot `target` in a fresh interpreter. Returns boot_ms, the per-module
+    `imports` (see parse_importtime) and the set of loaded `modules`.
+    """
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            STARTUP_SCRIPT.format(target=target),
+        ],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+        check=True,
+    )
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    return {
+        "boot_ms": report["boot_ms"],
+        "imports": parse_importtime(result.stderr),
+        "modules": set(report["modules"]),
+    }
+
+
+def lazy_modules_loaded(modules):
+    """
+    The STARTUP_LAZY_MODULES (or their submodules) present in `modules`.
+    """
+    return sorted(
+        name
+        for name in STARTUP_LAZY_MODULES
+        if any(m == name or m.startswith(name + ".") for m in modules)
+    )
+
+
+class _BlockingResourceParser(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.urls = []
+        self.inline_bytes = 0
+        self._in_head = False
+        self._in_noscript = False
+        self._in_style = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "head":
+            self._in_head = True
+        elif tag == "noscript":
+            self._in_noscript = True
+        elif tag == "style":
+            self._in_style = True
+        elif self._in_noscript:
+            return
+        elif tag == "link" and attrs.get("rel") == "stylesheet":
+            if attrs.get("media", "all") != "print":
+                self.urls.append(attrs["href"])
+        elif tag == "script" and self._in_head and "src" in attrs:
+            if "defer" not in attrs and "async" not in attrs:
+                self.urls.append(attrs["src"])
+
+    def handle_endtag(self, tag):
+        if tag == "head":
+            self._in_head = False
+        elif tag == "noscript":
+            self._in_noscript = False
+        elif tag == "style":
+            self._in_style = False
+
+    def handle_data(self, data):
+        if self._in_style:
+            self.inline_bytes += len(data.encode())
+
+
+def render_blocking_resources(html):
+    """
+    (urls, inline_bytes) for a page: stylesheets not loaded with
+    media="print", synchronous <head> scripts, and bytes of inline <style>.
+    """
+    parser = _BlockingResourceParser()
+    parser.feed(html)
+    return parser.urls, parser.inline_bytes
@@ -0,0 +1,234 @@
+"""
+Brotli/gzip compression of dynamic responses (static files are
+precompressed by WhiteNoise), used by main.middleware.CompressionMiddleware.
+
+- only compressible types (COMPRESSIBLE_TYPES) of at least
+  COMPRESSION_MIN_BYTES; event streams are left alone so events are not
+  held in a compressor buffer
+- Brotli when the client accepts it (and the package is installed), else
+  gzip, each with per-chunk flushing for streaming responses
+- BREACH: with COMPRESSION_EXCLUDE_CSRF on (the default), responses that
+  carry a CSRF form field are sent uncompressed, since they mix a secret
+  with markup an attacker may influence. Django masks tokens per response,
+  so sites that accept that mitigation can turn the exclusion off. A
+  streamed HTML body can't be checked before it is sent, so it stays
+  uncompressed unless the view sets `response.has_csrf_field = False`
+  (views.project does for signed-out visitors, whose page has no form;
+  signed-in visitors get the streamed project page uncompressed).
+
+Bytes in/out and skip reasons are counted per worker and added to cache
+counters with `cache.incr` every STATS_FLUSH_SECONDS; `stats()` reads the
+totals (staff JSON at /_metrics/). They cover every worker with the shared
+Redis cache, only the worker answering with the local-memory fallback.
+"""
+
+import gzip
+import io
+import re
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "text/html",
+    "text/plain",
+    "text/css",
+    "application/json",
+    "application/javascript",
+    "image/svg+xml",
+)
+CSRF_FIELD = b'name="csrfmiddlewaretoken"'
+ACCEPT_RE = re.compile(r"\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([\d.]+))?\s*")
+
+# Random bytes in the gzip header, as django.middleware.gzip does
+GZIP_MAX_RANDOM_BYTES = 100
+
+STATS_KEY = "compression:{}"
+STATS_FIELDS = (
+    "compressed_br",
+    "compressed_gzip",
+    "bytes_in",
+    "bytes_out",
+    "skipped_small",
+    "skipped_csrf",
+)
+STATS_FLUSH_SECONDS = 10
+
+
+def accepted_encodings(header):
+    """
+    Encodings in an Accept-Encoding header that are not refused with q=0.
+    """
+    accepted = set()
+    for part in header.lower().split(","):
+        match = ACCEPT_RE.fullmatch(part)
+        if not match:
+            continue
+        name, q = match.groups()
+        try:
+            if q is None or float(q) > 0:
+                accepted.add(name)
+        except ValueError:
+            continue
+    return accepted
+
+
+def choose_encoding(header):
+    accepted = accepted_encodings(header)
+    if brotli is not None and ({"br", "*"} & accepted):
+        return "br"
+    if {"gzip", "*"} & accepted:
+        return "gzip"
+    return None
+
+
+def is_compressible(content_type):
+    return content_type.split(";", 1)[0].strip().lower() in COMPRESSIBLE_TYPES
+
+
+def compress(content, encoding):
+    if encoding == "br":
+        quality = getattr(settings, "COMPRESSION_BROTLI_QUALITY", 4)
+        return brotli.compress(content, quality=quality, mode=brotli.MODE_TEXT)
+    return compress_string(content, max_random_bytes=GZIP_MAX_RANDOM_BYTES)
+
+
+def stream_compressor(encoding):
+    """
+    An object with process(chunk)/flush()/finish() returning compressed
+    bytes, for streaming responses.
+    """
+    if encoding == "br":
+        return brotli.Compressor(
+            quality=getattr(settings, "COMPRESSION_BROTLI_QUALITY", 4),
+            mode=brotli.MODE_TEXT,
+        )
+    return GzipStream()
+
+
+def compress_chunks(chunks, encoding, on_chunk):
+    """
+    Compress an iterable of byte chunks, flushing after each so streamed
+    HTML reaches the browser as it is produced. `on_chunk(raw, sent)`
+    counts bytes.
+    """
+    compressor = stream_compressor(encoding)
+    for chunk in chunks:
+        out = compressor.process(chunk) + compressor.flush()
+        on_chunk(len(chunk), len(out))
+        yield out
+    tail = compressor.finish()
+    on_chunk(0, len(tail))
+    yield tail
+
+
+async def acompress_chunks(chunks, encoding, on_chunk):
+    """
+    compress_chunks for async iterators (ASGI streaming responses).
+    """
+    compressor = stream_compressor(encoding)
+    async for chunk in chunks:
+        out = compressor.process(chunk) + compressor.flush()
+        on_chunk(len(chunk), len(out))
+        yield out
+    tail = compressor.finish()
+    on_chunk(0, len(tail))
+    yield tail
+
+
+class GzipStream:
+    """
+    brotli.Compressor's interface over a gzip stream.
+    """
+
+    def __init__(self):
+        self._buffer = io.BytesIO()
+        self._file = gzip.GzipFile(mode="wb", fileobj=self._buffer, mtime=0)
+
+    def _take(self):
+        data = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+    def process(self, chunk):
+        self._file.write(chunk)
+        return self._take()
+
+    def flush(self):
+        self._file.flush()  # Z_SYNC_FLUSH: everything so far is decodable
+        return self._take()
+
+    def finish(self):
+        self._file.close()
+        return self._take()
+
+
+class _Stats:
+    """
+    Per-worker counters, added to the cache every STATS_FLUSH_SECONDS.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._flushed_at = time.monotonic()
+
+    def add(self, **counts):
+        with self._lock:
+            self._counts.update(counts)
+            if time.monotonic() - self._flushed_at < STATS_FLUSH_SECONDS:
+                return
+            pending, self._counts = self._counts, Counter()
+            self._flushed_at = time.monotonic()
+        self._merge(pending)
+
+    def flush(self):
+        with self._lock:
+            pending, self._counts = self._counts, Counter()
+            self._flushed_at = time.monotonic()
+        self._merge(pending)
+
+    @staticmethod
+    def _merge(pending):
+        # incr is atomic, so workers flushing at once don't lose counts
+        for name, count in pending.items():
+            key = STATS_KEY.format(name)
+            cache.add(key, 0, timeout=None)
+            cache.incr(key, count)
+
+
+_stats = _Stats()
+record = _stats.add
+
+
+def stats():
+    """
+    Totals across workers sharing the cache: responses compressed per
+    encoding, bytes before and after, bytes saved, and responses skipped
+    per reason.
+    """
+    _stats.flush()
+    keys = {STATS_KEY.format(name): name for name in STATS_FIELDS}
+    totals = dict.fromkeys(STATS_FIELDS, 0)
+    totals.update({keys[k]: v for k, v in cache.get_many(keys).items()})
+    bytes_in, bytes_out = totals["bytes_in"], totals["bytes_out"]
+    return {
+        **totals,
+        "bytes_saved": bytes_in - bytes_out,
+        "ratio": round(bytes_out / bytes_in, 3) if bytes_in else None,
+    }
+
+
+def reset_stats():
+    _stats.flush()
+    cache.delete_many([STATS_KEY.format(name) for name in STATS_FIELDS])
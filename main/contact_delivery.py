@@ -0,0 +1,197 @@
+"""
+Queued delivery of contact-form messages.
+
+`views.contact` stores each submission with a single INSERT and returns;
+the `deliver_contact_messages` worker (Procfile `worker`) sends them later:
+
+- due messages are claimed in batches with SELECT ... FOR UPDATE SKIP
+  LOCKED (on backends that support it), so several workers never send the
+  same message, and leased for CONTACT_DELIVERY_LEASE seconds while sent
+- one batch goes out over one mail connection
+- failures are retried with exponential backoff, up to `max_attempts`
+- resubmitting the same sender + subject + message within
+  CONTACT_DEDUP_WINDOW seconds is ignored on insert
+- a sender gets at most CONTACT_SENDER_LIMIT messages delivered per
+  CONTACT_SENDER_WINDOW seconds; the rest wait for the window to pass
+
+The transport is pluggable through `settings.CONTACT_DELIVERY_BACKEND`
+(dotted path to a class with `send_batch(messages)` returning
+{pk: error or None}); the default emails CONTACT_RECIPIENTS.
+"""
+
+import hashlib
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import ContactMessage
+
+DEFAULT_BACKEND = "main.contact_delivery.EmailDelivery"
+
+
+def content_hash(email, subject, message, at=None):
+    """
+    Hash of the sender, subject, message and the CONTACT_DEDUP_WINDOW
+    period `at` (default now) falls in, so the unique column only drops
+    repeats sent close together.
+    """
+    window = getattr(settings, "CONTACT_DEDUP_WINDOW", 3600)
+    period = int((at or timezone.now()).timestamp() // window)
+    raw = "\x1f".join(
+        (email.strip().lower(), subject.strip(), message.strip(), str(period))
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def enqueue_contact_message(data):
+    """
+    Queue a validated ContactForm's cleaned_data. One INSERT; recent
+    duplicates of a queued or delivered message are dropped by the unique
+    content hash.
+    """
+    message = ContactMessage(
+        name=data["name"],
+        email=data["email"],
+        subject=data["subject"],
+        message=data["message"],
+        content_hash=content_hash(data["email"], data["subject"], data["message"]),
+    )
+    ContactMessage.objects.bulk_create([message], ignore_conflicts=True)
+
+
+class EmailDelivery:
+    """
+    Email each message to CONTACT_RECIPIENTS, replying to the sender.
+    """
+
+    def send_batch(self, messages):
+        connection = get_connection(fail_silently=False)
+        results = {}
+        try:
+            connection.open()
+            for msg in messages:
+                email = EmailMessage(
+                    subject=f"[Contact] {msg.subject}",
+                    body=f"From: {msg.name} <{msg.email}>\n\n{msg.message}",
+                    to=settings.CONTACT_RECIPIENTS,
+                    reply_to=[msg.email],
+                    connection=connection,
+                )
+                try:
+                    email.send()
+                except Exception as exc:
+                    results[msg.pk] = f"{type(exc).__name__}: {exc}"
+                else:
+                    results[msg.pk] = None
+        finally:
+            connection.close()
+        return results
+
+
+@lru_cache(maxsize=None)
+def get_delivery_backend():
+    path = getattr(settings, "CONTACT_DELIVERY_BACKEND", DEFAULT_BACKEND)
+    return import_string(path)()
+
+
+def retry_delay(attempts):
+    """
+    Backoff before the next try after `attempts` failures: 1, 2, 4... minutes,
+    capped at an hour.
+    """
+    return timedelta(minutes=min(2 ** (attempts - 1), 60))
+
+
+def _claim(batch_size, now):
+    """
+    Lease up to `batch_size` due messages to this worker.
+    """
+    lease = timedelta(seconds=getattr(settings, "CONTACT_DELIVERY_LEASE", 300))
+    with transaction.atomic():
+        batch = list(
+            ContactMessage.objects.select_for_update(skip_locked=True)
+            .filter(status=ContactMessage.Status.PENDING, next_attempt_at__lte=now)
+            .order_by("next_attempt_at")[:batch_size]
+        )
+        if batch:
+            ContactMessage.objects.filter(pk__in=[m.pk for m in batch]).update(
+                next_attempt_at=now + lease
+            )
+    return batch
+
+
+def _throttle(batch, now):
+    """
+    Split `batch` into messages to send now and those over their sender's
+    limit, which are pushed past the current window.
+    """
+    limit = getattr(settings, "CONTACT_SENDER_LIMIT", 3)
+    window = timedelta(seconds=getattr(settings, "CONTACT_SENDER_WINDOW", 3600))
+    sent = dict(
+        ContactMessage.objects.filter(
+            email__in={m.email for m in batch}, sent_at__gte=now - window
+        )
+        .values_list("email")
+        .annotate(n=Count("pk"))
+    )
+    send, deferred = [], []
+    for msg in batch:
+        if sent.get(msg.email, 0) < limit:
+            sent[msg.email] = sent.get(msg.email, 0) + 1
+            send.append(msg)
+        else:
+            deferred.append(msg.pk)
+    if deferred:
+        ContactMessage.objects.filter(pk__in=deferred).update(
+            next_attempt_at=now + window
+        )
+    return send, len(deferred)
+
+
+def deliver_pending(batch_size=50, max_attempts=5):
+    """
+    Send one batch of due messages. Returns counts of sent, retried,
+    failed (given up) and throttled messages.
+    """
+    now = timezone.now()
+    counts = {"sent": 0, "retried": 0, "failed": 0, "throttled": 0}
+    batch = _claim(batch_size, now)
+    if not batch:
+        return counts
+    batch, counts["throttled"] = _throttle(batch, now)
+    if not batch:
+        return counts
+
+    try:
+        results = get_delivery_backend().send_batch(batch)
+    except Exception as exc:  # e.g. the mail server is unreachable
+        results = {m.pk: f"{type(exc).__name__}: {exc}" for m in batch}
+    sent_ids = [m.pk for m in batch if results.get(m.pk, "not sent") is None]
+    if sent_ids:
+        ContactMessage.objects.filter(pk__in=sent_ids).update(
+            status=ContactMessage.Status.SENT,
+            sent_at=timezone.now(),
+            attempts=F("attempts") + 1,
+            last_error="",
+        )
+        counts["sent"] = len(sent_ids)
+
+    for msg in batch:
+        if msg.pk in sent_ids:
+            continue
+        msg.attempts += 1
+        msg.last_error = results.get(msg.pk) or "not sent"
+        if msg.attempts >= max_attempts:
+            msg.status = ContactMessage.Status.FAILED
+            counts["failed"] += 1
+        else:
+            msg.next_attempt_at = timezone.now() + retry_delay(msg.attempts)
+            counts["retried"] += 1
+        msg.save(update_fields=["attempts", "last_error", "status", "next_attempt_at"])
+    return counts
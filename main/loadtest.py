@@ -0,0 +1,219 @@
+"""
+Scenario runner behind `manage.py loadtest`.
+
+A scenario is a weighted mix of ACTIONS. Each virtual user is a thread with
+its own test Client (so its own session and client IP) that keeps picking
+an action by weight until the request budget or time runs out. An action's
+`expected` status codes are not errors: a login storm is supposed to meet
+401s and 429s. Mixes are named in SCENARIOS or loaded from a JSON file
+mapping action names to weights.
+
+`isolated_settings()` points every external dependency at a local
+stand-in: the in-memory users sheet, local-memory cache and mail, local
+file storage, and no replica routing.
+"""
+
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+
+from .seeding import SEED_PASSWORD
+
+AJAX = {"HTTP_X_REQUESTED_WITH": "XMLHttpRequest"}
+
+
+class Action:
+    def __init__(self, fn, expected=(200,), signed_in=False):
+        self.fn = fn
+        self.expected = frozenset(expected)
+        self.signed_in = signed_in
+
+
+def _home(client, data, rng):
+    return client.get(reverse("home"))
+
+
+def _my_work(client, data, rng):
+    return client.get(reverse("my_work"))
+
+
+def _project(client, data, rng):
+    response = client.get(
+        reverse("project", kwargs={"id": rng.choice(data["projects"])})
+    )
+    b"".join(response)  # a streamed page does most of its work here
+    return response
+
+
+def _comments_partial(client, data, rng):
+    # What opening a project modal on the home page fetches
+    url = reverse(
+        "project_comments_partial", kwargs={"id": rng.choice(data["projects"])}
+    )
+    return client.get(url, **AJAX)
+
+
+def _post_comment(client, data, rng):
+    url = reverse("comment_create", kwargs={"id": rng.choice(data["projects"])})
+    content = f"Load test comment {uuid.uuid4().hex}"
+    return client.post(url, {"content": content}, **AJAX)
+
+
+def _login(client, data, rng):
+    # Mostly wrong passwords, as in a credential-stuffing burst
+    password = SEED_PASSWORD if rng.random() < 0.25 else "wrong-password"
+    return client.post(
+        reverse("auth_login"),
+        {"email": rng.choice(data["sheet_emails"]), "password": password},
+        **AJAX,
+    )
+
+
+ACTIONS = {
+    "home": Action(_home),
+    "my_work": Action(_my_work),
+    "project": Action(_project),
+    "comments_partial": Action(_comments_partial),
+    # 429: the spam filter's per-user posting rate
+    "post_comment": Action(_post_comment, expected=(200, 429), signed_in=True),
+    "login": Action(_login, expected=(200, 401, 429)),
+}
+
+SCENARIOS = {
+    "production": {
+        "home": 35,
+        "my_work": 20,
+        "project": 10,
+        "comments_partial": 25,
+        "post_comment": 5,
+        "login": 5,
+    },
+    "browse": {"home": 50, "my_work": 30, "project": 20},
+    "modals": {"comments_partial": 80, "post_comment": 20},
+    "login_storm": {"login": 90, "home": 10},
+}
+
+
+def load_mix(name_or_path):
+    """
+    A scenario from SCENARIOS, or from a JSON file of {action: weight}.
+    """
+    if name_or_path in SCENARIOS:
+        mix = SCENARIOS[name_or_path]
+    else:
+        mix = json.loads(Path(name_or_path).read_text())
+    unknown = set(mix) - set(ACTIONS)
+    if unknown:
+        raise ValueError(f"Unknown actions: {', '.join(sorted(unknown))}")
+    if not mix or min(mix.values()) <= 0:
+        raise ValueError("Give every action a positive weight.")
+    return mix
+
+
+def isolated_settings(tmp_dir):
+    """
+    Settings overrides replacing external services with local stand-ins.
+    """
+    return {
+        "CACHES": {
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+        },
+        "DATABASE_ROUTERS": [],
+        "EMAIL_BACKEND": "django.core.mail.backends.locmem.EmailBackend",
+        "MEDIA_ROOT": str(Path(tmp_dir, "media")),
+        "STATICFILES_STORAGE": "django.contrib.staticfiles.storage.StaticFilesStorage",
+        "USER_SHEET_BACKEND": "main.sheets.memory_users_sheet",
+    }
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies = []  # seconds
+        self.statuses = Counter()
+        self.errors = 0
+
+    def merge(self, other):
+        self.latencies += other.latencies
+        self.statuses.update(other.statuses)
+        self.errors += other.errors
+
+
+def _virtual_user(index, mix, data, budget, deadline, seed):
+    rng = random.Random(seed + index)
+    client = Client(
+        HTTP_HOST="localhost",
+        REMOTE_ADDR=f"10.0.{index // 250}.{index % 250 + 1}",
+        raise_request_exception=False,
+    )
+    names, weights = list(mix), list(mix.values())
+    if any(ACTIONS[name].signed_in for name in names):
+        username = data["usernames"][index % len(data["usernames"])]
+        client.force_login(get_user_model().objects.get(username=username))
+
+    stats = defaultdict(EndpointStats)
+    while budget() and time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        action = ACTIONS[name]
+        start = time.perf_counter()
+        try:
+            status = action.fn(client, data, rng).status_code
+        except Exception:
+            status = None
+        stats[name].latencies.append(time.perf_counter() - start)
+        stats[name].statuses[status] += 1
+        if status not in action.expected:
+            stats[name].errors += 1
+    return stats
+
+
+def run(mix, data, concurrency=4, requests=500, duration=None, seed=0):
+    """
+    Replay `mix` with `concurrency` virtual users until `requests` have
+    been made (or `duration` seconds passed). Returns
+    ({action: EndpointStats}, elapsed seconds).
+    """
+    lock = threading.Lock()
+    remaining = [requests if duration is None else float("inf")]
+
+    def budget():
+        with lock:
+            remaining[0] -= 1
+            return remaining[0] >= 0
+
+    start = time.perf_counter()
+    deadline = start + duration if duration is not None else float("inf")
+    args = (mix, data, budget, deadline, seed)
+
+    if concurrency == 1:
+        results = [_virtual_user(0, *args)]
+    else:
+        results = [None] * concurrency
+
+        def target(i):
+            try:
+                results[i] = _virtual_user(i, *args)
+            finally:
+                connections.close_all()  # this thread's connections
+
+        threads = [
+            threading.Thread(target=target, args=(i,)) for i in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    merged = defaultdict(EndpointStats)
+    for stats in results:
+        for name, endpoint in (stats or {}).items():
+            merged[name].merge(endpoint)
+    return dict(merged), time.perf_counter() - start
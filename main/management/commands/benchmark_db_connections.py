@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+from django.urls import reverse
+
+from main.benchmarks import benchmark_client, format_summary, summarize, time_calls
+
+
+class Command(BaseCommand):
+    help = (
+        "Time real page requests when reconnecting for every request "
+        "(CONN_MAX_AGE=0) against reusing one connection, with and without "
+        "health checks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--database", default="default")
+        parser.add_argument(
+            "--path", default=None, help="Page to request (default: my_work)."
+        )
+
+    def handle(self, *args, requests, database, path, **options):
+        connection = connections[database]
+        client = benchmark_client()
+        path = path or reverse("my_work")
+
+        def request():
+            # The test client disconnects close_old_connections from the
+            # request signals, so do what the request handler does around
+            # every request ourselves.
+            close_old_connections()
+            response = client.get(path)
+            b"".join(response)
+            close_old_connections()
+
+        scenarios = [
+            ("new connection/request", 0, False),
+            ("persistent", None, False),
+            ("persistent+health check", None, True),
+        ]
+
+        saved = {
+            key: connection.settings_dict[key]
+            for key in ("CONN_MAX_AGE", "CONN_HEALTH_CHECKS")
+        }
+        self.stdout.write(
+            f"{connection.vendor} ({database}), GET {path}, {requests} requests each"
+        )
+        try:
+            for label, max_age, health_checks in scenarios:
+                connection.settings_dict["CONN_MAX_AGE"] = max_age
+                connection.settings_dict["CONN_HEALTH_CHECKS"] = health_checks
+                # close_at is fixed when connecting, so start each mode afresh
+                connection.close()
+                request()  # warm-up
+                summary = summarize(time_calls(request, requests))
+                self.stdout.write(format_summary(label, summary))
+        finally:
+            connection.settings_dict.update(saved)
+            connection.close()
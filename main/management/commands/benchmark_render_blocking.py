@@ -0,0 +1,88 @@
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from django.urls import reverse
+
+from main.benchmarks import benchmark_client, render_blocking_resources, rolled_back
+from main.models import Project
+
+SCENARIOS = (
+    ("separate files", {"ASSET_BUNDLES": False}),
+    ("bundled", {"ASSET_BUNDLES": True, "ASSET_CRITICAL_CSS": False}),
+    ("bundled + critical CSS", {"ASSET_BUNDLES": True, "ASSET_CRITICAL_CSS": True}),
+)
+
+
+def transfer_size(root, url):
+    """
+    Bytes sent for static `url`: its Brotli, gzip or raw file, smallest first.
+    """
+    if not url.startswith(settings.STATIC_URL):
+        return 0
+    path = Path(root, url[len(settings.STATIC_URL) :])
+    for candidate in (Path(f"{path}.br"), Path(f"{path}.gz"), path):
+        if candidate.exists():
+            return candidate.stat().st_size
+    return 0
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure render-blocking requests and compressed bytes per page with "
+        "separate stylesheets, bundles, and bundles + inlined critical CSS. "
+        "Collects static files into a temporary directory unless "
+        "--static-root points at an existing collection."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--static-root")
+
+    def handle(self, *args, static_root, **options):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = static_root or tmp
+            with override_settings(
+                STATIC_ROOT=root,
+                STATICFILES_STORAGE="main.storage.BundledManifestStaticFilesStorage",
+            ):
+                if not static_root:
+                    call_command("collectstatic", interactive=False, verbosity=0)
+                self._run(root)
+
+    def _run(self, root):
+        with rolled_back():
+            project = Project.objects.create(title="Bench", description="Bench")
+            pages = {
+                "home": reverse("home"),
+                "my_work": reverse("my_work"),
+                "project": reverse("project", kwargs={"id": project.pk}),
+                "contact": reverse("contact"),
+            }
+
+            for label, overrides in SCENARIOS:
+                with override_settings(**overrides):
+                    client = benchmark_client()
+                    total_requests = total_bytes = 0
+                    for page, url in pages.items():
+                        response = client.get(url)
+                        if response.status_code != 200:
+                            raise CommandError(f"{url} did not return 200")
+                        # b"".join: the project page may be streamed
+                        urls, inline = render_blocking_resources(
+                            b"".join(response).decode()
+                        )
+                        blocking = sum(transfer_size(root, u) for u in urls)
+                        total_requests += len(urls)
+                        total_bytes += blocking
+                        self.stdout.write(
+                            f"{label:<24} {page:<8} requests={len(urls):<3} "
+                            f"blocking={blocking / 1024:.1f}KiB "
+                            f"inline={inline / 1024:.1f}KiB"
+                        )
+                    self.stdout.write(
+                        f"{label:<24} {'total':<8} requests={total_requests:<3} "
+                        f"blocking={total_bytes / 1024:.1f}KiB"
+                    )
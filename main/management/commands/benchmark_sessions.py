@@ -0,0 +1,60 @@
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from main.benchmarks import (
+    benchmark_client,
+    format_summary,
+    rolled_back,
+    summarize,
+    time_calls,
+)
+from main.models import Project
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-request latency and queries of the session engines on a "
+        "session-reading view (the comments partial, signed in). Seed data "
+        "is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+
+    def handle(self, *args, requests, **options):
+        with rolled_back():
+            user = get_user_model().objects.create_user(
+                username="bench-sessions", password="unused-password"
+            )
+            project = Project.objects.create(title="Bench", description="Bench")
+            url = reverse("project_comments_partial", kwargs={"id": project.pk})
+
+            for label, engine in settings.SESSION_ENGINES.items():
+                with override_settings(
+                    SESSION_ENGINE=engine,
+                    STATICFILES_STORAGE=(
+                        "django.contrib.staticfiles.storage.StaticFilesStorage"
+                    ),
+                ):
+                    client = benchmark_client()
+                    client.force_login(user)
+                    # warm-up (also fills the cache for cached_db)
+                    if client.get(url).status_code != 200:
+                        raise CommandError(f"{url} did not return 200")
+
+                    with CaptureQueriesContext(connection) as queries:
+                        client.get(url)
+                    query_count = len(queries)  # read before the log resets
+                    latencies = time_calls(partial(client.get, url), requests)
+
+                self.stdout.write(
+                    f"{format_summary(label, summarize(latencies))} "
+                    f"queries/request={query_count}"
+                )
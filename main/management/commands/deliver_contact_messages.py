@@ -0,0 +1,45 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from main.contact_delivery import deliver_pending
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Send queued contact-form messages (the Procfile `worker` process). "
+        "Polls every --interval seconds; --once sends a single batch and "
+        "exits, e.g. for a scheduler instead of a long-running worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument("--max-attempts", type=int, default=5)
+        parser.add_argument("--interval", type=float, default=10.0)
+        parser.add_argument("--once", action="store_true")
+
+    def handle(self, *args, batch_size, max_attempts, interval, once, **options):
+        if not settings.CONTACT_RECIPIENTS:
+            # Idle rather than exit, so a deploy without recipients doesn't
+            # crash-loop the worker process; messages stay queued.
+            logger.warning("CONTACT_RECIPIENTS is not set; not delivering.")
+            while not once:
+                time.sleep(interval)
+            return
+
+        while True:
+            counts = deliver_pending(batch_size=batch_size, max_attempts=max_attempts)
+            if any(counts.values()):
+                self.stdout.write(
+                    "Contact messages: "
+                    + ", ".join(f"{n} {what}" for what, n in counts.items())
+                )
+            if once:
+                return
+            # A full batch suggests more are due; go again straight away.
+            if counts["sent"] + counts["retried"] + counts["failed"] < batch_size:
+                time.sleep(interval)
@@ -0,0 +1,124 @@
+import logging
+import tempfile
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+
+from main.benchmarks import LATENCY_BUCKETS_MS, histogram, percentile
+from main.loadtest import SCENARIOS, isolated_settings, load_mix, run
+from main.seeding import seed
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a weighted request mix concurrently against a throwaway "
+        "database (a temporary SQLite file, or test_<name> on Postgres) with "
+        "local stand-ins for the users sheet, cache, mail and media storage. "
+        "Reports throughput, error rate and latency histograms per endpoint. "
+        f"Scenarios: {', '.join(SCENARIOS)}, or a JSON file of "
+        '{"action": weight}.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scenario", default="production")
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--requests", type=int, default=1000)
+        parser.add_argument(
+            "--duration", type=float, help="Run for this many seconds instead."
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--projects", type=int, default=20)
+        parser.add_argument("--comments", type=int, default=10)
+        parser.add_argument("--users", type=int, default=20)
+        parser.add_argument("--sheet-users", type=int, default=5)
+
+    def handle(self, *args, scenario, concurrency, **options):
+        try:
+            mix = load_mix(scenario)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Bad scenario {scenario!r}: {exc}") from exc
+        if concurrency < 1:
+            raise CommandError("--concurrency must be at least 1.")
+
+        # 401/429s are part of the traffic; don't log a warning for each
+        request_logger = logging.getLogger("django.request")
+        level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        test_name = connection.settings_dict.get("TEST", {}).get("NAME")
+        with tempfile.TemporaryDirectory() as tmp:
+            with override_settings(**isolated_settings(tmp)):
+                old_name = self._create_database(tmp)
+                try:
+                    data = seed(
+                        projects=options["projects"],
+                        comments=options["comments"],
+                        users=max(options["users"], 1),
+                        sheet_users=max(options["sheet_users"], 1),
+                    )
+                    results, elapsed = run(
+                        mix,
+                        data,
+                        concurrency=concurrency,
+                        requests=options["requests"],
+                        duration=options["duration"],
+                        seed=options["seed"],
+                    )
+                finally:
+                    connection.creation.destroy_test_db(old_name, verbosity=0)
+                    connection.settings_dict.setdefault("TEST", {})["NAME"] = test_name
+                    request_logger.setLevel(level)
+
+        self._report(scenario, concurrency, results, elapsed)
+
+    @staticmethod
+    def _create_database(tmp):
+        if connection.vendor == "sqlite":
+            # A file, not shared-cache memory, so threads write concurrently
+            connection.settings_dict.setdefault("TEST", {})["NAME"] = str(
+                Path(tmp, "loadtest.sqlite3")
+            )
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        return old_name
+
+    def _report(self, scenario, concurrency, results, elapsed):
+        total = sum(len(s.latencies) for s in results.values())
+        errors = sum(s.errors for s in results.values())
+        self.stdout.write(
+            f"{scenario}: {total} requests from {concurrency} users in "
+            f"{elapsed:.1f}s = {total / elapsed:.1f} req/s, "
+            f"{100 * errors / max(total, 1):.1f}% errors"
+        )
+        self.stdout.write(
+            f"{'endpoint':<18} {'n':>6} {'req/s':>7} {'err%':>6} {'p50':>9} "
+            f"{'p95':>9} {'p99':>9} {'max':>9}  statuses"
+        )
+        for name, stats in sorted(results.items()):
+            ms = [v * 1000 for v in stats.latencies]
+            statuses = ", ".join(
+                f"{code or 'exc'}x{n}"
+                for code, n in sorted(stats.statuses.items(), key=str)
+            )
+            self.stdout.write(
+                f"{name:<18} {len(ms):>6} {len(ms) / elapsed:>7.1f} "
+                f"{100 * stats.errors / len(ms):>6.1f} "
+                + " ".join(f"{percentile(ms, p):>7.1f}ms" for p in (50, 95, 99))
+                + f" {max(ms):>7.1f}ms  {statuses}"
+            )
+
+        self.stdout.write("")
+        self.stdout.write("latency histograms (ms):")
+        labels = [f"<={edge}" for edge in LATENCY_BUCKETS_MS]
+        labels.append(f">{LATENCY_BUCKETS_MS[-1]}")
+        for name, stats in sorted(results.items()):
+            counts = histogram(stats.latencies)
+            peak = max(counts)
+            self.stdout.write(f"  {name}")
+            for label, count in zip(labels, counts, strict=True):
+                if count:
+                    bar = "#" * max(1, round(40 * count / peak))
+                    self.stdout.write(f"    {label:>7} {count:>6} {bar}")
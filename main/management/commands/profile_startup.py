@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main.benchmarks import (
+    STARTUP_LAZY_MODULES,
+    lazy_modules_loaded,
+    profile_startup,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Boot the WSGI app in a fresh interpreter (python -X importtime) and "
+        "report worker boot time and the slowest imports. Fails if boot "
+        "exceeds --budget-ms or loads a module meant to be imported lazily."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--target", default="portfolio.wsgi")
+        parser.add_argument("--limit", type=int, default=20)
+        parser.add_argument(
+            "--sort",
+            choices=("cumulative", "self"),
+            default="cumulative",
+            help="Rank modules by time including (cumulative) or excluding "
+            "(self) their own imports.",
+        )
+        parser.add_argument("--budget-ms", type=float)
+
+    def handle(self, *args, target, limit, sort, budget_ms, **options):
+        report = profile_startup(target)
+        column = 2 if sort == "cumulative" else 1
+        imports = sorted(report["imports"], key=lambda i: i[column], reverse=True)
+
+        width = max([len(i[0]) for i in imports[:limit]] + [6])
+        self.stdout.write(f"{'module':<{width}}  {'self ms':>8}  {'cum ms':>8}")
+        for name, self_us, cumulative_us in imports[:limit]:
+            self.stdout.write(
+                f"{name:<{width}}  {self_us / 1000:>8.1f}  {cumulative_us / 1000:>8.1f}"
+            )
+        self.stdout.write(
+            f"{target}: booted in {report['boot_ms']:.0f} ms, "
+            f"{len(report['modules'])} modules loaded."
+        )
+
+        eager = lazy_modules_loaded(report["modules"])
+        if eager:
+            raise CommandError(
+                f"Imported at startup: {', '.join(eager)} "
+                f"(keep {', '.join(STARTUP_LAZY_MODULES)} lazy)."
+            )
+        if budget_ms is not None and report["boot_ms"] > budget_ms:
+            raise CommandError(
+                f"Boot took {report['boot_ms']:.0f} ms; budget is {budget_ms:.0f} ms."
+            )
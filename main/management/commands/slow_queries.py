@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from main import slow_queries
+
+
+class Command(BaseCommand):
+    help = (
+        "List slow queries recorded by main.slow_queries, grouped by "
+        "fingerprint, most total time first, with the views that ran them "
+        "and their query plans."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=10)
+        parser.add_argument("--no-explain", action="store_true")
+        parser.add_argument(
+            "--clear", action="store_true", help="Forget everything recorded."
+        )
+
+    def handle(self, *args, limit, no_explain, clear, **options):
+        if not getattr(settings, "CACHE_IS_SHARED", False):
+            raise CommandError(
+                "Slow queries are aggregated in the cache, which is per process "
+                "without REDIS_URL, so this command can't see what the web "
+                'workers recorded. Set REDIS_URL, or read the "main.slow_queries" '
+                "log instead."
+            )
+        if clear:
+            slow_queries.clear()
+            self.stdout.write("Cleared the slow-query log.")
+            return
+
+        entries = sorted(
+            slow_queries.aggregated().items(),
+            key=lambda item: item[1]["total_ms"],
+            reverse=True,
+        )
+        if not entries:
+            self.stdout.write("No slow queries recorded.")
+            return
+
+        for fp, entry in entries[:limit]:
+            mean = entry["total_ms"] / entry["count"]
+            self.stdout.write(
+                f"[{fp}] {entry['count']}x  total={entry['total_ms']:.1f}ms "
+                f"mean={mean:.1f}ms max={entry['max_ms']:.1f}ms"
+            )
+            views = sorted(entry["views"].items(), key=lambda v: v[1], reverse=True)
+            self.stdout.write(
+                "  views: " + ", ".join(f"{view} ({n})" for view, n in views)
+            )
+            self.stdout.write(f"  {entry['sql']}")
+            if entry["explain"] and not no_explain:
+                for line in entry["explain"].splitlines():
+                    self.stdout.write(f"    {line}")
+        self.stdout.write(f"{len(entries)} slow query fingerprints recorded.")
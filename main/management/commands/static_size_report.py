@@ -0,0 +1,73 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from whitenoise.compress import Compressor
+
+VARIANTS = (("gzip", ".gz"), ("brotli", ".br"))
+
+
+def _size(path):
+    return path.stat().st_size if path.exists() else None
+
+
+def _kb(size):
+    return "-" if size is None else f"{size / 1024:.1f}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Report raw, gzip and Brotli sizes of collected static assets, largest "
+        "first. Run after collectstatic; uses the manifest (when present) so "
+        "only the hashed files actually served are listed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=20)
+
+    def handle(self, *args, limit, **options):
+        root = Path(settings.STATIC_ROOT)
+        if not root.is_dir():
+            raise CommandError(f"{root} does not exist; run collectstatic first.")
+
+        rows = []
+        for name in self._served_names(root):
+            path = root / name
+            rows.append(
+                (name, _size(path), *(_size(Path(f"{path}{s}")) for _, s in VARIANTS))
+            )
+        rows.sort(key=lambda row: row[1], reverse=True)
+
+        width = max([len(r[0]) for r in rows[:limit]] + [5])
+        self.stdout.write(f"{'asset':<{width}}  {'KiB':>8}  {'gzip':>8}  {'br':>8}")
+        for name, raw, gz, br in rows[:limit]:
+            self.stdout.write(
+                f"{name:<{width}}  {_kb(raw):>8}  {_kb(gz):>8}  {_kb(br):>8}"
+            )
+
+        # Totals count the smallest variant a client could be sent
+        raw_total = sum(r[1] for r in rows)
+        best_total = sum(min(s for s in r[1:] if s is not None) for r in rows)
+        # Already-compressed formats (fonts, images) are skipped by WhiteNoise
+        compressor = Compressor(quiet=True)
+        missing_br = sum(
+            1 for r in rows if r[3] is None and compressor.should_compress(r[0])
+        )
+        self.stdout.write(
+            f"{len(rows)} assets: {_kb(raw_total)} KiB raw, "
+            f"{_kb(best_total)} KiB best-compressed; "
+            f"{missing_br} compressible without a Brotli variant."
+        )
+
+    @staticmethod
+    def _served_names(root):
+        manifest = root / "staticfiles.json"
+        if manifest.exists():
+            paths = json.loads(manifest.read_text())["paths"]
+            return sorted(n for n in set(paths.values()) if (root / n).exists())
+        return sorted(
+            str(p.relative_to(root))
+            for p in root.rglob("*")
+            if p.is_file() and p.suffix not in (".gz", ".br")
+        )
@@ -0,0 +1,356 @@
+import threading
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_vary_headers
+from django.utils.functional import SimpleLazyObject
+
+from . import compression, profiling, routers, slow_queries
+from .models import make_author_key
+
+
+class Viewer:
+    """
+    The identity behind a request, resolved once from `request.user` and the
+    sheet-auth session keys (`user_email`, `user_name`, `author_name`).
+    """
+
+    def __init__(self, request):
+        user = request.user
+        self.is_django_user = user.is_authenticated
+        self.user = user if self.is_django_user else None
+        self.is_staff = self.is_django_user and user.is_staff
+
+        session = request.session
+        self.email = session.get("user_email")
+        self.name = session.get("user_name")
+        self.session_author_name = session.get("author_name")
+        self.identities = frozenset(
+            v for v in (self.name, self.session_author_name, self.email) if v
+        )
+        # Comment.author_key values this viewer may have written under
+        self.author_keys = frozenset(
+            key
+            for key in (
+                make_author_key(email=self.email),
+                make_author_key(name=self.name),
+                make_author_key(name=self.session_author_name),
+            )
+            if key
+        )
+
+    @property
+    def has_sheet_identity(self):
+        return bool(self.identities)
+
+    @property
+    def can_comment(self):
+        return self.is_django_user or self.has_sheet_identity
+
+    @property
+    def author_name(self):
+        """
+        Name stored on comments written through sheet/session auth.
+        """
+        return self.name or self.session_author_name or self.email
+
+    def owns(self, comment):
+        if comment.user_id:
+            return self.is_django_user and comment.user_id == self.user.pk
+        return bool(comment.author_key) and comment.author_key in self.author_keys
+
+    def authored_comments(self, queryset):
+        """
+        Filter `queryset` down to this viewer's comments in SQL.
+        """
+        if self.is_django_user:
+            return queryset.filter(user=self.user)
+        return queryset.filter(user__isnull=True, author_key__in=self.author_keys)
+
+    def manageable_ids(self, comments):
+        """
+        IDs of `comments` this viewer may edit/delete (staff: all of them),
+        so templates gate each comment with a single set lookup.
+        """
+        if self.is_staff:
+            return {c.pk for c in comments}
+        if not self.can_comment:
+            return set()
+        return {c.pk for c in comments if self.owns(c)}
+
+
+class ViewerMiddleware:
+    """
+    Attach a lazily resolved `request.viewer`. Must come after
+    SessionMiddleware and AuthenticationMiddleware; requests that never
+    look at it never touch the session.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        request.viewer = SimpleLazyObject(lambda: Viewer(request))
+        # Under ASGI this returns the coroutine for the caller to await.
+        return self.get_response(request)
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Per-request state for main.routers.PrimaryReplicaRouter.
+
+    Non-GET requests read from the primary. After any write the response
+    sets a short-lived cookie, and reads from that browser stay on the
+    primary until it expires, so a visitor always sees their own comment
+    even while the replica lags. Disabled when no replica is configured.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    cookie_name = "db_primary_pin"
+    safe_methods = ("GET", "HEAD", "OPTIONS")
+
+    def __init__(self, get_response):
+        if not routers.replica_configured():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.pin_seconds = getattr(settings, "REPLICA_PIN_SECONDS", 10)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        tokens = self._start(request)
+        try:
+            response = self.get_response(request)
+            self._finish(request, response)
+        finally:
+            self._reset(tokens)
+        return response
+
+    async def __acall__(self, request):
+        tokens = self._start(request)
+        try:
+            response = await self.get_response(request)
+            self._finish(request, response)
+        finally:
+            self._reset(tokens)
+        return response
+
+    def _start(self, request):
+        pinned = (
+            request.method not in self.safe_methods
+            or self.cookie_name in request.COOKIES
+        )
+        return routers.use_primary.set(pinned), routers.wrote.set(False)
+
+    def _finish(self, request, response):
+        if routers.wrote.get():
+            response.set_cookie(
+                self.cookie_name,
+                "1",
+                max_age=self.pin_seconds,
+                httponly=True,
+                samesite="Lax",
+                secure=request.is_secure(),
+            )
+
+    @staticmethod
+    def _reset(tokens):
+        use_primary_token, wrote_token = tokens
+        routers.use_primary.reset(use_primary_token)
+        routers.wrote.reset(wrote_token)
+
+
+class SlowQueryMiddleware:
+    """
+    Tag queries with the request (then the view) that ran them, for the
+    slow-query log in main.slow_queries. Disabled when SLOW_QUERY_MS is unset.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if slow_queries.threshold_ms() is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = self._start(request)
+        try:
+            return self.get_response(request)
+        finally:
+            slow_queries.current_origin.reset(token)
+
+    async def __acall__(self, request):
+        token = self._start(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            slow_queries.current_origin.reset(token)
+
+    @staticmethod
+    def _start(request):
+        request.query_origin = slow_queries.Origin(request.method, request.path)
+        return slow_queries.current_origin.set(request.query_origin)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # The Origin object is shared, so this reaches the view's thread too
+        match = request.resolver_match
+        request.query_origin.view = match.view_name if match else None
+
+
+class ProfilerMiddleware:
+    """
+    Sample the stacks of views picked by the running profiling session
+    (main.profiling). Disabled unless SAMPLING_PROFILER is on.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "SAMPLING_PROFILER", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.profiled = profiling.should_sample()
+        try:
+            return self.get_response(request)
+        finally:
+            self._finish(request)
+
+    async def __acall__(self, request):
+        request.profiled = profiling.should_sample()
+        try:
+            return await self.get_response(request)
+        finally:
+            self._finish(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Runs on the view's thread (under ASGI too), which is what we sample
+        if request.profiled and request.resolver_match.view_name != "profiler":
+            request.profiled_thread = threading.get_ident()
+            profiling.sampler.register(request.profiled_thread)
+
+    @staticmethod
+    def _finish(request):
+        thread_id = getattr(request, "profiled_thread", None)
+        if thread_id is not None:
+            samples = profiling.sampler.unregister(thread_id)
+            profiling.record(request.resolver_match.view_name, samples)
+
+
+class CompressionMiddleware:
+    """
+    Brotli/gzip for dynamic responses (main.compression), including
+    streaming ones. Responses carrying a CSRF form field are left
+    uncompressed while COMPRESSION_EXCLUDE_CSRF is on (BREACH), as is
+    streamed HTML unless the view set `response.has_csrf_field = False`.
+    Disabled when COMPRESSION_ENABLED is off.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "COMPRESSION_ENABLED", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.min_bytes = getattr(settings, "COMPRESSION_MIN_BYTES", 500)
+        self.exclude_csrf = getattr(settings, "COMPRESSION_EXCLUDE_CSRF", True)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self._compress(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self._compress(request, await self.get_response(request))
+
+    def _compress(self, request, response):
+        content_type = response.get("Content-Type", "")
+        if (
+            response.status_code in (204, 304)
+            or response.has_header("Content-Encoding")
+            or not compression.is_compressible(content_type)
+            or "no-transform" in response.get("Cache-Control", "")
+        ):
+            return response
+        # Whatever this client gets, a cache must key it on Accept-Encoding
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = compression.choose_encoding(
+            request.META.get("HTTP_ACCEPT_ENCODING", "")
+        )
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            # The body isn't known yet, so a streamed page can't be checked
+            # for a CSRF field; only the view can vouch for it
+            if (
+                self.exclude_csrf
+                and content_type.startswith("text/html")
+                and getattr(response, "has_csrf_field", True)
+            ):
+                compression.record(skipped_csrf=1)
+                return response
+            del response.headers["Content-Length"]
+            if response.is_async:
+                response.streaming_content = compression.acompress_chunks(
+                    response.streaming_content, encoding, self._count
+                )
+            else:
+                response.streaming_content = compression.compress_chunks(
+                    response.streaming_content, encoding, self._count
+                )
+            compression.record(**{f"compressed_{encoding}": 1})
+        else:
+            content = response.content
+            if len(content) < self.min_bytes:
+                compression.record(skipped_small=1)
+                return response
+            if self.exclude_csrf and compression.CSRF_FIELD in content:
+                compression.record(skipped_csrf=1)
+                return response
+            compressed = compression.compress(content, encoding)
+            if len(compressed) >= len(content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+            compression.record(
+                bytes_in=len(content),
+                bytes_out=len(compressed),
+                **{f"compressed_{encoding}": 1},
+            )
+
+        # The bytes changed, so a strong validator no longer matches them
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+    @staticmethod
+    def _count(raw, sent):
+        compression.record(bytes_in=raw, bytes_out=sent)
@@ -0,0 +1,64 @@
+from django.db import migrations
+
+# Postgres: trigram GIN indexes over the same UPPER(col::text) expression that
+# Django emits for `icontains`, so the ORM lookups in main/search.py hit them.
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS main_project_title_trgm "
+    "ON main_project USING gin (UPPER(title::text) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS main_project_description_trgm "
+    "ON main_project USING gin (UPPER(description::text) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS main_tag_name_trgm "
+    "ON main_tag USING gin (UPPER(name::text) gin_trgm_ops)",
+]
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS main_project_title_trgm",
+    "DROP INDEX IF EXISTS main_project_description_trgm",
+    "DROP INDEX IF EXISTS main_tag_name_trgm",
+]
+
+# SQLite: an external-content FTS5 table kept in sync with main_project by
+# triggers, then populated once from the existing rows.
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS main_project_fts USING fts5("
+    "title, description, content='main_project', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS main_project_fts_ai AFTER INSERT ON main_project "
+    "BEGIN INSERT INTO main_project_fts(rowid, title, description) "
+    "VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS main_project_fts_ad AFTER DELETE ON main_project "
+    "BEGIN INSERT INTO main_project_fts(main_project_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS main_project_fts_au AFTER UPDATE ON main_project "
+    "BEGIN INSERT INTO main_project_fts(main_project_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO main_project_fts(rowid, title, description) "
+    "VALUES (new.id, new.title, new.description); END",
+    "INSERT INTO main_project_fts(main_project_fts) VALUES ('rebuild')",
+]
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS main_project_fts_ai",
+    "DROP TRIGGER IF EXISTS main_project_fts_ad",
+    "DROP TRIGGER IF EXISTS main_project_fts_au",
+    "DROP TABLE IF EXISTS main_project_fts",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for sql in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+
+    return run
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("main", "0003_comment_author_email_project_github_url"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({"postgresql": POSTGRES_FORWARD, "sqlite": SQLITE_FORWARD}),
+            _run({"postgresql": POSTGRES_REVERSE, "sqlite": SQLITE_REVERSE}),
+        ),
+    ]
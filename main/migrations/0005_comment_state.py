@@ -0,0 +1,48 @@
+# Generated by Django 4.2.26 on 2026-10-19 06:14
+
+import django.db.models.manager
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0004_project_search_index"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="comment",
+            options={
+                "default_manager_name": "all_objects",
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.AlterModelManagers(
+            name="comment",
+            managers=[
+                ("all_objects", django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="state",
+            field=models.CharField(
+                choices=[
+                    ("visible", "Visible"),
+                    ("hidden", "Hidden"),
+                    ("deleted", "Deleted"),
+                ],
+                default="visible",
+                max_length=10,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                condition=models.Q(("state", "visible")),
+                fields=["project", "-created_at"],
+                name="main_comment_visible_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.26 on 2026-10-19 06:21
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def backfill_author_keys(apps, schema_editor):
+    # Frozen copy of main.models.make_author_key
+    def make_author_key(email, name):
+        if email:
+            value = "email:" + email.strip().lower()
+        elif name:
+            value = "name:" + name.strip()
+        else:
+            return ""
+        return hashlib.sha256(value.encode()).hexdigest()
+
+    Comment = apps.get_model("main", "Comment")
+    db_alias = schema_editor.connection.alias
+    comments = (
+        Comment._base_manager.using(db_alias)
+        .filter(user__isnull=True)
+        .only("author_email", "author_name")
+    )
+    batch = []
+    for comment in comments.iterator(chunk_size=1000):
+        comment.author_key = make_author_key(comment.author_email, comment.author_name)
+        batch.append(comment)
+        if len(batch) >= 1000:
+            Comment._base_manager.using(db_alias).bulk_update(batch, ["author_key"])
+            batch = []
+    Comment._base_manager.using(db_alias).bulk_update(batch, ["author_key"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0005_comment_state"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comment",
+            name="author_key",
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.RunPython(backfill_author_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["author_key", "-created_at"],
+                name="main_commen_author__2c754d_idx",
+            ),
+        ),
+    ]
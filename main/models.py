@@ -1,5 +1,8 @@
+import hashlib
+
 from django.conf import settings
 from django.db import models
+from django.db.models import Q
 from django.utils import timezone
 
 
@@ -44,7 +47,36 @@ class Profile(models.Model):
         return self.display_name or self.user.get_username()
 
 
+def make_author_key(email="", name=""):
+    """
+    Stable, indexable identity for comments written through sheet/session
+    auth: a hash of the normalised email, or of the name when there is none.
+    """
+    if email:
+        value = "email:" + email.strip().lower()
+    elif name:
+        value = "name:" + name.strip()
+    else:
+        return ""
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+class VisibleCommentManager(models.Manager):
+    """
+    Only comments in the visible moderation state. Used for every public
+    listing; served by the partial index on (project, -created_at).
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(state=Comment.State.VISIBLE)
+
+
 class Comment(models.Model):
+    class State(models.TextChoices):
+        VISIBLE = "visible", "Visible"
+        HIDDEN = "hidden", "Hidden"
+        DELETED = "deleted", "Deleted"
+
     project = models.ForeignKey(
         Project, on_delete=models.CASCADE, related_name="comments"
     )
@@ -62,17 +94,47 @@ class Comment(models.Model):
     # NEW: more reliable ownership match for session/sheet users
     author_email = models.EmailField(blank=True)
 
+    # make_author_key(author_email, author_name) for session/sheet comments;
+    # lets ownership checks and "my comments" run as indexed lookups
+    author_key = models.CharField(max_length=64, blank=True, editable=False)
+
     content = models.TextField()
 
+    # Moderation: hidden/deleted comments are kept but never listed publicly
+    state = models.CharField(
+        max_length=10, choices=State.choices, default=State.VISIBLE
+    )
+
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # `all_objects` stays the default manager so admin/moderation see every
+    # state; `objects` is the visible-only manager used by public views.
+    all_objects = models.Manager()
+    objects = VisibleCommentManager()
+
     class Meta:
         ordering = ["-created_at"]
+        default_manager_name = "all_objects"
         indexes = [
             models.Index(fields=["project", "-created_at"]),
+            models.Index(
+                fields=["project", "-created_at"],
+                name="main_comment_visible_idx",
+                condition=Q(state="visible"),
+            ),
+            models.Index(fields=["author_key", "-created_at"]),
         ]
 
+    def save(self, *args, **kwargs):
+        if self.user_id:
+            self.author_key = ""
+        else:
+            self.author_key = make_author_key(self.author_email, self.author_name)
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "author_key"}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         who = self.user if self.user else (self.author_name or "Anon")
         return f"Comment by {who} on {self.project}"
@@ -82,3 +144,50 @@ class Comment(models.Model):
 # To create a model, include `models.Model` in parentheses so the class
 # defines a Django model. Then add fields via dot-notation: e.g. `title`,
 # `TextField`, etc.
+
+
+class ContactMessage(models.Model):
+    """
+    A contact-form submission queued for delivery by the
+    `deliver_contact_messages` worker (see main/contact_delivery.py).
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        SENT = "sent", "Sent"
+        FAILED = "failed", "Failed"
+
+    name = models.CharField(max_length=100)
+    email = models.EmailField()
+    subject = models.CharField(max_length=200)
+    message = models.TextField()
+
+    # Hash of sender + subject + message + time window (contact_delivery);
+    # resubmissions within the window are dropped on insert
+    content_hash = models.CharField(max_length=64, unique=True, editable=False)
+
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            # The worker's queue scan
+            models.Index(
+                fields=["next_attempt_at"],
+                name="main_contact_pending_idx",
+                condition=Q(status="pending"),
+            ),
+            # Per-sender throttling looks at recent deliveries
+            models.Index(fields=["email", "-sent_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} from {self.email} ({self.status})"
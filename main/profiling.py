@@ -0,0 +1,188 @@
+"""
+Opt-in sampling profiler for live workers.
+
+With `settings.SAMPLING_PROFILER` on, staff start a profiling session from
+/_profiler/ (views.profiler) lasting N seconds and covering a percentage
+of requests. main.middleware.ProfilerMiddleware registers the thread
+running each sampled request's view; a background thread per worker takes
+a stack sample of the registered threads every SAMPLING_PROFILER_INTERVAL
+seconds. When the request ends its samples are merged into a per-view
+table of collapsed stacks in the cache, which views.profiler serves in the
+folded format read by flamegraph.pl, speedscope and inferno.
+
+Sessions and samples are only as shared as the cache: with the
+local-memory fallback (no REDIS_URL) a session started from /_profiler/
+runs, and is reported, on the worker that served that request alone, so
+profile a single worker. With Redis every worker contributes, but merging
+is read-modify-write, so concurrent requests can drop each other's
+samples: stack proportions hold, absolute counts are approximate.
+
+Off (the default), the middleware is dropped from the stack. On but idle,
+a request costs a cache lookup of the session at most once a second per
+worker.
+"""
+
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+
+SESSION_KEY = "profiler:session"
+VIEWS_KEY = "profiler:views"
+STACKS_KEY = "profiler:stacks:{}"
+
+MAX_DEPTH = 128
+SESSION_CHECK_SECONDS = 1.0
+
+_session_memo = [0.0, None]  # [checked at, session]
+
+
+def start_session(seconds, percent=100.0):
+    """
+    Sample `percent` of requests for the next `seconds` (capped by
+    SAMPLING_PROFILER_MAX_SECONDS) on every worker.
+    """
+    seconds = min(seconds, getattr(settings, "SAMPLING_PROFILER_MAX_SECONDS", 600))
+    session = {"until": time.time() + seconds, "percent": percent}
+    cache.set(SESSION_KEY, session, timeout=int(seconds) + 1)
+    _session_memo[:] = [0.0, None]
+    return session
+
+
+def stop_session():
+    cache.delete(SESSION_KEY)
+    _session_memo[:] = [0.0, None]
+
+
+def current_session():
+    """
+    The running session, re-read from the cache at most once a second.
+    """
+    now = time.monotonic()
+    if now - _session_memo[0] >= SESSION_CHECK_SECONDS:
+        _session_memo[:] = [now, cache.get(SESSION_KEY)]
+    session = _session_memo[1]
+    if session and session["until"] > time.time():
+        return session
+    return None
+
+
+def should_sample():
+    session = current_session()
+    return bool(session) and random.random() * 100 < session["percent"]
+
+
+def fold(frame):
+    """
+    Collapsed stack of `frame`, root first: "module:function;module:function".
+    """
+    names = []
+    while frame is not None and len(names) < MAX_DEPTH:
+        code = frame.f_code
+        names.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class Sampler:
+    """
+    Samples the stacks of registered threads from one daemon thread, which
+    runs only while something is registered.
+    """
+
+    def __init__(self, interval=None, background=True):
+        self.interval = interval
+        self.background = background  # False: call sample() yourself
+        self._lock = threading.Lock()
+        self._targets = {}  # thread id -> Counter of folded stacks
+        self._thread = None
+
+    def register(self, thread_id):
+        counter = Counter()
+        with self._lock:
+            self._targets[thread_id] = counter
+            if self.background and self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="sampling-profiler", daemon=True
+                )
+                self._thread.start()
+        return counter
+
+    def unregister(self, thread_id):
+        with self._lock:
+            return self._targets.pop(thread_id, Counter())
+
+    def sample(self):
+        """
+        Take one sample of every registered thread; False (and the sampling
+        thread, if running, stops) once nothing is registered.
+        """
+        frames = sys._current_frames()
+        with self._lock:
+            if not self._targets:
+                self._thread = None
+                return False
+            for thread_id, counter in self._targets.items():
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    counter[fold(frame)] += 1
+        return True
+
+    def _run(self):
+        interval = self.interval or getattr(
+            settings, "SAMPLING_PROFILER_INTERVAL", 0.005
+        )
+        while True:
+            time.sleep(interval)
+            if not self.sample():
+                return
+
+
+sampler = Sampler()
+
+
+def record(view, samples):
+    """
+    Merge one request's `samples` (folded stack -> count) into the cache.
+    """
+    if not samples:
+        return
+    timeout = getattr(settings, "SAMPLING_PROFILER_RETENTION", 24 * 3600)
+    key = STACKS_KEY.format(view)
+    stacks = Counter(cache.get(key, {}))
+    stacks.update(samples)
+    cache.set(key, dict(stacks), timeout)
+    views = cache.get(VIEWS_KEY, set())
+    if view not in views:
+        cache.set(VIEWS_KEY, views | {view}, timeout)
+
+
+def samples_per_view():
+    views = cache.get(VIEWS_KEY, set())
+    stacks = cache.get_many([STACKS_KEY.format(v) for v in views])
+    return {
+        key[len(STACKS_KEY.format("")) :]: sum(counts.values())
+        for key, counts in stacks.items()
+    }
+
+
+def folded(view=None):
+    """
+    Collapsed-stack text ("stack count" per line) for `view`, or for every
+    view with the view name as the root frame.
+    """
+    views = [view] if view else sorted(cache.get(VIEWS_KEY, set()))
+    lines = []
+    for name in views:
+        for stack, count in sorted(cache.get(STACKS_KEY.format(name), {}).items()):
+            lines.append(f"{stack if view else f'{name};{stack}'} {count}")
+    return "\n".join(lines) + ("\n" if lines else "")
+
+
+def clear():
+    views = cache.get(VIEWS_KEY, set())
+    cache.delete_many([STACKS_KEY.format(v) for v in views] + [VIEWS_KEY])
@@ -0,0 +1,48 @@
+"""
+Primary/replica routing: reads go to the "replica" alias when it is
+configured (DATABASE_REPLICA_URL), writes always go to "default".
+
+Per-request state lives in context variables managed by
+main.middleware.ReplicaRoutingMiddleware:
+- `use_primary`: read from the primary. True outside requests (shell,
+  management commands, migrations); the middleware clears it for safe
+  requests from browsers that have not written recently.
+- `wrote`: set by the router on writes to app data so the middleware can
+  pin the browser to the primary (read-your-writes). Session and auth
+  bookkeeping writes (UNPINNED_APPS) don't count: they happen on plain page
+  views, and pinning on them would send almost every signed-in read to the
+  primary.
+"""
+
+from contextvars import ContextVar
+
+from django.conf import settings
+
+REPLICA_ALIAS = "replica"
+UNPINNED_APPS = frozenset({"sessions", "auth"})
+
+use_primary = ContextVar("use_primary", default=True)
+wrote = ContextVar("wrote", default=False)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if use_primary.get() or wrote.get() or not replica_configured():
+            return "default"
+        return REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label not in UNPINNED_APPS:
+            wrote.set(True)
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica is a copy of the primary, so objects from either relate.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
@@ -0,0 +1,72 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Project
+
+# Number of projects returned per page by the search endpoint
+SEARCH_PAGE_SIZE = 12
+
+WORD_RE = re.compile(r"\w+")
+
+
+def _fts_match(query):
+    """
+    Turn free text into a safe FTS5 MATCH expression: every word is quoted
+    (so FTS operators in user input are ignored) and prefix-matched.
+    """
+    return " ".join(f'"{word}"*' for word in WORD_RE.findall(query))
+
+
+def _text_filter(query):
+    """
+    Build the title/description/tag-name filter for `query`.
+
+    - SQLite: title/description go through the main_project_fts FTS5 table,
+      which matches whole words by prefix: "coff" finds "Coffee shop" but
+      "offee" finds nothing, unlike a substring search. Every word of the
+      query must match.
+    - Postgres (and anything else): `icontains` on the whole query as one
+      substring, which the pg_trgm GIN indexes from migration 0004 serve.
+    Tag names are matched with a subquery on the m2m table, so no join
+    (and no DISTINCT) is needed on the project query.
+    """
+    tagged = Project.tags.through.objects.filter(tag__name__icontains=query).values(
+        "project_id"
+    )
+    by_tag = Q(pk__in=tagged)
+
+    if connection.vendor == "sqlite":
+        match = _fts_match(query)
+        if not match:
+            return by_tag
+        fts_ids = RawSQL(
+            "SELECT rowid FROM main_project_fts WHERE main_project_fts MATCH %s",
+            (match,),
+        )
+        return Q(pk__in=fts_ids) | by_tag
+
+    return Q(title__icontains=query) | Q(description__icontains=query) | by_tag
+
+
+def search_projects(query="", tag=""):
+    """
+    Return projects matching free-text `query` and/or exact tag name `tag`,
+    ordered by title so pagination is stable.
+    """
+    projects = Project.objects.all()
+    query = query.strip()
+    tag = tag.strip()
+
+    if tag:
+        projects = projects.filter(
+            pk__in=Project.tags.through.objects.filter(tag__name__iexact=tag).values(
+                "project_id"
+            )
+        )
+    if query:
+        projects = projects.filter(_text_filter(query))
+
+    return projects.order_by("title", "pk")
@@ -0,0 +1,75 @@
+"""
+Synthetic data for load tests and local work: tags, projects with
+comments, Django users and sheet-auth users (in the in-memory sheet from
+main.sheets).
+"""
+
+import random
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from .models import Comment, Profile, Project, Tag
+from .sheets import memory_users_sheet
+
+SEED_PASSWORD = "load-test-password"
+TAG_NAMES = ("django", "python", "javascript", "css", "postgres", "api", "ui")
+
+
+def seed(projects=20, comments=10, users=20, sheet_users=5, rng=None):
+    """
+    Create the data and return what scenarios need to act on it:
+    project ids, usernames and sheet-user emails (all with SEED_PASSWORD).
+    """
+    rng = rng or random.Random(0)
+    # One hash for everyone: make_password is deliberately slow
+    password = make_password(SEED_PASSWORD)
+
+    Tag.objects.bulk_create([Tag(name=n) for n in TAG_NAMES], ignore_conflicts=True)
+    tags = list(Tag.objects.filter(name__in=TAG_NAMES))
+    project_objs = Project.objects.bulk_create(
+        [
+            Project(title=f"Load test project {i}", description="Seeded. " * 20)
+            for i in range(projects)
+        ]
+    )
+    Through = Project.tags.through
+    Through.objects.bulk_create(
+        [
+            Through(project_id=p.pk, tag_id=tag.pk)
+            for p in project_objs
+            for tag in rng.sample(tags, 2)
+        ]
+    )
+
+    User = get_user_model()
+    usernames = [f"loadtest{i}" for i in range(users)]
+    User.objects.bulk_create(
+        [User(username=name, password=password) for name in usernames]
+    )
+    user_objs = list(User.objects.filter(username__in=usernames))
+    Profile.objects.bulk_create([Profile(user=u) for u in user_objs])
+
+    Comment.objects.bulk_create(
+        [
+            Comment(project=p, user=rng.choice(user_objs), content=f"Seed comment {n}")
+            for p in project_objs
+            for n in range(comments)
+        ]
+    )
+
+    from .views import USER_SHEET_HEADERS
+
+    joined = timezone.now().strftime("%Y-%m-%d %H:%M:%S")
+    emails = [f"sheet{i}@example.com" for i in range(sheet_users)]
+    memory_users_sheet().reset(
+        USER_SHEET_HEADERS,
+        [[email.split("@")[0], email, joined, password] for email in emails],
+    )
+
+    return {
+        "projects": [p.pk for p in project_objs],
+        "usernames": usernames,
+        "sheet_emails": emails,
+    }
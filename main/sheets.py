@@ -0,0 +1,77 @@
+"""
+Google Sheet user store behind the sheet-based auth views.
+
+gspread (and google-auth/requests under it) costs a few hundred
+milliseconds to import, and only `auth_register`/`auth_login` need it, so
+it is imported on first use instead of at worker boot, in every management
+command and in the test run. `manage.py profile_startup` keeps an eye on
+this.
+
+The worksheet source is pluggable through `settings.USER_SHEET_BACKEND`
+(dotted path to a function returning an object with gspread's
+`get_all_records(expected_headers=...)` and `append_row(row)`);
+"main.sheets.memory_users_sheet" keeps users in process memory, for load
+tests and local work without Google credentials.
+"""
+
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+DEFAULT_BACKEND = "main.sheets.google_users_sheet"
+USERS_WORKSHEET = "user"
+
+
+def google_users_sheet():
+    """
+    The "user" worksheet of GOOGLE_SHEET_ID, via the service account.
+    """
+    import gspread  # deferred; see the module docstring
+
+    if getattr(settings, "GOOGLE_CREDS_DICT", None):
+        gc = gspread.service_account_from_dict(settings.GOOGLE_CREDS_DICT)
+    else:
+        gc = gspread.service_account(filename=settings.GOOGLE_SERVICE_ACCOUNT_FILE)
+
+    return gc.open_by_key(settings.GOOGLE_SHEET_ID).worksheet(USERS_WORKSHEET)
+
+
+def get_users_sheet():
+    """
+    Return the worksheet holding sheet-auth users.
+    """
+    path = getattr(settings, "USER_SHEET_BACKEND", DEFAULT_BACKEND)
+    return import_string(path)()
+
+
+class InMemoryUsersSheet:
+    """
+    Stand-in for the gspread worksheet; rows live in this process only.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.headers = None
+        self.rows = []
+
+    def get_all_records(self, expected_headers=None):
+        with self._lock:
+            headers = self.headers or expected_headers or []
+            return [dict(zip(headers, row, strict=False)) for row in self.rows]
+
+    def append_row(self, row):
+        with self._lock:
+            self.rows.append(list(row))
+
+    def reset(self, headers, rows=()):
+        with self._lock:
+            self.headers = list(headers)
+            self.rows = [list(row) for row in rows]
+
+
+_memory_sheet = InMemoryUsersSheet()
+
+
+def memory_users_sheet():
+    return _memory_sheet
@@ -1,12 +1,54 @@
 # main/signals.py
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 
-from .models import Profile
+from .models import Comment, Profile, Project, ProjectImage, Tag
+from .snapshots import invalidate_project_snapshots
+from .tag_index import invalidate_tag_index
 
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
 def create_profile(sender, instance, created, **kwargs):
     if created:
         Profile.objects.create(user=instance)
+
+
+# Keep the cached tag -> projects index and project snapshots
+# (main.snapshots) in step with their sources.
+@receiver(m2m_changed, sender=Project.tags.through)
+def project_tags_changed(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        invalidate_tag_index()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Project)
+def tag_or_project_changed(sender, **kwargs):
+    # Deleting a project/tag removes m2m rows without an m2m_changed signal.
+    invalidate_tag_index()
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def project_changed(sender, instance, **kwargs):
+    invalidate_project_snapshots([instance.pk])
+
+
+@receiver(post_save, sender=ProjectImage)
+@receiver(post_delete, sender=ProjectImage)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def project_content_changed(sender, instance, **kwargs):
+    invalidate_project_snapshots([instance.project_id])
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def username_changed(sender, instance, created, update_fields, **kwargs):
+    # Snapshots show comment authors' usernames; logins only touch last_login
+    if created or (update_fields is not None and "username" not in update_fields):
+        return
+    invalidate_project_snapshots(
+        Comment.objects.filter(user=instance).values_list("project_id", flat=True)
+    )
@@ -0,0 +1,181 @@
+"""
+Slow-query log.
+
+Every database connection gets an execute wrapper (installed on
+`connection_created`) that times each query. Queries slower than
+`settings.SLOW_QUERY_MS` are:
+- logged on the "main.slow_queries" logger with their duration and the view
+  that ran them (set per request by main.middleware.SlowQueryMiddleware)
+- aggregated in the cache by fingerprint (the SQL with literals and
+  parameters stripped): count, total/max time and the views involved
+- the first time a fingerprint is seen, EXPLAINed on SQLite/Postgres when
+  SLOW_QUERY_EXPLAIN is on, so a full scan where an index was expected
+  shows up next to the query
+
+`manage.py slow_queries` prints the aggregate. It needs a cache shared by
+every process (settings.CACHE_IS_SHARED, i.e. Redis): the local-memory
+fallback only holds what the current process recorded. Cache updates are
+read-modify-write, so counts are approximate under concurrency.
+"""
+
+import hashlib
+import logging
+import re
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+INDEX_KEY = "slowq:index"
+ENTRY_KEY = "slowq:{}"
+MAX_SQL_CHARS = 2000
+
+EXPLAIN_PREFIXES = {"sqlite": "EXPLAIN QUERY PLAN ", "postgresql": "EXPLAIN "}
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+PARAM_RE = re.compile(r"%s|\?")
+IN_LIST_RE = re.compile(r"\bIN \((?:\s*\?\s*,?)+\)", re.I)
+SPACE_RE = re.compile(r"\s+")
+
+
+class Origin:
+    """
+    Where queries of the current request come from; the view name is
+    filled in once the URL is resolved.
+    """
+
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.view = None
+
+    def __str__(self):
+        return self.view or f"{self.method} {self.path}"
+
+
+current_origin = ContextVar("slow_query_origin", default=None)
+_explaining = ContextVar("slow_query_explaining", default=False)
+
+
+def threshold_ms():
+    """
+    SLOW_QUERY_MS, or None when slow-query logging is off.
+    """
+    return getattr(settings, "SLOW_QUERY_MS", None)
+
+
+def normalize(sql):
+    sql = STRING_RE.sub("?", sql)
+    sql = NUMBER_RE.sub("?", sql)
+    sql = PARAM_RE.sub("?", sql)
+    sql = IN_LIST_RE.sub("IN (...)", sql)
+    return SPACE_RE.sub(" ", sql).strip()
+
+
+def fingerprint(sql):
+    return hashlib.sha1(normalize(sql).encode("utf-8")).hexdigest()[:16]
+
+
+def explain(connection, sql, params):
+    """
+    The query plan of `sql` as text, or None if unsupported or failing.
+    Runs in its own savepoint: on Postgres a failed statement would
+    otherwise abort the surrounding transaction.
+    """
+    prefix = EXPLAIN_PREFIXES.get(connection.vendor)
+    if not prefix or not sql.lstrip().upper().startswith("SELECT"):
+        return None
+    token = _explaining.set(True)
+    try:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            return "\n".join(" ".join(map(str, row)) for row in cursor.fetchall())
+    except Exception:
+        logger.debug("EXPLAIN failed", exc_info=True)
+        return None
+    finally:
+        _explaining.reset(token)
+
+
+def record(sql, duration_ms, origin, connection=None, params=None):
+    """
+    Log one slow query and fold it into the cached aggregate.
+    """
+    fp = fingerprint(sql)
+    view = str(origin) if origin else "(no request)"
+    logger.warning("Slow query %.1f ms in %s [%s]: %s", duration_ms, view, fp, sql)
+
+    timeout = getattr(settings, "SLOW_QUERY_RETENTION", 7 * 24 * 3600)
+    key = ENTRY_KEY.format(fp)
+    entry = cache.get(key)
+    if entry is None:
+        entry = {
+            "sql": normalize(sql)[:MAX_SQL_CHARS],
+            "count": 0,
+            "total_ms": 0.0,
+            "max_ms": 0.0,
+            "views": {},
+            "explain": None,
+        }
+        if connection is not None and getattr(settings, "SLOW_QUERY_EXPLAIN", False):
+            entry["explain"] = explain(connection, sql, params)
+        index = cache.get(INDEX_KEY, set())
+        index.add(fp)
+        cache.set(INDEX_KEY, index, timeout)
+    entry["count"] += 1
+    entry["total_ms"] += duration_ms
+    entry["max_ms"] = max(entry["max_ms"], duration_ms)
+    entry["views"][view] = entry["views"].get(view, 0) + 1
+    cache.set(key, entry, timeout)
+
+
+def aggregated():
+    """
+    {fingerprint: entry} for every slow query still in the cache.
+    """
+    index = cache.get(INDEX_KEY, set())
+    entries = cache.get_many([ENTRY_KEY.format(fp) for fp in index])
+    return {key.split(":", 1)[1]: entry for key, entry in entries.items()}
+
+
+def clear():
+    cache.delete_many([ENTRY_KEY.format(fp) for fp in cache.get(INDEX_KEY, set())])
+    cache.delete(INDEX_KEY)
+
+
+def timed_execute(execute, sql, params, many, context):
+    """
+    Execute wrapper timing each query; see the module docstring.
+    """
+    limit = threshold_ms()
+    if limit is None or _explaining.get():
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration_ms = (time.perf_counter() - start) * 1000
+    if duration_ms >= limit:
+        try:
+            record(
+                sql,
+                duration_ms,
+                current_origin.get(),
+                None if many else context["connection"],
+                params,
+            )
+        except Exception:  # never let logging break the query
+            logger.exception("Recording a slow query failed")
+    return result
+
+
+@receiver(connection_created)
+def install_timer(sender, connection, **kwargs):
+    # Fires on every (re)connect of the same wrapper object
+    if timed_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(timed_execute)
@@ -0,0 +1,111 @@
+"""
+Denormalized per-project snapshots for the project page and the comments
+partial: the project's fields, images and visible comments (with their
+authors' usernames), read from the primary in three queries and cached
+for PROJECT_SNAPSHOT_TIMEOUT seconds or until main.signals drops them.
+With a warm snapshot those views render without touching the database.
+
+Signals only reach the cache of the process that made the change, so
+with the per-process local-memory cache (no REDIS_URL) other workers can
+serve a snapshot up to PROJECT_SNAPSHOT_TIMEOUT seconds old.
+
+Projects with more than PROJECT_SNAPSHOT_COMMENTS visible comments leave
+their comments out (`comments` is None) and the views query them as
+before, streamed below the fold on the project page.
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Comment, Project, ProjectImage
+
+SNAPSHOT_CACHE_KEY = "project_snapshot:v1:{}"
+
+PROJECT_FIELDS = ("id", "title", "description", "link", "github_url")
+COMMENT_FIELDS = (
+    "id",
+    "user_id",
+    "user__username",
+    "author_name",
+    "author_key",
+    "content",
+    "created_at",
+)
+
+
+def build_snapshot(project_id):
+    """
+    The snapshot of `project_id` as plain data; raises Project.DoesNotExist.
+    Read from the primary, so a lagging replica is never cached.
+    """
+    project = (
+        Project.objects.using("default").values(*PROJECT_FIELDS).get(pk=project_id)
+    )
+    limit = getattr(settings, "PROJECT_SNAPSHOT_COMMENTS", 100)
+    comments = list(
+        Comment.objects.using("default")
+        .filter(project_id=project_id)
+        .order_by("-created_at")
+        .values(*COMMENT_FIELDS)[: limit + 1]
+    )
+    return {
+        "project": project,
+        "images": list(
+            ProjectImage.objects.using("default")
+            .filter(project_id=project_id)
+            .order_by("pk")
+            .values_list("pk", "image")
+        ),
+        "comments": comments if len(comments) <= limit else None,
+    }
+
+
+class ProjectSnapshot:
+    """
+    Unsaved model instances rebuilt from snapshot data, for templates and
+    Viewer permission checks.
+    """
+
+    def __init__(self, data):
+        self.project = Project(**data["project"])
+        self.images = [
+            ProjectImage(pk=pk, project=self.project, image=name)
+            for pk, name in data["images"]
+        ]
+        self.comments = (
+            None
+            if data["comments"] is None
+            else [self._comment(row) for row in data["comments"]]
+        )
+
+    def _comment(self, row):
+        row = dict(row)
+        user_id, username = row.pop("user_id"), row.pop("user__username")
+        user = get_user_model()(pk=user_id, username=username) if user_id else None
+        return Comment(project=self.project, user=user, **row)
+
+
+def get_project_snapshot(project_id):
+    """
+    Return the cached snapshot, building it on a cache miss.
+    """
+    data = cache.get(SNAPSHOT_CACHE_KEY.format(project_id))
+    if data is None:
+        data = build_snapshot(project_id)
+        timeout = getattr(settings, "PROJECT_SNAPSHOT_TIMEOUT", 300)
+        cache.set(SNAPSHOT_CACHE_KEY.format(project_id), data, timeout)
+    return ProjectSnapshot(data)
+
+
+def invalidate_project_snapshots(project_ids):
+    """
+    Drop the snapshots of `project_ids` now, and again once the surrounding
+    transaction commits (a read in between caches the old state). The next
+    read rebuilds them.
+    """
+    keys = [SNAPSHOT_CACHE_KEY.format(pk) for pk in set(project_ids)]
+    if keys:
+        cache.delete_many(keys)
+        transaction.on_commit(lambda: cache.delete_many(keys))
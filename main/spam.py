@@ -0,0 +1,105 @@
+"""
+Cheap spam/abuse checks run on comment and contact submissions before
+anything is written.
+
+`check_submission` tries, in order of cost:
+- the honeypot field (HONEYPOT_FIELD, hidden from people by
+  partials/honeypot.html) being filled in
+- more than SPAM_MAX_LINKS links in the text
+- more than SPAM_RATE_LIMIT submissions per SPAM_RATE_WINDOW seconds from
+  one identity (signed-in viewer, else client IP)
+- the same text already submitted within SPAM_DUPLICATE_WINDOW seconds
+
+Counters and fingerprints live in the cache, so a rejection costs a
+couple of cache round-trips at most and never a query.
+"""
+
+import hashlib
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+
+HONEYPOT_FIELD = "website"
+
+# Texts shorter than this are common ("Nice work!"), so their fingerprint
+# is per identity rather than site-wide
+SHORT_TEXT = 40
+
+LINK_RE = re.compile(r"https?://|www\.|\[url", re.I)
+NORMALIZE_RE = re.compile(r"\W+")
+
+HONEYPOT = "honeypot"
+LINKS = "links"
+RATE = "rate"
+DUPLICATE = "duplicate"
+
+MESSAGES = {
+    HONEYPOT: "Submission rejected.",
+    LINKS: "Please include fewer links.",
+    RATE: "You're posting too quickly. Please wait a minute and try again.",
+    DUPLICATE: "That message was already submitted.",
+}
+
+
+def status_for(reason):
+    return 429 if reason == RATE else 400
+
+
+def client_ip(request):
+    return request.META.get("REMOTE_ADDR", "unknown")
+
+
+def fingerprint(text):
+    """
+    Hash of `text` ignoring case, whitespace and punctuation, so trivial
+    variations of a spam message collide.
+    """
+    normalized = NORMALIZE_RE.sub(" ", text.lower()).strip()
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def _key(*parts):
+    return "spam:" + ":".join(parts)
+
+
+def _over_rate(scope, identity):
+    key = _key("rate", scope, hashlib.sha1(identity.encode()).hexdigest())
+    window = getattr(settings, "SPAM_RATE_WINDOW", 60)
+    cache.add(key, 0, timeout=window)  # fixed window starting at the first post
+    try:
+        count = cache.incr(key)
+    except ValueError:  # expired between add() and incr()
+        cache.set(key, 1, timeout=window)
+        count = 1
+    return count > getattr(settings, "SPAM_RATE_LIMIT", 5)
+
+
+def _seen(scope, identity, text):
+    parts = ["dup", scope, fingerprint(text)]
+    if len(text) < SHORT_TEXT:
+        parts.append(hashlib.sha1(identity.encode()).hexdigest())
+    # add() is atomic: only the first of concurrent identical posts passes
+    window = getattr(settings, "SPAM_DUPLICATE_WINDOW", 3600)
+    return not cache.add(_key(*parts), 1, timeout=window)
+
+
+def honeypot_filled(request):
+    return bool(request.POST.get(HONEYPOT_FIELD))
+
+
+def check_submission(request, scope, text, identity=None):
+    """
+    Reason (one of MESSAGES) to reject `text` posted to `scope` ("comment",
+    "contact"), or None to accept it. `identity` defaults to the client IP.
+    """
+    if honeypot_filled(request):
+        return HONEYPOT
+    if len(LINK_RE.findall(text)) > getattr(settings, "SPAM_MAX_LINKS", 2):
+        return LINKS
+    identity = identity or client_ip(request)
+    if _over_rate(scope, identity):
+        return RATE
+    if _seen(scope, identity, text):
+        return DUPLICATE
+    return None
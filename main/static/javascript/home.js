@@ -305,9 +305,14 @@ function wireCommentsModal(rootEl) {
         headers: headers,
         credentials: "same-origin",
       })
-        .then((res) => res.text())
-        .then((html) => {
-          modalBody.innerHTML = html;
+        .then((res) => res.text().then((text) => ({ ok: res.ok, text })))
+        .then(({ ok, text }) => {
+          if (!ok) {
+            // Rejected by the spam filter: keep the modal, show the reason
+            alert(text || "Could not post comment.");
+            return;
+          }
+          modalBody.innerHTML = text;
           wireCommentsModal(modalBody); // re-wire new DOM
         })
         .catch(() => {
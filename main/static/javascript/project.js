@@ -1,8 +1,32 @@
 let slideIndex = 1;
-showSlides(slideIndex)
+showSlides(slideIndex, false)
 
-function showSlides(n) {
+// Slides after the first are rendered with data-src, so only the slide on
+// screen and its neighbours are ever downloaded.
+function loadSlide(slide) {
+    const img = slide && slide.querySelector("img[data-src]");
+    if (img) {
+        img.src = img.dataset.src;
+        img.removeAttribute("data-src");
+    }
+}
+
+// Fetch the next and previous slides so the next click is instant.
+function warmNeighbours() {
+    let slides = document.getElementsByClassName("carousel-item")
+    if (!slides.length) {
+        return
+    }
+    loadSlide(slides[slideIndex % slides.length])
+    loadSlide(slides[(slideIndex - 2 + slides.length) % slides.length])
+}
+
+function showSlides(n, warm = true) {
     let slides = document.getElementsByClassName("carousel-item") // Collect all div's related.
+    if (!slides.length) {
+        return
+    }
+    slideIndex = n
     // As n hits no. of images, we go back to first.
     if (n > slides.length) {
         slideIndex = 1
@@ -18,4 +42,20 @@ function showSlides(n) {
         slides[i].style.display = "none"
     }
     slides[slideIndex - 1].style.display = "flex"
-}
\ No newline at end of file
+    loadSlide(slides[slideIndex - 1])
+    if (warm) {
+        warmNeighbours()
+    }
+}
+
+function moveSlide(n) {
+    showSlides(slideIndex += n)
+}
+
+// Neighbours of the first slide wait until the page itself has loaded.
+window.addEventListener("load", warmNeighbours)
+
+// Export for tests
+if (typeof module !== "undefined" && module.exports) {
+  module.exports = { showSlides, moveSlide };
+}
@@ -0,0 +1,42 @@
+/**
+ * @jest-environment jsdom
+ */
+const { showSlides, moveSlide } = require('../project');
+
+describe('carousel lazy loading', () => {
+  beforeEach(() => {
+    document.body.innerHTML = `
+      <div class="carousel-item"><img src="/1.png"></div>
+      <div class="carousel-item" style="display: none"><img data-src="/2.png"></div>
+      <div class="carousel-item" style="display: none"><img data-src="/3.png"></div>
+      <div class="carousel-item" style="display: none"><img data-src="/4.png"></div>
+      <div class="carousel-item" style="display: none"><img data-src="/5.png"></div>
+    `;
+  });
+
+  const loaded = () =>
+    Array.from(document.querySelectorAll('.carousel-item img'))
+      .filter((img) => img.hasAttribute('src'))
+      .map((img) => img.getAttribute('src'));
+
+  it('fetches nothing beyond the first slide on first render', () => {
+    showSlides(1, false);
+
+    expect(loaded()).toEqual(['/1.png']);
+  });
+
+  it('loads the shown slide and its neighbours only', () => {
+    showSlides(1, false);
+    moveSlide(1);
+
+    expect(loaded()).toEqual(['/1.png', '/2.png', '/3.png']);
+    expect(document.querySelectorAll('.carousel-item')[1].style.display).toBe('flex');
+  });
+
+  it('wraps around to the last slide', () => {
+    showSlides(1, false);
+    moveSlide(-1);
+
+    expect(loaded()).toEqual(['/1.png', '/4.png', '/5.png']);
+  });
+});
@@ -0,0 +1,32 @@
+from django.core.files.base import ContentFile
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+from .assets import build_bundles, build_critical_css
+
+
+class BundledManifestStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """
+    WhiteNoise's hashed + compressed storage that first writes the bundles
+    and critical CSS from main.assets, so they are hashed, compressed and
+    listed in the manifest like any collected file.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            bundles = build_bundles(self._reader(paths))
+            built = {**bundles, **build_critical_css(bundles)}
+            for name, content in built.items():
+                if self.exists(name):
+                    self.delete(name)
+                self._save(name, ContentFile(content.encode("utf-8")))
+                paths[name] = (self, name)
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+
+    @staticmethod
+    def _reader(paths):
+        def read(name):
+            storage, path = paths[name]
+            with storage.open(path) as f:
+                return f.read().decode("utf-8")
+
+        return read
@@ -0,0 +1,94 @@
+"""
+Chunked template rendering for StreamingHttpResponse.
+
+A template marks the points where the response may be sent so far with
+{% flush %} (the `streaming` tag library), at its top level.
+`render_streaming` renders everything before the first flush inside the
+view, like a normal render, so whatever response middleware depends on
+(messages marked as read, the session, CSRF cookie) is settled before the
+middleware runs. The rest is rendered a chunk at a time while the body is
+being sent; context values only used below a flush can be lazy
+(SimpleLazyObject) so their queries wait until the top of the page is out.
+
+Under ASGI the chunks are rendered by sync_to_async on the thread that ran
+the view, so they share its database connection; a sync iterator would
+otherwise be read to the end before a byte went out.
+"""
+
+import copy
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.template import NodeList
+from django.template.context import make_context
+from django.template.loader import get_template
+
+from .templatetags.streaming import FlushNode
+
+
+def _segments(template):
+    segment = NodeList()
+    for node in template.nodelist:
+        if isinstance(node, FlushNode):
+            yield segment
+            segment = NodeList()
+        else:
+            segment.append(node)
+    yield segment
+
+
+def _render_chunks(template, context):
+    with context.render_context.push_state(template):
+        with context.bind_template(template):
+            context.template_name = template.name
+            segments = _segments(template)
+            # The first segment goes through Template._render, as a whole
+            # template would, for anything instrumenting renders (the test
+            # client's template_rendered signal)
+            top = copy.copy(template)
+            top.nodelist = next(segments)
+            yield top._render(context)
+            for segment in segments:
+                yield segment.render(context)
+
+
+def stream_template(request, template_name, context=None):
+    """
+    Iterator of rendered chunks of `template_name`, split at top-level
+    {% flush %} tags. The first chunk is rendered before this returns.
+    """
+    template = get_template(template_name)
+    context = make_context(
+        context, request, autoescape=template.backend.engine.autoescape
+    )
+    chunks = _render_chunks(template.template, context)
+    first = next(chunks)
+
+    def stream():
+        yield first
+        yield from chunks
+
+    return stream()
+
+
+async def _aiter(chunks):
+    render_next = sync_to_async(next, thread_sensitive=True)
+    try:
+        while (chunk := await render_next(chunks, None)) is not None:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close, thread_sensitive=True)()
+
+
+def render_streaming(request, template_name, context=None, **kwargs):
+    """
+    render() as a StreamingHttpResponse, flushed at each {% flush %}.
+    """
+    chunks = stream_template(request, template_name, context)
+    if isinstance(request, ASGIRequest):
+        chunks = _aiter(chunks)
+    response = StreamingHttpResponse(chunks, **kwargs)
+    # Let nginx-style proxies pass chunks on instead of buffering the page
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Tag
+
+TAG_INDEX_CACHE_KEY = "tag_index:v1"
+
+
+def build_tag_index():
+    """
+    Build the tag -> project IDs inverted index in a single query.
+
+    Returns a list ordered by tag name:
+        [{"name": "Django", "count": 2, "projects": [1, 4]}, ...]
+    Project IDs are sorted; tags without projects are kept with count 0.
+    """
+    index = {}
+    rows = Tag.objects.values_list("name", "projects__id").order_by(
+        "name", "projects__id"
+    )
+    for name, project_id in rows:
+        project_ids = index.setdefault(name, [])
+        if project_id is not None:
+            project_ids.append(project_id)
+
+    return [
+        {"name": name, "count": len(project_ids), "projects": project_ids}
+        for name, project_ids in index.items()
+    ]
+
+
+def rebuild_tag_index():
+    index = build_tag_index()
+    cache.set(
+        TAG_INDEX_CACHE_KEY, index, timeout=getattr(settings, "TAG_INDEX_TIMEOUT", 300)
+    )
+    return index
+
+
+def get_tag_index():
+    """
+    Return the cached index, building it on a cache miss.
+    """
+    index = cache.get(TAG_INDEX_CACHE_KEY)
+    if index is None:
+        index = rebuild_tag_index()
+    return index
+
+
+def invalidate_tag_index():
+    """
+    Drop the cached index now, and rebuild it once the surrounding
+    transaction commits so readers never cache uncommitted state.
+    """
+    cache.delete(TAG_INDEX_CACHE_KEY)
+    transaction.on_commit(rebuild_tag_index)
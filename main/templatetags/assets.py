@@ -0,0 +1,141 @@
+import base64
+import hashlib
+from urllib.parse import urlsplit
+
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+from main.assets import BUNDLES, CRITICAL_CSS, PRELOAD_FONTS, bundles_enabled
+
+register = template.Library()
+
+# Set in the render context once critical CSS is inlined for the page
+CRITICAL_INLINED = "critical_css_inlined"
+
+_built = {}  # static name -> (url, integrity, content), or None if not collected
+
+
+def _read(name):
+    stored = getattr(staticfiles_storage, "stored_name", lambda n: n)(name)
+    with staticfiles_storage.open(stored) as f:
+        return f.read()
+
+
+def built_file(name):
+    """
+    (url, integrity, content) of collected bundle/critical CSS `name`, or
+    None when bundling is off or collectstatic has not produced it. Cached
+    per process.
+    """
+    if name not in _built:
+        _built[name] = None
+        if bundles_enabled() and staticfiles_storage.exists(name):
+            try:
+                url = staticfiles_storage.url(name)
+            except ValueError:
+                pass  # stale file without a manifest entry
+            else:
+                content = _read(name)
+                digest = base64.b64encode(hashlib.sha384(content).digest())
+                _built[name] = (url, "sha384-" + digest.decode(), content)
+    return _built[name]
+
+
+@receiver(setting_changed)
+def _reset_built_files(setting, **kwargs):
+    if setting in (
+        "ASSET_BUNDLES",
+        "ASSET_CRITICAL_CSS",
+        "DEBUG",
+        "STATIC_ROOT",
+        "STATICFILES_STORAGE",
+    ):
+        _built.clear()
+
+
+def _element(name, url, flags, integrity=None, deferred=False):
+    attrs = format_html_join("", " {}", ((flag,) for flag in flags))
+    if integrity:
+        attrs = format_html(
+            '{} integrity="{}" crossorigin="anonymous"', attrs, integrity
+        )
+    if not name.endswith(".css"):
+        return format_html('<script src="{}"{}></script>', url, attrs)
+    if deferred:
+        # Fetched without blocking render, applied once loaded
+        return format_html(
+            '<link rel="stylesheet" href="{0}" media="print" '
+            "onload=\"this.media='all'\"{1}>"
+            '<noscript><link rel="stylesheet" href="{0}"{1}></noscript>',
+            url,
+            attrs,
+        )
+    return format_html('<link rel="stylesheet" href="{}"{}>', url, attrs)
+
+
+@register.simple_tag(takes_context=True)
+def bundle(context, name, *flags):
+    """
+    Include a bundle from main.assets.BUNDLES, e.g.
+    {% bundle "bundles/home.js" "defer" %}
+    Stylesheets load without blocking render after {% critical_css %}.
+    """
+    if name not in BUNDLES:
+        raise template.TemplateSyntaxError(f"Unknown asset bundle {name!r}")
+
+    built = built_file(name)
+    if built:
+        url, integrity, _ = built
+        deferred = context.render_context.get(CRITICAL_INLINED, False)
+        return _element(name, url, flags, integrity, deferred)
+    return mark_safe(
+        "\n".join(_element(name, static(src), flags) for src in BUNDLES[name])
+    )
+
+
+@register.simple_tag(takes_context=True)
+def critical_css(context, name):
+    """
+    Inline the page's above-the-fold CSS from main.assets.CRITICAL_CSS, e.g.
+    {% critical_css "critical/home.css" %}. Renders nothing (and stylesheets
+    stay render-blocking) when it was not built.
+    """
+    if name not in CRITICAL_CSS:
+        raise template.TemplateSyntaxError(f"Unknown critical CSS {name!r}")
+
+    built = built_file(name) if getattr(settings, "ASSET_CRITICAL_CSS", True) else None
+    if not built:
+        return ""
+    context.render_context[CRITICAL_INLINED] = True
+    return format_html("<style>{}</style>", mark_safe(built[2].decode("utf-8")))
+
+
+def _origin(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}" if parts.netloc else None
+
+
+@register.simple_tag
+def resource_hints():
+    """
+    Preconnect to off-site static/media hosts and preload PRELOAD_FONTS.
+    """
+    origins = {_origin(settings.STATIC_URL), _origin(settings.MEDIA_URL)} - {None}
+    hints = [
+        format_html('<link rel="preconnect" href="{}" crossorigin>', origin)
+        for origin in sorted(origins)
+    ]
+    hints += [
+        format_html(
+            '<link rel="preload" href="{}" as="font" type="font/woff2" crossorigin>',
+            static(font),
+        )
+        for font in PRELOAD_FONTS
+    ]
+    return mark_safe("\n".join(hints))
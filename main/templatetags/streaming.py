@@ -0,0 +1,17 @@
+from django import template
+
+register = template.Library()
+
+
+class FlushNode(template.Node):
+    def render(self, context):
+        return ""
+
+
+@register.tag
+def flush(parser, token):
+    """
+    {% flush %}: where a streamed render (main.streaming) sends the page so
+    far. Only honoured at the top level of a template; renders nothing.
+    """
+    return FlushNode()
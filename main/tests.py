@@ -1,12 +1,36 @@
 import os
+import tempfile
+import threading
+from contextlib import ExitStack
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from typing import NamedTuple
 from unittest.mock import MagicMock, patch
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import SimpleTestCase, TestCase, override_settings
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.signals import template_rendered
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 
-from main.models import Comment, Project
+from main.models import Comment, Project, ProjectImage, Tag
 
 # Create your tests here.
 
@@ -519,6 +543,1904 @@ class CommentAjaxFlowTests(TestCase):
         self.assertEqual(res.status_code, 403)
 
 
+# Project search endpoint
+
+
+class ProjectSearchTests(TestCase):
+    def setUp(self):
+        self.django_tag = Tag.objects.create(name="Django")
+        self.shop = Project.objects.create(
+            title="Coffee shop", description="Online ordering for a cafe"
+        )
+        self.blog = Project.objects.create(
+            title="Travel blog", description="Stories from the road"
+        )
+        self.blog.tags.add(self.django_tag)
+
+    def _search(self, **params):
+        res = self.client.get(reverse("project_search"), params)
+        self.assertEqual(res.status_code, 200)
+        return res.json()
+
+    def test_matches_title_and_description_prefix(self):
+        data = self._search(q="coff")
+        self.assertEqual([r["id"] for r in data["results"]], [self.shop.id])
+
+        data = self._search(q="stories")
+        self.assertEqual([r["id"] for r in data["results"]], [self.blog.id])
+
+    def test_sqlite_matches_word_prefixes_not_substrings(self):
+        # FTS5 differs from icontains here; see main.search._text_filter
+        if connection.vendor != "sqlite":
+            self.skipTest("FTS5 search is SQLite only")
+        self.assertEqual(self._search(q="offee")["results"], [])
+        self.assertEqual(len(self._search(q="shop coff")["results"]), 1)
+
+    def test_index_follows_project_updates(self):
+        self.shop.title = "Tea house"
+        self.shop.save()
+
+        self.assertEqual(self._search(q="coffee")["results"], [])
+        self.assertEqual(self._search(q="tea")["results"][0]["id"], self.shop.id)
+
+    def test_matches_tag_name_and_tag_filter(self):
+        data = self._search(q="djan")
+        self.assertEqual([r["id"] for r in data["results"]], [self.blog.id])
+        self.assertEqual(data["results"][0]["tags"], ["Django"])
+
+        data = self._search(tag="django")
+        self.assertEqual(data["count"], 1)
+
+    def test_query_operators_are_treated_as_text(self):
+        data = self._search(q='"cafe) -')
+        self.assertEqual([r["id"] for r in data["results"]], [self.shop.id])
+
+    def test_results_are_paginated(self):
+        from main.search import SEARCH_PAGE_SIZE
+
+        for i in range(SEARCH_PAGE_SIZE):
+            Project.objects.create(title=f"Extra {i:02d}", description="filler")
+
+        first = self._search(page=1)
+        second = self._search(page=2)
+        self.assertTrue(first["has_next"])
+        self.assertEqual(len(first["results"]), SEARCH_PAGE_SIZE)
+        self.assertEqual(len(second["results"]), 2)
+        self.assertFalse(second["has_next"])
+
+
+# Tag inverted index
+
+
+class TagIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.django_tag = Tag.objects.create(name="Django")
+        self.css_tag = Tag.objects.create(name="CSS")
+        self.p1 = Project.objects.create(title="P1", description="D1")
+        self.p2 = Project.objects.create(title="P2", description="D2")
+        self.p2.tags.add(self.django_tag, self.css_tag)
+        self.p1.tags.add(self.django_tag)
+
+    def _index(self):
+        res = self.client.get(reverse("tag_index"))
+        self.assertEqual(res.status_code, 200)
+        return {t["name"]: t for t in res.json()["tags"]}
+
+    def test_index_maps_tags_to_sorted_project_ids_with_counts(self):
+        index = self._index()
+        self.assertEqual(index["Django"]["projects"], [self.p1.id, self.p2.id])
+        self.assertEqual(index["Django"]["count"], 2)
+        self.assertEqual(index["CSS"]["projects"], [self.p2.id])
+
+    def test_cached_index_is_served_without_queries(self):
+        self._index()
+        with self.assertNumQueries(0):
+            self._index()
+
+    @override_settings(TAG_INDEX_TIMEOUT=42)
+    def test_index_expires(self):
+        # Without a shared cache other workers' copies only go on expiry
+        from main.tag_index import TAG_INDEX_CACHE_KEY, get_tag_index
+
+        with patch("main.tag_index.cache") as fake_cache:
+            fake_cache.get.return_value = None
+            get_tag_index()
+        key, _ = fake_cache.set.call_args.args
+        self.assertEqual(key, TAG_INDEX_CACHE_KEY)
+        self.assertEqual(fake_cache.set.call_args.kwargs, {"timeout": 42})
+
+    def test_m2m_changes_refresh_index(self):
+        self._index()
+        self.p2.tags.remove(self.css_tag)
+        self.assertEqual(self._index()["CSS"]["count"], 0)
+
+        self.p1.delete()
+        self.assertEqual(self._index()["Django"]["projects"], [self.p2.id])
+
+
+# JSON API
+
+
+class ApiV1Tests(TestCase):
+    def setUp(self):
+        self.tag = Tag.objects.create(name="Django")
+        self.project = Project.objects.create(
+            title="P1", description="D1", github_url="https://github.com/x/y"
+        )
+        self.project.tags.add(self.tag)
+        self.user = User.objects.create_user(username="u1", password="pass1234")
+
+    def test_projects_list_selects_fields(self):
+        res = self.client.get(reverse("api_projects"), {"fields": "title,tags"})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(
+            res.json()["results"],
+            [{"id": self.project.id, "title": "P1", "tags": ["Django"]}],
+        )
+
+    def test_projects_list_rejects_unknown_fields(self):
+        res = self.client.get(reverse("api_projects"), {"fields": "secret"})
+        self.assertEqual(res.status_code, 400)
+
+    def test_project_detail_and_missing_project(self):
+        res = self.client.get(reverse("api_project", kwargs={"id": self.project.id}))
+        data = res.json()
+        self.assertEqual(data["github_url"], "https://github.com/x/y")
+        self.assertEqual(data["tags"], ["Django"])
+        self.assertEqual(data["images"], [])
+
+        res = self.client.get(reverse("api_project", kwargs={"id": 999}))
+        self.assertEqual(res.status_code, 404)
+
+    def test_comments_are_paginated_newest_first(self):
+        from main.api import COMMENTS_PAGE_SIZE
+
+        for i in range(COMMENTS_PAGE_SIZE + 1):
+            Comment.objects.create(
+                project=self.project, user=self.user, content=f"c{i}"
+            )
+        url = reverse("api_project_comments", kwargs={"id": self.project.id})
+
+        first = self.client.get(url).json()
+        self.assertEqual(len(first["results"]), COMMENTS_PAGE_SIZE)
+        self.assertTrue(first["has_next"])
+        self.assertEqual(first["results"][0]["author"], "u1")
+
+        second = self.client.get(url, {"page": 2}).json()
+        self.assertEqual(len(second["results"]), 1)
+
+    def test_etag_revalidation_returns_304(self):
+        url = reverse("api_tags")
+        res = self.client.get(url)
+        etag = res["ETag"]
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 304)
+
+        Tag.objects.create(name="CSS")
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+
+    def test_large_responses_are_gzipped(self):
+        for i in range(30):
+            Project.objects.create(title=f"Project {i}", description="x" * 50)
+
+        res = self.client.get(reverse("api_projects"), HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(res["Content-Encoding"], "gzip")
+
+
+# Admin moderation
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class CommentAdminTests(TestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(
+            username="admin", email="admin@example.com", password="pass1234"
+        )
+        self.client.login(username="admin", password="pass1234")
+        self.project = Project.objects.create(title="P1", description="D1")
+        self.comments = [
+            Comment.objects.create(
+                project=self.project, author_name=f"spam{i}", content="Buy now"
+            )
+            for i in range(3)
+        ]
+
+    def test_changelist_renders(self):
+        res = self.client.get(reverse("admin:main_comment_changelist"))
+        self.assertEqual(res.status_code, 200)
+        self.assertContains(res, "spam0")
+
+    def test_bulk_delete_action_asks_for_confirmation(self):
+        keep = Comment.objects.create(project=self.project, content="Keep me")
+        data = {
+            "action": "delete_comments",
+            "_selected_action": [c.pk for c in self.comments],
+        }
+        res = self.client.post(reverse("admin:main_comment_changelist"), data)
+        self.assertEqual(res.status_code, 200)
+        self.assertContains(res, "Permanently delete 3 comments?")
+        self.assertContains(res, "P1: 3")
+        self.assertEqual(Comment.all_objects.count(), 4)
+
+        res = self.client.post(
+            reverse("admin:main_comment_changelist"), {**data, "post": "yes"}
+        )
+        self.assertEqual(res.status_code, 302)
+        self.assertEqual(list(Comment.all_objects.all()), [keep])
+
+    def test_bulk_delete_is_one_delete_query(self):
+        from main.snapshots import get_project_snapshot
+
+        cache.clear()
+        self.addCleanup(cache.clear)
+        Comment.objects.bulk_create(
+            Comment(project=self.project, content=f"Spam {i}") for i in range(50)
+        )
+        selected = list(Comment.all_objects.values_list("pk", flat=True))
+        self.assertEqual(len(get_project_snapshot(self.project.id).comments), 53)
+        data = {
+            "action": "delete_comments",
+            "_selected_action": selected,
+            "post": "yes",
+        }
+
+        with CaptureQueriesContext(connections["default"]) as ctx:
+            res = self.client.post(reverse("admin:main_comment_changelist"), data)
+
+        self.assertEqual(res.status_code, 302)
+        self.assertFalse(Comment.all_objects.exists())
+        touching = [q for q in ctx.captured_queries if "main_comment" in q["sql"]]
+        self.assertEqual(len(touching), 3)  # changelist count, project ids, DELETE
+        self.assertEqual(sum(q["sql"].startswith("DELETE") for q in touching), 1)
+        self.assertEqual(get_project_snapshot(self.project.id).comments, [])
+
+    def test_bulk_hide_action_keeps_rows(self):
+        hidden = self.comments[0]
+        self.client.post(
+            reverse("admin:main_comment_changelist"),
+            {"action": "hide_comments", "_selected_action": [hidden.pk]},
+        )
+        hidden.refresh_from_db()
+        self.assertEqual(hidden.state, Comment.State.HIDDEN)
+        self.assertEqual(Comment.objects.count(), 2)
+        self.assertEqual(Comment.all_objects.count(), 3)
+
+
+# Comment moderation state
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class CommentModerationStateTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="u1", password="pass1234")
+        self.project = Project.objects.create(title="P1", description="D1")
+
+    def test_delete_is_soft(self):
+        self.client.login(username="u1", password="pass1234")
+        c = Comment.objects.create(project=self.project, user=self.user, content="x")
+
+        url = reverse(
+            "comment_delete", kwargs={"id": self.project.id, "comment_id": c.id}
+        )
+        self.client.post(url)
+
+        c.refresh_from_db()
+        self.assertEqual(c.state, Comment.State.DELETED)
+        self.assertFalse(Comment.objects.filter(pk=c.pk).exists())
+
+    def test_hidden_comments_are_not_listed_or_editable(self):
+        self.client.login(username="u1", password="pass1234")
+        c = Comment.objects.create(
+            project=self.project,
+            user=self.user,
+            content="Hidden words",
+            state=Comment.State.HIDDEN,
+        )
+
+        url = reverse("project_comments_partial", kwargs={"id": self.project.id})
+        self.assertNotContains(self.client.get(url), "Hidden words")
+
+        url = reverse(
+            "comment_update", kwargs={"id": self.project.id, "comment_id": c.id}
+        )
+        self.assertEqual(self.client.post(url, {"content": "Edited"}).status_code, 404)
+
+
+# Sessions
+
+
+class SessionMaintenanceTests(TestCase):
+    def test_clear_expired_sessions_in_batches(self):
+        now = timezone.now()
+        for i in range(5):
+            Session.objects.create(
+                session_key=f"old{i}", session_data="", expire_date=now - timedelta(1)
+            )
+        Session.objects.create(
+            session_key="live", session_data="", expire_date=now + timedelta(1)
+        )
+
+        out = StringIO()
+        call_command("clear_expired_sessions", batch_size=2, stdout=out)
+
+        self.assertIn("Deleted 5", out.getvalue())
+        self.assertEqual(list(Session.objects.values_list("pk", flat=True)), ["live"])
+
+    def test_benchmark_sessions_reports_each_engine(self):
+        out = StringIO()
+        call_command("benchmark_sessions", requests=2, stdout=out)
+
+        for engine in ("db", "cached_db", "signed_cookies"):
+            self.assertIn(engine, out.getvalue())
+        self.assertFalse(Project.objects.exists())  # seed data rolled back
+
+
+class BenchmarkHelperTests(SimpleTestCase):
+    def test_percentile_and_summary(self):
+        from main.benchmarks import percentile, summarize
+
+        self.assertEqual(percentile([5, 1, 3, 2, 4], 50), 3)
+        self.assertEqual(percentile(list(range(1, 101)), 95), 95)
+
+        summary = summarize([0.001, 0.003])
+        self.assertEqual(summary["count"], 2)
+        self.assertAlmostEqual(summary["mean_ms"], 2.0)
+        self.assertAlmostEqual(summary["max_ms"], 3.0)
+
+
+# Viewer identity + precomputed permission gate
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class ViewerIdentityTests(TestCase):
+    def setUp(self):
+        self.project = Project.objects.create(title="P1", description="D1")
+        self.mine = Comment.objects.create(
+            project=self.project,
+            author_name="SheetUser",
+            author_email="sheet@example.com",
+            content="Mine",
+        )
+        self.theirs = Comment.objects.create(
+            project=self.project, author_name="Other", content="Theirs"
+        )
+        self.url = reverse("project_comments_partial", kwargs={"id": self.project.id})
+
+    def _sign_in_sheet_user(self):
+        session = self.client.session
+        session["user_email"] = "sheet@example.com"
+        session["user_name"] = "SheetUser"
+        session.save()
+
+    def test_sheet_user_manages_only_own_comments(self):
+        self._sign_in_sheet_user()
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.context["manageable_comment_ids"], {self.mine.pk})
+        self.assertContains(res, "comment-edit-btn", count=1)
+
+    def test_staff_manages_every_comment(self):
+        User.objects.create_user(username="staff", password="pass1234", is_staff=True)
+        self.client.login(username="staff", password="pass1234")
+        res = self.client.get(self.url)
+
+        self.assertEqual(
+            res.context["manageable_comment_ids"], {self.mine.pk, self.theirs.pk}
+        )
+
+    def test_anonymous_viewer_gets_no_controls_or_form(self):
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.context["manageable_comment_ids"], set())
+        self.assertNotContains(res, "comment-edit-btn")
+        self.assertIsNone(res.context["form"])
+
+
+# Indexed ownership for session-authored comments
+
+
+class CommentAuthorKeyTests(TestCase):
+    def setUp(self):
+        self.project = Project.objects.create(title="P1", description="D1")
+        session = self.client.session
+        session["user_email"] = "Sheet@Example.com"
+        session["user_name"] = "SheetUser"
+        session.save()
+
+    def test_author_key_is_normalised_email_hash(self):
+        from main.models import make_author_key
+
+        c = Comment.objects.create(
+            project=self.project,
+            author_name="SheetUser",
+            author_email=" sheet@example.COM ",
+            content="x",
+        )
+        self.assertEqual(c.author_key, make_author_key(email="sheet@example.com"))
+
+        user = User.objects.create_user(username="u1", password="pass1234")
+        c = Comment.objects.create(project=self.project, user=user, content="y")
+        self.assertEqual(c.author_key, "")
+
+    def test_my_comments_lists_only_own_comments(self):
+        other = Project.objects.create(title="P2", description="D2")
+        mine = Comment.objects.create(
+            project=other,
+            author_name="Renamed",
+            author_email="sheet@example.com",
+            content="Mine",
+        )
+        Comment.objects.create(
+            project=self.project, author_name="SheetUser", author_email="x@y.z"
+        )
+
+        res = self.client.get(reverse("api_my_comments"))
+
+        self.assertEqual(res.status_code, 200)
+        results = res.json()["results"]
+        self.assertEqual([r["id"] for r in results], [mine.id])
+        self.assertEqual(results[0]["project"], {"id": other.id, "title": "P2"})
+
+    def test_my_comments_requires_sign_in(self):
+        self.client.session.flush()
+        self.client.cookies.clear()
+        self.assertEqual(self.client.get(reverse("api_my_comments")).status_code, 403)
+
+    def test_delete_of_missing_comment_is_404(self):
+        url = reverse(
+            "comment_delete", kwargs={"id": self.project.id, "comment_id": 999}
+        )
+        res = self.client.post(url, HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+        self.assertEqual(res.status_code, 404)
+
+
+# Database connection reuse
+
+
+class DatabaseConnectionSettingsTests(SimpleTestCase):
+    databases = {"default"}
+
+    def test_default_connection_is_persistent_with_health_checks(self):
+        if settings.DB_POOL_MODE != "persistent":
+            self.skipTest("DB_POOL_MODE overridden in this environment")
+        db = settings.DATABASES["default"]
+        self.assertEqual(db["CONN_MAX_AGE"], settings.DB_CONN_MAX_AGE)
+        self.assertTrue(db["CONN_HEALTH_CHECKS"])
+
+    def test_benchmark_db_connections_reports_each_mode(self):
+        out = StringIO()
+        call_command("benchmark_db_connections", requests=3, stdout=out)
+        self.assertIn("GET /my_work/", out.getvalue())
+
+        for label in ("new connection/request", "persistent", "health check"):
+            self.assertIn(label, out.getvalue())
+
+
+# Read replica routing
+
+
+@patch("main.routers.replica_configured", return_value=True)
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        from main.middleware import ReplicaRoutingMiddleware
+        from main.routers import PrimaryReplicaRouter
+
+        self.router = PrimaryReplicaRouter()
+        self.middleware_class = ReplicaRoutingMiddleware
+        self.pin_cookie = ReplicaRoutingMiddleware.cookie_name
+
+    def run_request(self, request, write=False):
+        """
+        Route a read (and optionally a write + read) inside the middleware.
+        """
+        routed = {}
+
+        def get_response(req):
+            routed["read"] = self.router.db_for_read(Project)
+            if write:
+                routed["write"] = self.router.db_for_write(Comment)
+                routed["read_after_write"] = self.router.db_for_read(Comment)
+            return HttpResponse()
+
+        response = self.middleware_class(get_response)(request)
+        return routed, response
+
+    def test_outside_requests_everything_uses_primary(self, _):
+        self.assertEqual(self.router.db_for_read(Project), "default")
+        self.assertEqual(self.router.db_for_write(Project), "default")
+        self.assertFalse(self.router.allow_migrate("replica", "main"))
+        self.assertTrue(self.router.allow_migrate("default", "main"))
+
+    def test_write_pins_reads_to_primary(self, _):
+        routed, response = self.run_request(RequestFactory().get("/"), write=True)
+
+        self.assertEqual(
+            routed,
+            {"read": "replica", "write": "default", "read_after_write": "default"},
+        )
+        cookie = response.cookies[self.pin_cookie]
+        self.assertEqual(cookie["max-age"], settings.REPLICA_PIN_SECONDS)
+        # Per-request state is reset afterwards
+        routed, _ = self.run_request(RequestFactory().get("/"))
+        self.assertEqual(routed["read"], "replica")
+
+    def test_session_and_login_writes_do_not_pin(self, _):
+        from django.contrib.sessions.models import Session
+
+        def get_response(request):
+            self.router.db_for_write(Session)
+            self.router.db_for_write(User)
+            return HttpResponse()
+
+        response = self.middleware_class(get_response)(RequestFactory().get("/"))
+        self.assertNotIn(self.pin_cookie, response.cookies)
+
+    def test_pinned_browser_reads_from_primary(self, _):
+        request = RequestFactory().get("/")
+        request.COOKIES[self.pin_cookie] = "1"
+
+        routed, _ = self.run_request(request)
+        self.assertEqual(routed["read"], "default")
+
+    def test_unsafe_methods_read_from_primary(self, _):
+        routed, response = self.run_request(RequestFactory().post("/"))
+
+        self.assertEqual(routed["read"], "default")
+        self.assertNotIn(self.pin_cookie, response.cookies)
+
+    def test_disabled_without_replica(self, configured):
+        configured.return_value = False
+
+        with self.assertRaises(MiddlewareNotUsed):
+            self.middleware_class(lambda request: HttpResponse())
+        self.assertEqual(self.router.db_for_read(Project), "default")
+
+
+@override_settings(
+    DATABASE_ROUTERS=["main.routers.PrimaryReplicaRouter"],
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+)
+class ReplicaReadYourWritesTests(TransactionTestCase):
+    """
+    The test "replica" alias mirrors "default" (portfolio/settings.py), so
+    the reads here are routed to a second connection to the same database.
+    """
+
+    databases = "__all__"
+
+    def setUp(self):
+        self.project = Project.objects.create(title="P", description="D")
+        session = self.client.session
+        session["user_email"] = "reader@example.com"
+        session["user_name"] = "Reader"
+        session.save()
+
+    def test_comment_write_pins_following_reads(self):
+        from main.middleware import ReplicaRoutingMiddleware
+
+        url = reverse("project_comments_partial", kwargs={"id": self.project.id})
+        with CaptureQueriesContext(connections["replica"]) as replica_reads:
+            res = self.client.get(url)
+        self.assertTrue(replica_reads.captured_queries)
+        self.assertNotIn(ReplicaRoutingMiddleware.cookie_name, res.cookies)
+
+        self.client.post(
+            reverse("comment_create", kwargs={"id": self.project.id}),
+            {"content": "Fresh"},
+            HTTP_X_REQUESTED_WITH="XMLHttpRequest",
+        )
+        self.assertIn(ReplicaRoutingMiddleware.cookie_name, self.client.cookies)
+
+        with self.assertNumQueries(0, using="replica"):
+            res = self.client.get(url)
+        self.assertContains(res, "Fresh")
+
+    @override_settings(
+        SESSION_ENGINE="django.contrib.sessions.backends.db",
+        SESSION_SAVE_EVERY_REQUEST=True,
+    )
+    def test_session_saving_get_still_reads_from_replica(self):
+        from django.contrib.sessions.models import Session
+
+        from main.middleware import ReplicaRoutingMiddleware
+
+        url = reverse("project_comments_partial", kwargs={"id": self.project.id})
+        with CaptureQueriesContext(connections["default"]) as primary:
+            res = self.client.get(url)
+        self.assertTrue(
+            any(Session._meta.db_table in q["sql"] for q in primary.captured_queries)
+        )
+        self.assertNotIn(ReplicaRoutingMiddleware.cookie_name, res.cookies)
+
+        with CaptureQueriesContext(connections["replica"]) as replica_reads:
+            self.client.get(url)
+        self.assertTrue(replica_reads.captured_queries)
+
+
+# Static asset compression
+
+
+class StaticCompressionTests(SimpleTestCase):
+    def test_collectstatic_emits_brotli(self):
+        with tempfile.TemporaryDirectory() as root:
+            with override_settings(STATIC_ROOT=root):
+                call_command("collectstatic", interactive=False, verbosity=0)
+
+            brotli = sorted(Path(root, "css").glob("*.css.br"))
+            self.assertTrue(brotli)
+            for path in brotli:
+                self.assertTrue(path.with_suffix("").exists())
+            self.assertTrue(Path(root, "css", "about.css.br").exists())
+
+    def test_hashed_files_are_immutable(self):
+        from django.contrib.staticfiles.storage import staticfiles_storage
+        from whitenoise.middleware import WhiteNoiseMiddleware
+
+        if not hasattr(staticfiles_storage, "hashed_files"):
+            self.skipTest("Manifest storage not in use")
+        middleware = WhiteNoiseMiddleware(lambda request: None)
+        hashed_url = staticfiles_storage.url("css/about.css")
+
+        self.assertTrue(middleware.immutable_file_test("", hashed_url))
+        self.assertFalse(middleware.immutable_file_test("", "/static/css/about.css"))
+
+    def test_size_report_lists_compressed_variants(self):
+        with tempfile.TemporaryDirectory() as root:
+            css = Path(root, "css")
+            css.mkdir()
+            (css / "site.abc123.css").write_bytes(b"a" * 4096)
+            (css / "site.abc123.css.gz").write_bytes(b"g" * 512)
+            (css / "site.abc123.css.br").write_bytes(b"b" * 256)
+            (css / "plain.css").write_bytes(b"p" * 1024)
+
+            out = StringIO()
+            with override_settings(STATIC_ROOT=root):
+                call_command("static_size_report", stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[1].startswith("css/site.abc123.css"))
+        self.assertEqual(lines[1].split()[1:], ["4.0", "0.5", "0.2"])
+        self.assertEqual(lines[2].split()[1:], ["1.0", "-", "-"])
+        self.assertIn("2 assets: 5.0 KiB raw, 1.2 KiB best-compressed", lines[-1])
+        self.assertIn("1 compressible without a Brotli variant", lines[-1])
+
+
+# Asset bundles
+
+
+def collect_static_for_templates(root):
+    """
+    Collect into `root` just the static files the bundles and templates
+    need (a full collectstatic copies every image), with bundle building.
+    """
+    import re
+    import shutil
+
+    from main.assets import BUNDLES, CONTENT_SOURCES, template_files
+    from main.storage import BundledManifestStaticFilesStorage
+
+    source_root = Path(settings.BASE_DIR, "main", "static")
+    names = {src for sources in BUNDLES.values() for src in sources}
+    names.update(CONTENT_SOURCES)
+    names.update(
+        str(p.relative_to(source_root))
+        for p in (source_root / "vendor/fontawesome/webfonts").iterdir()
+    )
+    referenced = [path.read_text() for path in template_files()]
+    referenced.append(Path(settings.BASE_DIR, "main", "views.py").read_text())
+    for text in referenced:
+        names.update(
+            name
+            for name in re.findall(r"""static[ (]['"]([^'"]+)['"]""", text)
+            if (source_root / name).exists()
+        )
+
+    for name in names:
+        Path(root, name).parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy(source_root / name, Path(root, name))
+    storage = BundledManifestStaticFilesStorage(location=root)
+    list(storage.post_process({n: (storage, n) for n in names}))
+    return storage
+
+
+class AssetBundleTests(SimpleTestCase):
+    def test_prune_css_keeps_only_used_selectors(self):
+        from main.assets import UsedSelectors, prune_css
+
+        used = UsedSelectors(['<div class="card alert-{{ level }}">'])
+        css = (
+            "a{color:red}.card,.unused{margin:0}.unused:hover{x:y}"
+            "@media (min-width:1px){.unused{x:y}.card .alert-info{x:y}}"
+            "@media print{.unused{x:y}}:not(.unused)>p{x:y}"
+            '.card::before{content:"}"}'
+        )
+
+        self.assertEqual(
+            prune_css(css, used),
+            "a{color:red}.card{margin:0}"
+            "@media (min-width:1px){.card .alert-info{x:y}}"
+            ':not(.unused)>p{x:y}.card::before{content:"}"}',
+        )
+
+    def test_rebase_urls_relative_to_bundle(self):
+        from main.assets import rebase_urls
+
+        css = (
+            "@font-face{src:url(../webfonts/fa.woff2?v=1)}"
+            ".a{background:url('data:image/svg+xml,x')}.b{background:url(/x.png)}"
+        )
+        self.assertEqual(
+            rebase_urls(css, "vendor/fa/css/all.css", "bundles/base.css"),
+            '@font-face{src:url("../vendor/fa/webfonts/fa.woff2?v=1")}'
+            ".a{background:url('data:image/svg+xml,x')}.b{background:url(/x.png)}",
+        )
+
+    def test_collectstatic_builds_hashed_bundles_with_integrity(self):
+        import base64
+        import hashlib
+
+        from django.template import Context, Template
+
+        with tempfile.TemporaryDirectory() as root:
+            storage = collect_static_for_templates(root)
+
+            base_css = Path(root, storage.stored_name("bundles/base.css"))
+            self.assertLess(base_css.stat().st_size, 100 * 1024)
+            self.assertTrue(Path(f"{base_css}.br").exists())
+            self.assertIn(
+                "../vendor/fontawesome/webfonts/fa-solid-900.", base_css.read_text()
+            )
+
+            with override_settings(
+                STATIC_ROOT=root,
+                STATICFILES_STORAGE="main.storage.BundledManifestStaticFilesStorage",
+                ASSET_BUNDLES=True,
+            ):
+                html = Template(
+                    '{% load assets %}{% bundle "bundles/home.js" "defer" %}'
+                ).render(Context())
+
+            home_js = Path(root, storage.stored_name("bundles/home.js"))
+            digest = hashlib.sha384(home_js.read_bytes()).digest()
+            self.assertEqual(
+                html,
+                f'<script src="/static/{storage.stored_name("bundles/home.js")}" '
+                f'defer integrity="sha384-{base64.b64encode(digest).decode()}" '
+                'crossorigin="anonymous"></script>',
+            )
+
+    @override_settings(ASSET_BUNDLES=False)
+    def test_bundle_tag_falls_back_to_source_files(self):
+        from django.template import Context, Template
+
+        html = Template('{% load assets %}{% bundle "bundles/my_work.css" %}').render(
+            Context()
+        )
+
+        self.assertIn('href="/static/css/project.', html)
+        self.assertIn('href="/static/css/my_work.', html)
+        self.assertNotIn("integrity", html)
+
+
+@override_settings(
+    STATICFILES_STORAGE="main.storage.BundledManifestStaticFilesStorage",
+    ASSET_BUNDLES=True,
+    ASSET_CRITICAL_CSS=True,
+)
+class CriticalCssTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = tempfile.TemporaryDirectory()
+        cls.storage = collect_static_for_templates(cls.static_root.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.static_root.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        settings_override = override_settings(STATIC_ROOT=self.static_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_critical_prune_keeps_above_the_fold_rules_only(self):
+        from main.assets import UsedSelectors, prune_css
+
+        used = UsedSelectors(["<header class='hero'><h1>Hi</h1>"], match_elements=True)
+        css = (
+            "h1{a:b}table{a:b}.hero h1{a:b}.hero table{a:b}[data-x]{a:b}"
+            "@font-face{src:url(x.woff2)}@keyframes k{to{a:b}}"
+            ".hero{background:url(../img.png)}.hero{background:url(data:x)}"
+        )
+
+        self.assertEqual(
+            prune_css(css, used, critical=True),
+            "h1{a:b}.hero h1{a:b}.hero{background:url(data:x)}",
+        )
+
+    def test_project_page_fold_marker_is_found(self):
+        from django.template.loader import get_template
+
+        from main.assets import above_the_fold
+
+        source = get_template("project.html").template.source
+        fold = above_the_fold("project.html")
+        self.assertLess(len(fold), len(source))
+        self.assertNotIn("project_comments", fold)
+
+    def test_page_inlines_critical_css_and_defers_stylesheets(self):
+        from main.benchmarks import render_blocking_resources
+
+        res = self.client.get(reverse("home"))
+        html = res.content.decode()
+        critical = Path(
+            self.static_root.name, self.storage.stored_name("critical/home.css")
+        ).read_text()
+
+        self.assertIn(f"<style>{critical}</style>", html)
+        self.assertIn('media="print" onload="this.media=\'all\'"', html)
+        self.assertEqual(render_blocking_resources(html), ([], len(critical)))
+        self.assertContains(res, 'rel="preload" as="image"')
+
+    def test_stylesheets_block_without_critical_css(self):
+        from main.benchmarks import render_blocking_resources
+
+        with override_settings(ASSET_CRITICAL_CSS=False):
+            html = self.client.get(reverse("contact")).content.decode()
+
+        self.assertNotIn("<style>", html)
+        urls, inline = render_blocking_resources(html)
+        self.assertEqual(len(urls), 2)
+        self.assertTrue(all("/static/bundles/" in url for url in urls))
+
+    def test_my_work_preloads_first_project_image(self):
+        Project.objects.create(title="P", description="D")
+
+        res = self.client.get(reverse("my_work"))
+
+        self.assertEqual(
+            res.context["preload_image"],
+            self.storage.url("images/project_placeholder.jpg"),
+        )
+        self.assertContains(res, 'fetchpriority="high"', count=2)
+
+    def test_benchmark_render_blocking_reports_each_scenario(self):
+        out = StringIO()
+        call_command(
+            "benchmark_render_blocking", static_root=self.static_root.name, stdout=out
+        )
+
+        totals = [line for line in out.getvalue().splitlines() if " total " in line]
+        self.assertEqual(len(totals), 3)
+        self.assertIn("requests=0   blocking=0.0KiB", totals[-1])
+
+
+# Lazy-loaded project images
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class LazyProjectImageTests(TestCase):
+    def make_project(self, n_images, title="P"):
+        project = Project.objects.create(title=title, description="D")
+        project.tags.add(Tag.objects.get_or_create(name="django")[0])
+        for i in range(n_images):
+            ProjectImage.objects.create(
+                project=project, image=f"project_images/{title}-{i}.png"
+            )
+        return project
+
+    def test_my_work_queries_do_not_grow_with_projects(self):
+        self.make_project(2, "a")
+        with CaptureQueriesContext(connections["default"]) as few:
+            self.client.get(reverse("my_work"))
+
+        for i in range(5):
+            self.make_project(3, f"b{i}")
+        with self.assertNumQueries(len(few)):
+            res = self.client.get(reverse("my_work"))
+
+        self.assertContains(res, 'src="/media/project_images/a-0.png"')
+        self.assertContains(res, 'loading="lazy"', count=3)
+        self.assertContains(res, 'fetchpriority="high"', count=2)  # preload + img
+
+    def test_my_work_falls_back_to_placeholder(self):
+        self.make_project(0)
+
+        res = self.client.get(reverse("my_work"))
+
+        self.assertEqual(
+            res.context["preload_image"], "/static/images/project_placeholder.jpg"
+        )
+
+    def test_carousel_renders_only_first_slide_src(self):
+        project = self.make_project(4)
+
+        res = self.client.get(reverse("project", kwargs={"id": project.id}))
+        html = b"".join(res).decode()  # streamed: the body can be read once
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(html.count('src="/media/project_images/P-0.png"'), 1)
+        self.assertEqual(html.count('href="/media/project_images/P-0.png"'), 1)
+        for i in (1, 2, 3):
+            self.assertIn(f'data-src="/media/project_images/P-{i}.png"', html)
+            self.assertNotIn(f' src="/media/project_images/P-{i}.png"', html)
+        self.assertIn("moveSlide(1)", html)
+
+    def test_carousel_hides_controls_for_single_image(self):
+        project = self.make_project(1)
+
+        res = self.client.get(reverse("project", kwargs={"id": project.id}))
+
+        self.assertNotContains(res, "moveSlide(1)")
+
+
+# Contact form delivery queue
+
+
+class FlakyDelivery:
+    """
+    Delivery backend failing for senders listed in `fail_for`.
+    """
+
+    fail_for = set()
+
+    def send_batch(self, messages):
+        return {m.pk: "boom" if m.email in self.fail_for else None for m in messages}
+
+
+@override_settings(
+    CONTACT_RECIPIENTS=["owner@example.com"],
+    CONTACT_SENDER_LIMIT=2,
+    CONTACT_SENDER_WINDOW=3600,
+    EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+)
+class ContactDeliveryTests(TestCase):
+    def setUp(self):
+        from main.contact_delivery import get_delivery_backend
+
+        cache.clear()
+        self.addCleanup(cache.clear)
+        get_delivery_backend.cache_clear()
+        self.addCleanup(get_delivery_backend.cache_clear)
+
+    def post(self, email="a@example.com", message="Hello there"):
+        data = {"name": "A", "email": email, "subject": "Hi", "message": message}
+        return self.client.post(reverse("contact"), data)
+
+    def queue(self, count, email="a@example.com"):
+        from main.contact_delivery import enqueue_contact_message
+
+        for i in range(count):
+            enqueue_contact_message(
+                {"name": "A", "email": email, "subject": "Hi", "message": f"#{i}"}
+            )
+
+    def test_post_is_a_single_insert_and_duplicates_are_dropped(self):
+        from main.models import ContactMessage
+
+        self.post()  # warm session/messages machinery
+        ContactMessage.objects.all().delete()
+
+        with CaptureQueriesContext(connections["default"]) as ctx:
+            response = self.post(message="Fresh message")
+        writes = [q for q in ctx.captured_queries if "main_contactmessage" in q["sql"]]
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(writes), 1)
+        self.assertTrue(writes[0]["sql"].startswith("INSERT"))
+
+        self.post(email="A@example.com", message="Fresh message")
+        self.assertEqual(ContactMessage.objects.count(), 1)
+        self.assertEqual(len(mail.outbox), 0)  # nothing sent in the request
+
+    def test_worker_sends_pending_messages_in_one_batch(self):
+        from main.contact_delivery import deliver_pending
+        from main.models import ContactMessage
+
+        self.queue(1)
+        self.queue(1, email="b@example.com")
+
+        counts = deliver_pending()
+
+        self.assertEqual(counts["sent"], 2)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[0].to, ["owner@example.com"])
+        self.assertIn(mail.outbox[0].reply_to[0], {"a@example.com", "b@example.com"})
+        self.assertFalse(
+            ContactMessage.objects.exclude(status=ContactMessage.Status.SENT).exists()
+        )
+        self.assertEqual(deliver_pending()["sent"], 0)
+
+    @override_settings(CONTACT_DELIVERY_BACKEND="main.tests.FlakyDelivery")
+    def test_failures_back_off_then_give_up(self):
+        from main.contact_delivery import deliver_pending
+        from main.models import ContactMessage
+
+        FlakyDelivery.fail_for = {"a@example.com"}
+        self.addCleanup(setattr, FlakyDelivery, "fail_for", set())
+        self.queue(1)
+        msg = ContactMessage.objects.get()
+
+        self.assertEqual(deliver_pending(max_attempts=2)["retried"], 1)
+        msg.refresh_from_db()
+        self.assertEqual((msg.attempts, msg.last_error), (1, "boom"))
+        self.assertGreater(msg.next_attempt_at, timezone.now())
+        self.assertEqual(deliver_pending(max_attempts=2)["retried"], 0)  # not due
+
+        ContactMessage.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(deliver_pending(max_attempts=2)["failed"], 1)
+        msg.refresh_from_db()
+        self.assertEqual(msg.status, ContactMessage.Status.FAILED)
+
+    def test_sender_throttle_defers_extra_messages(self):
+        from main.contact_delivery import deliver_pending
+        from main.models import ContactMessage
+
+        self.queue(3)
+
+        counts = deliver_pending()
+
+        self.assertEqual((counts["sent"], counts["throttled"]), (2, 1))
+        held = ContactMessage.objects.get(status=ContactMessage.Status.PENDING)
+        self.assertGreater(held.next_attempt_at, timezone.now() + timedelta(minutes=59))
+
+    def test_command_runs_once(self):
+        self.queue(1)
+        out = StringIO()
+        call_command("deliver_contact_messages", once=True, stdout=out)
+        self.assertIn("1 sent", out.getvalue())
+
+        with override_settings(CONTACT_RECIPIENTS=[]):
+            with self.assertLogs("main", "WARNING") as logs:
+                call_command("deliver_contact_messages", once=True)
+        self.assertIn("CONTACT_RECIPIENTS", logs.output[0])
+
+    def test_duplicates_are_only_dropped_within_the_window(self):
+        from main.contact_delivery import content_hash
+
+        hour = timedelta(hours=1)
+        now = timezone.now()
+        args = ("a@example.com", "Hi", "Hello")
+        with override_settings(CONTACT_DEDUP_WINDOW=3600):
+            self.assertEqual(
+                content_hash(*args, at=now),
+                content_hash("A@example.com ", "Hi", "Hello", at=now),
+            )
+            self.assertNotEqual(
+                content_hash(*args, at=now), content_hash(*args, at=now + hour)
+            )
+
+
+# Spam pre-filter
+
+
+@override_settings(
+    SPAM_MAX_LINKS=1,
+    SPAM_RATE_LIMIT=3,
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+)
+class SpamFilterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(username="u1", password="pass1234")
+        self.project = Project.objects.create(title="P1", description="D1")
+        self.url = reverse("comment_create", kwargs={"id": self.project.id})
+        self.client.login(username="u1", password="pass1234")
+
+    def ajax_post(self, content, **extra):
+        return self.client.post(
+            self.url,
+            {"content": content, **extra},
+            HTTP_X_REQUESTED_WITH="XMLHttpRequest",
+        )
+
+    def test_checks_never_query_the_database(self):
+        from main import spam
+
+        request = RequestFactory().post("/", {"website": "http://x"})
+        with self.assertNumQueries(0):
+            self.assertEqual(spam.check_submission(request, "t", "hi"), spam.HONEYPOT)
+            request = RequestFactory().post("/")
+            self.assertIsNone(spam.check_submission(request, "t", "hi"))
+            self.assertEqual(spam.check_submission(request, "t", "hi"), spam.DUPLICATE)
+
+    def test_rejected_comments_are_not_saved_or_rerendered(self):
+        cases = [
+            ({"website": "spam.example"}, "Looks legit", 400),
+            ({}, "see http://a.example and www.b.example", 400),
+        ]
+        for extra, content, status in cases:
+            res = self.ajax_post(content, **extra)
+            self.assertEqual(res.status_code, status)
+            self.assertNotIn("comment-card", res.content.decode())
+        self.assertFalse(Comment.objects.exists())
+
+    def test_duplicate_and_rate_limit(self):
+        self.assertEqual(self.ajax_post("First!").status_code, 200)
+        self.assertEqual(self.ajax_post("first").status_code, 400)  # fingerprint
+        self.assertEqual(self.ajax_post("Second").status_code, 200)
+        self.assertEqual(self.ajax_post("Third").status_code, 429)
+        self.assertEqual(Comment.objects.count(), 2)
+
+    def test_honeypot_rejects_invalid_posts_without_app_queries(self):
+        self.ajax_post("warm up")  # session and user lookups are cached now
+
+        with CaptureQueriesContext(connections["default"]) as ctx:
+            res = self.ajax_post("", website="spam.example")
+
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(res.content.decode(), "Submission rejected.")
+        self.assertEqual(
+            [q["sql"] for q in ctx.captured_queries if "main_" in q["sql"]], []
+        )
+
+    def test_invalid_posts_do_not_count_against_the_limits(self):
+        for _ in range(3):
+            self.assertNotIn(self.ajax_post("").status_code, (400, 429))
+        self.assertEqual(self.ajax_post("Corrected").status_code, 200)
+        self.assertEqual(Comment.objects.count(), 1)
+
+    def test_edits_are_filtered_too(self):
+        comment = Comment.objects.create(
+            project=self.project, user=self.user, content="Original"
+        )
+        url = reverse(
+            "comment_update",
+            kwargs={"id": self.project.id, "comment_id": comment.id},
+        )
+
+        res = self.client.post(
+            url,
+            {"content": "see http://a.example and www.b.example"},
+            HTTP_X_REQUESTED_WITH="XMLHttpRequest",
+        )
+
+        self.assertEqual(res.status_code, 400)
+        comment.refresh_from_db()
+        self.assertEqual(comment.content, "Original")
+
+    def test_short_texts_are_only_duplicates_per_identity(self):
+        self.assertEqual(self.ajax_post("Nice work").status_code, 200)
+        User.objects.create_user(username="u2", password="pass1234")
+        self.client.login(username="u2", password="pass1234")
+        self.assertEqual(self.ajax_post("Nice work").status_code, 200)
+
+    def test_contact_honeypot_pretends_success(self):
+        from main.models import ContactMessage
+
+        data = {
+            "name": "Bot",
+            "email": "bot@example.com",
+            "subject": "Deal",
+            "message": "An offer you cannot refuse",
+            "website": "http://spam.example",
+        }
+        res = self.client.post(reverse("contact"), data)
+
+        self.assertRedirects(res, reverse("contact"))
+        self.assertFalse(ContactMessage.objects.exists())
+
+        del data["website"]
+        self.client.post(reverse("contact"), data)
+        res = self.client.post(reverse("contact"), data)
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(ContactMessage.objects.count(), 1)
+
+
+# Startup cost
+
+
+def fake_users_sheet():
+    return "fake worksheet"
+
+
+class StartupProfileTests(SimpleTestCase):
+    def test_parse_importtime(self):
+        from main.benchmarks import parse_importtime
+
+        stderr = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        450 |   gspread.auth\n"
+            "import time:        30 |        480 | gspread\n"
+        )
+        self.assertEqual(
+            parse_importtime(stderr),
+            [("gspread.auth", 120, 450), ("gspread", 30, 480)],
+        )
+
+    def test_boot_stays_within_budget_without_sheet_dependencies(self):
+        from main.benchmarks import (
+            STARTUP_BUDGET_MS,
+            lazy_modules_loaded,
+            profile_startup,
+        )
+
+        report = profile_startup()
+
+        self.assertIn("main.views", report["modules"])
+        self.assertEqual(lazy_modules_loaded(report["modules"]), [])
+        self.assertLess(report["boot_ms"], STARTUP_BUDGET_MS)
+
+    @override_settings(USER_SHEET_BACKEND="main.tests.fake_users_sheet")
+    def test_users_sheet_backend_is_pluggable(self):
+        from main.sheets import get_users_sheet
+
+        self.assertEqual(get_users_sheet(), "fake worksheet")
+
+
+# Slow-query log
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class SlowQueryLogTests(TestCase):
+    def setUp(self):
+        from main import slow_queries
+
+        self.project = Project.objects.create(title="P1", description="D1")
+        slow_queries.clear()
+        self.addCleanup(slow_queries.clear)
+
+    def log_every_query(self):
+        # Threshold 0 makes every query "slow"; assertLogs keeps them quiet
+        stack = ExitStack()
+        stack.enter_context(self.settings(SLOW_QUERY_MS=0))
+        stack.enter_context(self.assertLogs("main.slow_queries", "WARNING"))
+        return stack
+
+    def test_fingerprint_ignores_literals_and_parameters(self):
+        from main.slow_queries import fingerprint
+
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id = 1 AND name = 'a'"),
+            fingerprint("SELECT * FROM t WHERE id = 22 AND name = 'b''c'"),
+        )
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id IN (%s, %s)"),
+            fingerprint("SELECT * FROM t WHERE id IN (%s, %s, %s)"),
+        )
+
+    def test_queries_are_aggregated_per_view_with_explain(self):
+        from main import slow_queries
+        from main.snapshots import invalidate_project_snapshots
+
+        with self.log_every_query(), self.settings(SLOW_QUERY_EXPLAIN=True):
+            for _ in range(2):
+                # A cold project snapshot each time, so the view queries
+                invalidate_project_snapshots([self.project.id])
+                self.client.get(reverse("project", kwargs={"id": self.project.id}))
+
+        entries = slow_queries.aggregated().values()
+        lookup = next(
+            e for e in entries if e["sql"].startswith('SELECT "main_project"')
+        )
+        self.assertEqual(lookup["count"], 2)
+        self.assertEqual(lookup["views"], {"project": 2})
+        self.assertIn("main_project", lookup["explain"])
+
+    def test_failed_explain_rolls_back_only_its_savepoint(self):
+        from main.slow_queries import explain
+
+        # TestCase wraps each test in a transaction, as ATOMIC_REQUESTS would
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertIsNone(explain(connection, "SELECT * FROM no_such_table", ()))
+        self.assertTrue(
+            any("ROLLBACK TO SAVEPOINT" in q["sql"] for q in ctx.captured_queries)
+        )
+        self.assertEqual(Project.objects.count(), 1)
+
+    def test_threshold_and_disabled(self):
+        from main import slow_queries
+
+        with override_settings(SLOW_QUERY_MS=10_000):
+            Project.objects.count()
+        with override_settings(SLOW_QUERY_MS=None):
+            Project.objects.count()
+        self.assertEqual(slow_queries.aggregated(), {})
+
+        with self.log_every_query():
+            Project.objects.count()
+        (entry,) = slow_queries.aggregated().values()
+        self.assertEqual(entry["views"], {"(no request)": 1})
+
+    @override_settings(CACHE_IS_SHARED=True)
+    def test_report_command(self):
+        with self.log_every_query():
+            Project.objects.count()
+        out = StringIO()
+        call_command("slow_queries", stdout=out)
+        self.assertIn("1 slow query fingerprints", out.getvalue())
+        self.assertIn("COUNT(*)", out.getvalue())
+
+        call_command("slow_queries", clear=True, stdout=StringIO())
+        out = StringIO()
+        call_command("slow_queries", stdout=out)
+        self.assertIn("No slow queries", out.getvalue())
+
+    def test_report_command_needs_a_shared_cache(self):
+        with override_settings(CACHE_IS_SHARED=False):
+            with self.assertRaisesMessage(CommandError, "REDIS_URL"):
+                call_command("slow_queries", stdout=StringIO())
+
+
+# Sampling profiler
+
+
+def sampled_view():
+    # Sample this thread from another one, as the sampling thread would
+    from main import profiling
+
+    thread = threading.Thread(target=profiling.sampler.sample)
+    thread.start()
+    thread.join()
+
+
+@override_settings(SAMPLING_PROFILER=True)
+class SamplingProfilerTests(TestCase):
+    def setUp(self):
+        from main import profiling
+
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.addCleanup(profiling.stop_session)
+        sampler = patch.object(
+            profiling, "sampler", profiling.Sampler(background=False)
+        )
+        sampler.start()
+        self.addCleanup(sampler.stop)
+        self.url = reverse("profiler")
+
+    def profile_request(self):
+        from django.urls import resolve
+
+        from main.middleware import ProfilerMiddleware
+
+        def get_response(request):
+            middleware.process_view(request, sampled_view, (), {})
+            sampled_view()
+            return HttpResponse()
+
+        middleware = ProfilerMiddleware(get_response)
+        request = RequestFactory().get("/")
+        request.resolver_match = resolve("/")
+        return middleware(request)
+
+    def test_disabled_by_default(self):
+        from main.middleware import ProfilerMiddleware
+
+        with override_settings(SAMPLING_PROFILER=False):
+            with self.assertRaises(MiddlewareNotUsed):
+                ProfilerMiddleware(lambda request: HttpResponse())
+
+    def test_fold_is_root_first(self):
+        import sys
+
+        from main.profiling import fold
+
+        stack = fold(sys._getframe()).split(";")
+        self.assertEqual(stack[-1], "main.tests:test_fold_is_root_first")
+
+    def test_staff_only(self):
+        User.objects.create_user(username="u1", password="pass1234")
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.login(username="u1", password="pass1234")
+        self.assertEqual(
+            self.client.post(self.url, {"action": "start"}).status_code, 404
+        )
+
+    def test_session_samples_views_into_folded_stacks(self):
+        User.objects.create_user(username="staff", password="pass1234", is_staff=True)
+        self.client.login(username="staff", password="pass1234")
+
+        self.profile_request()  # no session: not sampled
+        self.assertEqual(self.client.get(self.url).json()["views"], {})
+
+        res = self.client.post(self.url, {"action": "start", "seconds": 30})
+        self.assertIsNotNone(res.json()["session"])
+        self.profile_request()
+
+        self.assertEqual(self.client.get(self.url).json()["views"]["home"], 1)
+        folded = self.client.get(self.url, {"format": "folded", "view": "home"})
+        self.assertEqual(folded["Content-Type"], "text/plain; charset=utf-8")
+        (line,) = folded.content.decode().splitlines()
+        self.assertRegex(line, r"main\.tests:sampled_view;.* 1$")
+
+        self.client.post(self.url, {"action": "clear"})
+        self.client.post(self.url, {"action": "stop"})
+        status = self.client.get(self.url).json()
+        self.assertEqual((status["session"], status["views"]), (None, {}))
+
+    def test_percent_zero_samples_nothing(self):
+        from main import profiling
+
+        profiling.start_session(30, percent=0)
+        self.profile_request()
+        self.assertEqual(profiling.samples_per_view(), {})
+
+
+# Load-test scenario runner
+
+
+class LoadTestTests(TestCase):
+    def test_histogram_buckets(self):
+        from main.benchmarks import histogram
+
+        self.assertEqual(
+            histogram([0.001, 0.005, 0.006, 3.0], edges=(5, 10)), [2, 1, 1]
+        )
+
+    def test_load_mix_from_name_or_json_file(self):
+        from main.loadtest import SCENARIOS, load_mix
+
+        self.assertEqual(load_mix("browse"), SCENARIOS["browse"])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp, "mix.json")
+            path.write_text('{"home": 3, "login": 1}')
+            self.assertEqual(load_mix(str(path)), {"home": 3, "login": 1})
+            path.write_text('{"home": 1, "nope": 1}')
+            with self.assertRaises(ValueError):
+                load_mix(str(path))
+
+    def test_production_mix_runs_against_local_stand_ins(self):
+        from main.loadtest import SCENARIOS, isolated_settings, run
+        from main.seeding import seed
+
+        with tempfile.TemporaryDirectory() as tmp:
+            with override_settings(**isolated_settings(tmp)):
+                data = seed(projects=3, comments=2, users=2, sheet_users=1)
+                results, elapsed = run(
+                    SCENARIOS["production"], data, concurrency=1, requests=40
+                )
+
+        self.assertEqual(sum(len(s.latencies) for s in results.values()), 40)
+        self.assertEqual({n: s.errors for n, s in results.items() if s.errors}, {})
+        self.assertGreater(elapsed, 0)
+        self.assertEqual(Project.objects.count(), 3)
+
+
+# Per-view cost budgets
+#
+# One warm request (caches filled, session started) to each view may cost
+# at most this many queries, template renders (includes and form widgets
+# count) and KiB of body, against data seeded at production-like scale.
+# A per-row query or include in a template shows up as a blown budget.
+# Tighten a budget when a view gets cheaper; raise one only on purpose.
+
+
+class ViewBudget(NamedTuple):
+    url_name: str
+    queries: int
+    templates: int
+    kib: int
+    signed_in: bool = False
+    ajax: bool = False
+
+
+VIEW_BUDGETS = (
+    ViewBudget("home", queries=1, templates=2, kib=24),
+    ViewBudget("my_work", queries=2, templates=2, kib=48),
+    ViewBudget("project", queries=0, templates=2, kib=24),
+    ViewBudget("project_comments_partial", queries=0, templates=1, kib=16, ajax=True),
+    ViewBudget("contact", queries=0, templates=14, kib=12),
+    ViewBudget("api_projects", queries=3, templates=0, kib=10),
+    ViewBudget("api_project_comments", queries=3, templates=0, kib=4),
+    ViewBudget("project_search", queries=3, templates=0, kib=4),
+    ViewBudget("tag_index", queries=0, templates=0, kib=2),
+    # Signed in: + session and user lookups, + edit/delete controls
+    ViewBudget("home", queries=3, templates=2, kib=24, signed_in=True),
+    ViewBudget("my_work", queries=4, templates=2, kib=48, signed_in=True),
+    ViewBudget("project", queries=2, templates=9, kib=24, signed_in=True),
+    ViewBudget(
+        "project_comments_partial",
+        queries=2,
+        templates=8,
+        kib=16,
+        signed_in=True,
+        ajax=True,
+    ),
+)
+
+# Seed scale for the budgets: enough rows that per-row costs dominate
+BUDGET_SEED = {"projects": 30, "comments": 25, "users": 20, "sheet_users": 1}
+
+
+def measure_request(client, url, **extra):
+    """
+    (queries, template renders, body bytes) of one GET, streamed bodies
+    included.
+    """
+    rendered = []
+
+    def on_render(sender, template, context, **kwargs):
+        rendered.append(template.name)
+
+    template_rendered.connect(on_render)
+    try:
+        with CaptureQueriesContext(connections["default"]) as queries:
+            response = client.get(url, **extra)
+            body = b"".join(response)
+    finally:
+        template_rendered.disconnect(on_render)
+    if response.status_code != 200:
+        raise AssertionError(f"GET {url} returned {response.status_code}")
+    return len(queries), len(rendered), len(body)
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class ViewBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        from main.seeding import seed
+
+        cls.data = seed(**BUDGET_SEED)
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def url_for(self, url_name):
+        if url_name in ("project", "project_comments_partial", "api_project_comments"):
+            return reverse(url_name, kwargs={"id": self.data["projects"][0]})
+        if url_name == "project_search":
+            return reverse(url_name) + "?q=load"
+        return reverse(url_name)
+
+    def test_views_stay_within_budget(self):
+        for budget in VIEW_BUDGETS:
+            with self.subTest(budget.url_name, signed_in=budget.signed_in):
+                if budget.signed_in:
+                    user = User.objects.get(username=self.data["usernames"][0])
+                    self.client.force_login(user)
+                else:
+                    self.client.logout()
+                url = self.url_for(budget.url_name)
+                extra = (
+                    {"HTTP_X_REQUESTED_WITH": "XMLHttpRequest"} if budget.ajax else {}
+                )
+
+                self.client.get(url, **extra)  # warm caches and the session
+                queries, templates, size = measure_request(self.client, url, **extra)
+
+                self.assertLessEqual(queries, budget.queries, "queries")
+                self.assertLessEqual(templates, budget.templates, "template renders")
+                self.assertLessEqual(size, budget.kib * 1024, "response bytes")
+
+    def test_budget_catches_a_dropped_prefetch(self):
+        from main import views
+
+        def without_prefetch():
+            projects = list(Project.objects.all())
+            for p in projects:
+                p.card_image_url = ""
+            return projects
+
+        budget = next(b for b in VIEW_BUDGETS if b.url_name == "my_work")
+        with patch.object(views, "_projects_with_card_images", without_prefetch):
+            queries, _, _ = measure_request(self.client, reverse("my_work"))
+
+        self.assertGreater(queries, budget.queries)
+        self.assertGreaterEqual(queries, BUDGET_SEED["projects"])  # one per card
+
+
+# Response compression
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class CompressionTests(TestCase):
+    def setUp(self):
+        from main import compression
+
+        cache.clear()
+        compression.reset_stats()
+        self.addCleanup(cache.clear)
+        user = User.objects.create_user(username="reader", password="pass1234")
+        self.project = Project.objects.create(title="P", description="D")
+        Comment.objects.bulk_create(
+            Comment(project=self.project, user=user, content=f"Comment number {n}")
+            for n in range(20)
+        )
+        self.partial_url = reverse(
+            "project_comments_partial", kwargs={"id": self.project.id}
+        )
+
+    def get(self, url, encoding):
+        return self.client.get(
+            url, HTTP_ACCEPT_ENCODING=encoding, HTTP_X_REQUESTED_WITH="XMLHttpRequest"
+        )
+
+    def decode(self, response):
+        import gzip
+
+        import brotli
+
+        body = b"".join(response)  # streaming or not
+        if response["Content-Encoding"] == "br":
+            return brotli.decompress(body)
+        return gzip.decompress(body)
+
+    def test_encoding_follows_accept_encoding(self):
+        from main.compression import choose_encoding
+
+        plain = self.get(self.partial_url, "").content
+        self.assertEqual(choose_encoding("gzip, deflate, br"), "br")
+        self.assertEqual(choose_encoding("gzip, br;q=0"), "gzip")
+        self.assertIsNone(choose_encoding("identity"))
+        for header, expected in (("gzip, br", "br"), ("gzip, br;q=0", "gzip")):
+            res = self.get(self.partial_url, header)
+            self.assertEqual(res["Content-Encoding"], expected)
+            self.assertIn("Accept-Encoding", res["Vary"])
+            self.assertEqual(int(res["Content-Length"]), len(res.content))
+            self.assertEqual(self.decode(res), plain)
+        self.assertFalse(self.get(self.partial_url, "").has_header("Content-Encoding"))
+
+    def test_small_responses_are_not_compressed(self):
+        from main.compression import stats
+
+        with override_settings(COMPRESSION_MIN_BYTES=10**6):
+            from main.middleware import CompressionMiddleware
+
+            request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="br")
+            middleware = CompressionMiddleware(
+                lambda request: HttpResponse("<p>hi</p>" * 100)
+            )
+            res = middleware(request)
+        self.assertFalse(res.has_header("Content-Encoding"))
+        self.assertEqual(stats()["skipped_small"], 1)
+
+    def test_pages_with_a_csrf_field_are_not_compressed(self):
+        from main.compression import stats
+
+        res = self.get(reverse("home"), "br")
+        self.assertIn(b'name="csrfmiddlewaretoken"', res.content)
+        self.assertFalse(res.has_header("Content-Encoding"))
+        self.assertEqual(stats()["skipped_csrf"], 1)
+
+        with override_settings(COMPRESSION_EXCLUDE_CSRF=False):
+            from main.middleware import CompressionMiddleware
+
+            page = res.content
+            request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="br")
+            res = CompressionMiddleware(lambda request: HttpResponse(page))(request)
+        self.assertEqual(self.decode(res), page)
+
+    def test_json_is_compressed(self):
+        url = reverse("api_project_comments", kwargs={"id": self.project.id})
+        plain = self.get(url, "")
+        res = self.get(url, "gzip")
+        self.assertEqual(res["Content-Encoding"], "gzip")
+        self.assertEqual(self.decode(res), plain.content)
+
+    def test_streaming_responses_are_compressed_per_chunk(self):
+        from django.http import StreamingHttpResponse
+
+        from main.compression import stats
+        from main.middleware import CompressionMiddleware
+
+        chunks = [f"line {n}\n".encode() * 50 for n in range(5)]
+
+        def get_response(request):
+            return StreamingHttpResponse(iter(chunks), content_type="text/plain")
+
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip")
+        res = CompressionMiddleware(get_response)(request)
+        self.assertEqual(res["Content-Encoding"], "gzip")
+        self.assertEqual(self.decode(res), b"".join(chunks))
+        self.assertEqual(stats()["bytes_in"], len(b"".join(chunks)))
+
+        # A streamed HTML page can't be checked for a CSRF field up front
+        html = StreamingHttpResponse(iter(chunks), content_type="text/html")
+        res = CompressionMiddleware(lambda request: html)(request)
+        self.assertFalse(res.has_header("Content-Encoding"))
+
+    @override_settings(PROJECT_PAGE_STREAMING=True)
+    def test_streamed_project_page_is_compressed_when_signed_out(self):
+        from main.compression import stats
+
+        url = reverse("project", kwargs={"id": self.project.id})
+        res = self.client.get(url, HTTP_ACCEPT_ENCODING="br")
+        self.assertTrue(res.streaming)
+        self.assertEqual(res["Content-Encoding"], "br")
+        self.assertNotIn(b"csrfmiddlewaretoken", self.decode(res))
+
+        self.client.login(username="reader", password="pass1234")
+        res = self.client.get(url, HTTP_ACCEPT_ENCODING="br")
+        self.assertFalse(res.has_header("Content-Encoding"))
+        self.assertIn(b"csrfmiddlewaretoken", b"".join(res))
+        self.assertEqual(stats()["skipped_csrf"], 1)
+
+    def test_metrics_report_bytes_saved_to_staff_only(self):
+        self.get(self.partial_url, "br")
+        url = reverse("metrics")
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        User.objects.create_user(username="staff", password="pass1234", is_staff=True)
+        self.client.login(username="staff", password="pass1234")
+        totals = self.client.get(url).json()["compression"]
+        self.assertEqual(totals["compressed_br"], 1)
+        self.assertEqual(
+            totals["bytes_saved"], totals["bytes_in"] - totals["bytes_out"]
+        )
+        self.assertGreater(totals["bytes_saved"], 0)
+
+
+# Streamed project page
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+    PROJECT_PAGE_STREAMING=True,
+    # Comments left out of the project snapshot, so queried while streaming
+    PROJECT_SNAPSHOT_COMMENTS=2,
+)
+class StreamingProjectPageTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="u1", password="pass1234")
+        self.project = Project.objects.create(title="Streamed", description="D")
+        Comment.objects.bulk_create(
+            Comment(project=self.project, user=self.user, content=f"Comment {n}")
+            for n in range(3)
+        )
+        self.url = reverse("project", kwargs={"id": self.project.id})
+
+    def test_above_the_fold_is_sent_before_comments_are_queried(self):
+        b"".join(self.client.get(self.url))  # warm the project snapshot
+        with CaptureQueriesContext(connections["default"]) as queries:
+            res = self.client.get(self.url)
+            self.assertTrue(res.streaming)
+            self.assertFalse(any("main_comment" in q["sql"] for q in queries))
+            chunks = [chunk.decode() for chunk in res.streaming_content]
+
+        self.assertTrue(any("main_comment" in q["sql"] for q in queries))
+        self.assertIn('<h1 class="mb-3">Streamed</h1>', chunks[0])
+        self.assertNotIn("comment-card", chunks[0])
+        self.assertIn("Comment 2", "".join(chunks[1:]))
+        self.assertTemplateUsed(res, "project.html")
+
+    def test_streamed_page_matches_a_normal_render(self):
+        streamed = b"".join(self.client.get(self.url))
+        with override_settings(PROJECT_PAGE_STREAMING=False):
+            res = self.client.get(self.url)
+        self.assertFalse(res.streaming)
+        self.assertEqual(streamed, res.content)
+
+    def test_comment_form_gets_a_csrf_cookie(self):
+        self.client.login(username="u1", password="pass1234")
+        res = self.client.get(self.url)
+        html = b"".join(res).decode()
+        self.assertIn(settings.CSRF_COOKIE_NAME, res.cookies)
+        self.assertIn('class="comments-form"', html)
+        self.assertIn('name="csrfmiddlewaretoken"', html)
+
+    async def test_streams_asynchronously_under_asgi(self):
+        res = await self.async_client.get(self.url)
+        chunks = [chunk async for chunk in res]
+        self.assertTrue(res.is_async)
+        self.assertGreater(len(chunks), 1)
+        self.assertIn(b"Comment 0", b"".join(chunks))
+
+
+# Project snapshots
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class ProjectSnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(username="u1", password="pass1234")
+        self.project = Project.objects.create(title="P1", description="D1")
+        self.partial_url = reverse(
+            "project_comments_partial", kwargs={"id": self.project.id}
+        )
+
+    def snapshot(self):
+        from main.snapshots import get_project_snapshot
+
+        return get_project_snapshot(self.project.id)
+
+    def comment(self, content="Hello"):
+        return Comment.objects.create(
+            project=self.project, user=self.user, content=content
+        )
+
+    def test_warm_snapshot_serves_views_without_queries(self):
+        self.comment()
+        ProjectImage.objects.create(project=self.project, image="project_images/a.png")
+        project_url = reverse("project", kwargs={"id": self.project.id})
+        self.client.get(self.partial_url)  # builds the snapshot
+
+        with self.assertNumQueries(0):
+            res = self.client.get(self.partial_url)
+            page = b"".join(self.client.get(project_url)).decode()
+        self.assertContains(res, "Hello")
+        self.assertContains(res, "u1")
+        self.assertIn('<h1 class="mb-3">P1</h1>', page)
+        self.assertIn('src="/media/project_images/a.png"', page)
+
+    def test_missing_project_is_404(self):
+        url = reverse("project_comments_partial", kwargs={"id": 999})
+        self.assertEqual(self.client.get(url).status_code, 404)
+        url = reverse("project", kwargs={"id": 999})
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_signals_keep_the_snapshot_current(self):
+        self.snapshot()
+        self.project.title = "Renamed"
+        self.project.save()
+        self.assertEqual(self.snapshot().project.title, "Renamed")
+
+        image = ProjectImage.objects.create(
+            project=self.project, image="project_images/a.png"
+        )
+        self.assertEqual([i.pk for i in self.snapshot().images], [image.pk])
+
+        comment = self.comment()
+        self.assertEqual([c.content for c in self.snapshot().comments], ["Hello"])
+        self.user.username = "renamed"
+        self.user.save()
+        self.assertEqual(self.snapshot().comments[0].user.username, "renamed")
+        comment.delete()
+        self.assertEqual(self.snapshot().comments, [])
+
+    def test_admin_moderation_reaches_the_snapshot(self):
+        comment = self.comment()
+        self.assertEqual(len(self.snapshot().comments), 1)
+
+        User.objects.create_superuser(username="admin", password="pass1234")
+        self.client.login(username="admin", password="pass1234")
+        self.client.post(
+            reverse("admin:main_comment_changelist"),
+            {"action": "hide_comments", "_selected_action": [comment.pk]},
+        )
+        self.assertEqual(self.snapshot().comments, [])
+
+    @override_settings(PROJECT_SNAPSHOT_TIMEOUT=42)
+    def test_snapshots_expire(self):
+        # Without a shared cache other workers' copies only go on expiry
+        with patch("main.snapshots.cache") as fake_cache:
+            fake_cache.get.return_value = None
+            self.snapshot()
+        self.assertEqual(fake_cache.set.call_args.args[2], 42)
+
+    @override_settings(DATABASE_ROUTERS=["main.routers.PrimaryReplicaRouter"])
+    def test_snapshot_is_built_from_the_primary(self):
+        from main.routers import use_primary
+
+        token = use_primary.set(False)  # reads would go to the replica
+        self.addCleanup(use_primary.reset, token)
+        with self.assertNumQueries(3, using="default"):
+            self.snapshot()
+
+    @override_settings(PROJECT_SNAPSHOT_COMMENTS=1)
+    def test_busy_projects_leave_comments_out(self):
+        self.comment("First")
+        self.comment("Second")
+        self.assertIsNone(self.snapshot().comments)
+        res = self.client.get(self.partial_url)
+        self.assertContains(res, "First")
+        self.assertContains(res, "Second")
+
+
 # CI prod safety check
 
 
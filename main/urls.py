@@ -1,12 +1,15 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 urlpatterns = [
     path("", views.home, name="home"),
     path("contact/", views.contact, name="contact"),
     path("project/<int:id>/", views.project, name="project"),
     path("my_work/", views.my_work, name="my_work"),
+    # JSON search used by the home page
+    path("projects/search/", views.project_search, name="project_search"),
+    path("tags/index/", views.tag_index, name="tag_index"),
     # partial comments for modal
     path(
         "project/<int:id>/comments/partial/",
@@ -29,8 +32,22 @@ urlpatterns = [
         views.comment_delete,
         name="comment_delete",
     ),
+    # read-only JSON API
+    path("api/v1/projects/", api.projects, name="api_projects"),
+    path("api/v1/projects/<int:id>/", api.project_detail, name="api_project"),
+    path(
+        "api/v1/projects/<int:id>/comments/",
+        api.project_comments,
+        name="api_project_comments",
+    ),
+    path("api/v1/tags/", api.tags, name="api_tags"),
+    path("api/v1/comments/mine/", api.my_comments, name="api_my_comments"),
     # auth
     path("auth/login/", views.auth_login, name="auth_login"),
     path("auth/register/", views.auth_register, name="auth_register"),
     path("auth/logout/", views.auth_logout, name="auth_logout"),
+    # staff-only sampling profiler
+    path("_profiler/", views.profiler, name="profiler"),
+    # staff-only counters (response compression)
+    path("_metrics/", views.metrics, name="metrics"),
 ]
@@ -1,27 +1,122 @@
 import logging
 
-import gspread
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import logout as django_logout
 from django.contrib.auth.hashers import check_password, make_password
 from django.core.cache import cache
-from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.core.paginator import Paginator
+from django.db.models import OuterRef, Subquery
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse
+from django.middleware.csrf import get_token
 from django.shortcuts import get_object_or_404, redirect, render
+from django.templatetags.static import static
 from django.urls import reverse
 from django.utils import timezone
-from django.views.decorators.http import require_POST
+from django.utils.functional import SimpleLazyObject
+from django.views.decorators.http import require_http_methods, require_POST
 
+from . import compression, profiling, spam
+from .contact_delivery import enqueue_contact_message
 from .forms import CommentForm, ContactForm
-from .models import Comment, Project, Tag
+from .models import Comment, Project, ProjectImage, Tag
+from .search import SEARCH_PAGE_SIZE, search_projects
+from .sheets import get_users_sheet
+from .snapshots import get_project_snapshot
+from .streaming import render_streaming
+from .tag_index import get_tag_index
 
 logger = logging.getLogger(__name__)
 
+# my_work cards (first row on desktop) whose images load eagerly
+MY_WORK_EAGER_IMAGES = 3
+
 # Google Sheet header constants
 USER_SHEET_HEADERS = ["User Name", "Email", "Date Joined", "Password (Now Hashed)"]
 PASSWORD_HEADER = "Password (Now Hashed)"  # must match sheet header
 
 
+# --------------------
+# HELPERS
+# --------------------
+def _visible_comments(project_obj):
+    """
+    Publicly listed comments for a project, newest first.
+    """
+    return (
+        Comment.objects.filter(project=project_obj)
+        .select_related("user")
+        .order_by("-created_at")
+    )
+
+
+def _comments_context(request, project_obj, form=None, lazy=False, comments=None):
+    """
+    Context for partials/project_comments.html.
+
+    Pass `form` to re-render a bound form with errors; otherwise a blank form
+    is shown to viewers who can comment. `comments` are used as given (from
+    a project snapshot); otherwise they are queried, with `lazy` only when
+    the template first uses them (streamed pages).
+    """
+    viewer = request.viewer
+    if form is None and viewer.can_comment:
+        form = CommentForm()
+
+    if comments is not None:
+        manageable_ids = viewer.manageable_ids(comments)
+    elif lazy:
+        comments = SimpleLazyObject(lambda: list(_visible_comments(project_obj)))
+        manageable_ids = SimpleLazyObject(lambda: viewer.manageable_ids(comments))
+    else:
+        comments = list(_visible_comments(project_obj))
+        manageable_ids = viewer.manageable_ids(comments)
+
+    return {
+        "project": project_obj,
+        "comments": comments,
+        "form": form,
+        "manageable_comment_ids": manageable_ids,
+    }
+
+
+def _projects_with_card_images():
+    """
+    Projects for the my_work cards, each with `card_image_url`: its first
+    upload (picked in SQL, one query for all cards) or the placeholder.
+    """
+    first_image = (
+        ProjectImage.objects.filter(project=OuterRef("pk"))
+        .order_by("pk")
+        .values("image")[:1]
+    )
+    projects = list(
+        Project.objects.annotate(first_image=Subquery(first_image)).prefetch_related(
+            "tags"
+        )
+    )
+    storage = ProjectImage._meta.get_field("image").storage
+    placeholder = static("images/project_placeholder.jpg")
+    for p in projects:
+        p.card_image_url = storage.url(p.first_image) if p.first_image else placeholder
+    return projects
+
+
+def _render_comments_partial(request, project_obj, form=None, comments=None):
+    return render(
+        request,
+        "partials/project_comments.html",
+        _comments_context(request, project_obj, form, comments=comments),
+    )
+
+
+def _project_snapshot(id):
+    try:
+        return get_project_snapshot(id)
+    except Project.DoesNotExist:
+        raise Http404("No Project matches the given query.") from None
+
+
 # --------------------
 # BASIC PAGES
 # --------------------
@@ -32,9 +127,18 @@ def home(request):
 
 
 def my_work(request):
-    projects = Project.objects.all()
+    projects = _projects_with_card_images()
     tags = Tag.objects.all()
-    return render(request, "my_work.html", {"projects": projects, "tags": tags})
+    return render(
+        request,
+        "my_work.html",
+        {
+            "projects": projects,
+            "tags": tags,
+            "eager_images": MY_WORK_EAGER_IMAGES,
+            "preload_image": projects[0].card_image_url if projects else None,
+        },
+    )
 
 
 def contact(request):
@@ -44,8 +148,21 @@ def contact(request):
     if request.method == "POST":
         form = ContactForm(request.POST)
         if form.is_valid():
-            messages.success(request, "Message sent successfully.")
-            return redirect("contact")
+            data = form.cleaned_data
+            rejected = spam.check_submission(request, "contact", data["message"])
+            if rejected is None:
+                # Stored only; the delivery worker emails it (main.contact_delivery).
+                enqueue_contact_message(data)
+            if rejected in (None, spam.HONEYPOT):  # bots are told it worked
+                messages.success(request, "Message sent successfully.")
+                return redirect("contact")
+            messages.error(request, spam.MESSAGES[rejected])
+            return render(
+                request,
+                "contact.html",
+                {"form": form},
+                status=spam.status_for(rejected),
+            )
         messages.error(request, "Please correct the errors below.")
     else:
         form = ContactForm()
@@ -57,26 +174,75 @@ def project(request, id):
     """
     Full project detail page.
     """
-    project_obj = get_object_or_404(Project, pk=id)
-    comments = project_obj.comments.select_related("user").order_by("-created_at")
-
-    # allow either Django-auth or sheet-auth to post
-    can_comment = request.user.is_authenticated or bool(
-        request.session.get("user_email")
+    # No queries with a warm snapshot (main.snapshots)
+    snapshot = _project_snapshot(id)
+    streaming = getattr(settings, "PROJECT_PAGE_STREAMING", True)
+    context = _comments_context(
+        request, snapshot.project, lazy=streaming, comments=snapshot.comments
     )
-    form = CommentForm() if can_comment else None
+    # Only the first slide's src is rendered; project.js fetches the others
+    # from data-src as they (or their neighbours) are shown.
+    context["images"] = snapshot.images
+    if not streaming:
+        return render(request, "project.html", context)
+
+    # Everything above the fold is rendered now; comments are queried and
+    # rendered while it is on its way. The comment form's {% csrf_token %}
+    # renders after CsrfViewMiddleware is done, so set the cookie up front.
+    signed_in = request.viewer.can_comment
+    if signed_in:
+        get_token(request)
+    response = render_streaming(request, "project.html", context)
+    # Signed out, the page has no form, so CompressionMiddleware may
+    # compress it without checking the body
+    response.has_csrf_field = signed_in
+    return response
 
-    return render(
-        request,
-        "project.html",
+
+# --------------------
+# PROJECT SEARCH
+# --------------------
+def project_search(request):
+    """
+    JSON search over project titles, descriptions and tag names.
+
+    Query params: `q` (free text), `tag` (exact tag name), `page`.
+    Matching rules (word prefixes on SQLite) are in main.search.
+    """
+    query = request.GET.get("q", "")
+    tag = request.GET.get("tag", "")
+
+    paginator = Paginator(search_projects(query, tag=tag), SEARCH_PAGE_SIZE)
+    page = paginator.get_page(request.GET.get("page"))
+    results = page.object_list.prefetch_related("tags")
+
+    return JsonResponse(
         {
-            "project": project_obj,
-            "comments": comments,
-            "form": form,
-        },
+            "results": [
+                {
+                    "id": p.pk,
+                    "title": p.title,
+                    "tags": [t.name for t in p.tags.all()],
+                    "url": reverse("project", kwargs={"id": p.pk}),
+                }
+                for p in results
+            ],
+            "page": page.number,
+            "num_pages": paginator.num_pages,
+            "count": paginator.count,
+            "has_next": page.has_next(),
+        }
     )
 
 
+def tag_index(request):
+    """
+    Cached tag -> project IDs index with per-tag counts, so a client can
+    filter by any tag after one request.
+    """
+    return JsonResponse({"tags": get_tag_index()})
+
+
 # --------------------
 # COMMENTS: PARTIAL + CRUD
 # --------------------
@@ -85,22 +251,9 @@ def project_comments_partial(request, id):
     Render just the comments + (optional) form for a specific project.
     Used by the home page popup/modal.
     """
-    project_obj = get_object_or_404(Project, pk=id)
-    comments = project_obj.comments.select_related("user").order_by("-created_at")
-
-    can_comment = request.user.is_authenticated or bool(
-        request.session.get("user_email")
-    )
-    form = CommentForm() if can_comment else None
-
-    return render(
-        request,
-        "partials/project_comments.html",
-        {
-            "project": project_obj,
-            "comments": comments,
-            "form": form,
-        },
+    snapshot = _project_snapshot(id)
+    return _render_comments_partial(
+        request, snapshot.project, comments=snapshot.comments
     )
 
 
@@ -112,161 +265,150 @@ def comment_create(request, id):
     - Normal POST: redirect back to the project page
     - AJAX (from home-page modal): return updated comments partial HTML
     """
-    project_obj = get_object_or_404(Project, pk=id)
     is_ajax = request.headers.get("x-requested-with") == "XMLHttpRequest"
+    viewer = request.viewer
 
-    # detect auth method
-    is_django_user = request.user.is_authenticated
-    sheet_email = request.session.get("user_email")
-    sheet_name = request.session.get("user_name")
-    session_author_name = request.session.get("author_name")
-    has_sheet_identity = bool(sheet_email or sheet_name or session_author_name)
-
-    # block if neither is present
-    if not is_django_user and not has_sheet_identity:
+    # block if neither Django nor sheet/session auth is present
+    if not viewer.can_comment:
         if is_ajax:
             return HttpResponseForbidden("Sign in required.")
         messages.error(request, "Sign in is required to comment.")
-        return redirect(reverse("project", kwargs={"id": project_obj.pk}))
+        return redirect(reverse("project", kwargs={"id": id}))
 
+    # Spam is turned away before any query or partial re-render
     form = CommentForm(request.POST)
+    rejection = _spam_rejection(request, id, form, is_ajax)
+    if rejection:
+        return rejection
+
+    project_obj = get_object_or_404(Project, pk=id)
 
     if form.is_valid():
         comment = form.save(commit=False)
         comment.project = project_obj
 
-        if is_django_user:
-            comment.user = request.user
+        if viewer.is_django_user:
+            comment.user = viewer.user
         else:
             # comments coming from sheet/session auth
-            comment.author_name = sheet_name or session_author_name or sheet_email
-            comment.author_email = sheet_email or ""
+            comment.author_name = viewer.author_name
+            comment.author_email = viewer.email or ""
 
         comment.save()
 
         if is_ajax:
-            comments = project_obj.comments.select_related("user").order_by(
-                "-created_at"
-            )
-            can_comment = is_django_user or has_sheet_identity
-            new_form = CommentForm() if can_comment else None
-
-            return render(
-                request,
-                "partials/project_comments.html",
-                {
-                    "project": project_obj,
-                    "comments": comments,
-                    "form": new_form,
-                },
-            )
+            return _render_comments_partial(request, project_obj)
 
         messages.success(request, "Comment posted.")
     else:
         if is_ajax:
-            comments = project_obj.comments.select_related("user").order_by(
-                "-created_at"
-            )
-            return render(
-                request,
-                "partials/project_comments.html",
-                {
-                    "project": project_obj,
-                    "comments": comments,
-                    "form": form,
-                },
-            )
+            return _render_comments_partial(request, project_obj, form)
         messages.error(request, "Please fix the errors and try again.")
 
     return redirect(reverse("project", kwargs={"id": project_obj.pk}))
 
 
-@require_POST
-def comment_update(request, id, comment_id):
+def _spam_rejection(request, project_id, form, is_ajax):
     """
-    Update an existing comment.
+    Response turning away a CommentForm submission as spam, or None.
 
-    - Django users: can edit comments where comment.user == request.user
-    - Sheet/session users: can edit comments where author_name OR author_email matches their session
-    - AJAX: return updated partial; normal POST: redirect back to project
+    A filled honeypot is rejected whatever the form holds. The other checks
+    need valid content, so an invalid post doesn't count against the rate
+    limit or block its corrected resubmission; an edit that leaves the
+    content unchanged isn't checked again. Validating a CommentForm runs no
+    query, so neither does any of this.
     """
-    project_obj = get_object_or_404(Project, pk=id)
-    is_ajax = request.headers.get("x-requested-with") == "XMLHttpRequest"
+    if spam.honeypot_filled(request):
+        rejected = spam.HONEYPOT
+    elif not form.is_valid() or (
+        form.instance.pk and "content" not in form.changed_data
+    ):
+        return None
+    else:
+        viewer = request.viewer
+        identity = f"user:{viewer.user.pk}" if viewer.is_django_user else viewer.email
+        rejected = spam.check_submission(
+            request, "comment", form.cleaned_data["content"], identity
+        )
+    if not rejected:
+        return None
+    if is_ajax:
+        return HttpResponse(spam.MESSAGES[rejected], status=spam.status_for(rejected))
+    messages.error(request, spam.MESSAGES[rejected])
+    return redirect(reverse("project", kwargs={"id": project_id}))
 
-    is_django_user = request.user.is_authenticated
-    sheet_email = request.session.get("user_email")
-    sheet_name = request.session.get("user_name")
-    session_author = request.session.get("author_name")
-    has_sheet_identity = bool(sheet_email or sheet_name or session_author)
 
-    # locate comment + ownership
-    if is_django_user:
-        comment = get_object_or_404(
-            Comment,
-            pk=comment_id,
-            project=project_obj,
-            user=request.user,
-        )
-    elif has_sheet_identity:
-        identities = {v for v in [sheet_name, session_author, sheet_email] if v}
+def _owned_comment_or_denial(request, project_obj, comment_id, is_ajax, verb):
+    """
+    Return (comment, None) if the viewer may change the comment, or
+    (None, response) with the 403/redirect to send instead.
+
+    - Django users: comments where comment.user == request.user
+    - Sheet/session users: comments whose author_key (hashed email, or name)
+      matches their session
+
+    Ownership is part of the WHERE clause (author_key is indexed).
+    """
+    viewer = request.viewer
+
+    if viewer.is_django_user:
         comment = get_object_or_404(
-            Comment,
+            Comment.objects,
             pk=comment_id,
             project=project_obj,
-            user__isnull=True,
-        )
-
-        is_owner = (comment.author_name and comment.author_name in identities) or (
-            comment.author_email and comment.author_email in identities
+            user=viewer.user,
         )
-
-        if not is_owner:
-            if is_ajax:
-                return HttpResponseForbidden("Not allowed.")
-            messages.error(request, "You cannot edit this comment.")
-            return redirect(reverse("project", kwargs={"id": project_obj.pk}))
+        return comment, None
+
+    if viewer.has_sheet_identity:
+        comments = Comment.objects.filter(pk=comment_id, project=project_obj)
+        comment = viewer.authored_comments(comments).first()
+        if comment is not None:
+            return comment, None
+        if not comments.filter(user__isnull=True).exists():
+            raise Http404("No Comment matches the given query.")
+        if is_ajax:
+            return None, HttpResponseForbidden("Not allowed.")
+        messages.error(request, f"You cannot {verb} this comment.")
     else:
         if is_ajax:
-            return HttpResponseForbidden("Not allowed.")
-        messages.error(request, "You must be signed in to edit comments.")
-        return redirect(reverse("project", kwargs={"id": project_obj.pk}))
+            return None, HttpResponseForbidden("Not allowed.")
+        messages.error(request, f"You must be signed in to {verb} comments.")
+
+    return None, redirect(reverse("project", kwargs={"id": project_obj.pk}))
+
+
+@require_POST
+def comment_update(request, id, comment_id):
+    """
+    Update an existing comment (ownership rules: _owned_comment_or_denial).
+
+    - AJAX: return updated partial; normal POST: redirect back to project
+    """
+    project_obj = get_object_or_404(Project, pk=id)
+    is_ajax = request.headers.get("x-requested-with") == "XMLHttpRequest"
+
+    comment, denial = _owned_comment_or_denial(
+        request, project_obj, comment_id, is_ajax, "edit"
+    )
+    if denial:
+        return denial
 
     form = CommentForm(request.POST, instance=comment)
+    rejection = _spam_rejection(request, project_obj.pk, form, is_ajax)
+    if rejection:
+        return rejection
+
     if form.is_valid():
         form.save()
 
         if is_ajax:
-            comments = project_obj.comments.select_related("user").order_by(
-                "-created_at"
-            )
-            can_comment = is_django_user or has_sheet_identity
-            new_form = CommentForm() if can_comment else None
-
-            return render(
-                request,
-                "partials/project_comments.html",
-                {
-                    "project": project_obj,
-                    "comments": comments,
-                    "form": new_form,
-                },
-            )
+            return _render_comments_partial(request, project_obj)
 
         messages.success(request, "Comment updated.")
     else:
         if is_ajax:
-            comments = project_obj.comments.select_related("user").order_by(
-                "-created_at"
-            )
-            return render(
-                request,
-                "partials/project_comments.html",
-                {
-                    "project": project_obj,
-                    "comments": comments,
-                    "form": form,
-                },
-            )
+            return _render_comments_partial(request, project_obj, form)
         messages.error(request, "Please fix the errors and try again.")
 
     return redirect(reverse("project", kwargs={"id": project_obj.pk}))
@@ -275,92 +417,30 @@ def comment_update(request, id, comment_id):
 @require_POST
 def comment_delete(request, id, comment_id):
     """
-    Delete a comment.
+    Delete a comment (ownership rules: _owned_comment_or_denial).
 
-    - Django users: can delete comments where comment.user == request.user
-    - Sheet/session users: can delete comments where author_name OR author_email matches their session
     - AJAX: return updated partial; normal POST: redirect back to project
     """
     project_obj = get_object_or_404(Project, pk=id)
     is_ajax = request.headers.get("x-requested-with") == "XMLHttpRequest"
 
-    is_django_user = request.user.is_authenticated
-    sheet_email = request.session.get("user_email")
-    sheet_name = request.session.get("user_name")
-    session_author = request.session.get("author_name")
-    has_sheet_identity = bool(sheet_email or sheet_name or session_author)
-
-    if is_django_user:
-        comment = get_object_or_404(
-            Comment,
-            pk=comment_id,
-            project=project_obj,
-            user=request.user,
-        )
-    elif has_sheet_identity:
-        identities = {v for v in [sheet_name, session_author, sheet_email] if v}
-        comment = get_object_or_404(
-            Comment,
-            pk=comment_id,
-            project=project_obj,
-            user__isnull=True,
-        )
-
-        is_owner = (comment.author_name and comment.author_name in identities) or (
-            comment.author_email and comment.author_email in identities
-        )
-
-        if not is_owner:
-            if is_ajax:
-                return HttpResponseForbidden("Not allowed.")
-            messages.error(request, "You cannot delete this comment.")
-            return redirect(reverse("project", kwargs={"id": project_obj.pk}))
-    else:
-        if is_ajax:
-            return HttpResponseForbidden("Not allowed.")
-        messages.error(request, "You must be signed in to delete comments.")
-        return redirect(reverse("project", kwargs={"id": project_obj.pk}))
-
-    comment.delete()
+    comment, denial = _owned_comment_or_denial(
+        request, project_obj, comment_id, is_ajax, "delete"
+    )
+    if denial:
+        return denial
 
-    if not is_ajax:
-        messages.success(request, "Comment deleted.")
+    # soft delete: keep the row, drop it from every public listing
+    comment.state = Comment.State.DELETED
+    comment.save(update_fields=["state", "updated_at"])
 
     if is_ajax:
-        comments = project_obj.comments.select_related("user").order_by("-created_at")
-        can_comment = is_django_user or has_sheet_identity
-        form = CommentForm() if can_comment else None
-
-        return render(
-            request,
-            "partials/project_comments.html",
-            {
-                "project": project_obj,
-                "comments": comments,
-                "form": form,
-            },
-        )
+        return _render_comments_partial(request, project_obj)
 
+    messages.success(request, "Comment deleted.")
     return redirect(reverse("project", kwargs={"id": project_obj.pk}))
 
 
-# --------------------
-# GOOGLE SHEET AUTH HELPERS
-# --------------------
-def get_users_sheet():
-    """
-    Return the Google Sheet worksheet for users.
-    """
-    if getattr(settings, "GOOGLE_CREDS_DICT", None):
-        gc = gspread.service_account_from_dict(settings.GOOGLE_CREDS_DICT)
-    else:
-        gc = gspread.service_account(filename=settings.GOOGLE_SERVICE_ACCOUNT_FILE)
-
-    sh = gc.open_by_key(settings.GOOGLE_SHEET_ID)
-    ws = sh.worksheet("user")
-    return ws
-
-
 @require_POST
 def auth_register(request):
     email = request.POST.get("email", "").strip().lower()
@@ -543,3 +623,67 @@ def auth_logout(request):
 
     messages.success(request, "Signed out.")
     return redirect("home")
+
+
+# --------------------
+# SAMPLING PROFILER (staff only)
+# --------------------
+@require_http_methods(["GET", "POST"])
+def profiler(request):
+    """
+    Control and read the sampling profiler (main.profiling).
+
+    - GET: JSON status and samples per view; ?format=folded[&view=<name>]
+      returns collapsed stacks for flamegraph tools
+    - POST action=start [seconds=30] [percent=100] | stop | clear
+    """
+    if not request.viewer.is_staff:
+        raise Http404
+
+    if request.method == "POST":
+        action = request.POST.get("action")
+        if action == "start":
+            if not getattr(settings, "SAMPLING_PROFILER", False):
+                return JsonResponse(
+                    {"error": "Set SAMPLING_PROFILER to enable profiling."}, status=409
+                )
+            try:
+                seconds = float(request.POST.get("seconds", 30))
+                percent = float(request.POST.get("percent", 100))
+            except ValueError:
+                return JsonResponse(
+                    {"error": "seconds and percent must be numbers."}, status=400
+                )
+            profiling.start_session(max(seconds, 0), min(max(percent, 0), 100))
+        elif action == "stop":
+            profiling.stop_session()
+        elif action == "clear":
+            profiling.clear()
+        else:
+            return JsonResponse({"error": "Unknown action."}, status=400)
+
+    if request.GET.get("format") == "folded":
+        return HttpResponse(
+            profiling.folded(request.GET.get("view")),
+            content_type="text/plain; charset=utf-8",
+        )
+    return JsonResponse(
+        {
+            "enabled": getattr(settings, "SAMPLING_PROFILER", False),
+            "session": profiling.current_session(),
+            "views": profiling.samples_per_view(),
+        }
+    )
+
+
+# --------------------
+# METRICS (staff only)
+# --------------------
+def metrics(request):
+    """
+    JSON counters across workers; for now response compression totals
+    (responses compressed per encoding, bytes in/out/saved, skips).
+    """
+    if not request.viewer.is_staff:
+        raise Http404
+    return JsonResponse({"compression": compression.stats()})
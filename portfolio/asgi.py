@@ -2,6 +2,7 @@
 ASGI config for portfolio project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The Procfile serves the site over WSGI (portfolio/wsgi.py).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
@@ -12,5 +13,9 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "portfolio.settings")
+# Persistent connections are thread-local and every ASGI request gets a fresh
+# thread, so they would only pile up; pool with DB_POOL_MODE=pgbouncer instead.
+# The WSGI web process in the Procfile keeps the "persistent" default.
+os.environ.setdefault("DB_POOL_MODE", "off")
 
 application = get_asgi_application()
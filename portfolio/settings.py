@@ -1,5 +1,6 @@
 import json
 import os
+import sys
 from pathlib import Path
 
 import dj_database_url
@@ -64,10 +65,15 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    "main.middleware.CompressionMiddleware",
+    "main.middleware.SlowQueryMiddleware",
+    "main.middleware.ProfilerMiddleware",
+    "main.middleware.ReplicaRoutingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "main.middleware.ViewerMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -110,6 +116,148 @@ else:
         }
     }
 
+# Optional read replica: reads go to it (main.routers), writes to "default".
+# Works with any two URLs, e.g. two SQLite files locally:
+#   DATABASE_REPLICA_URL=sqlite:///replica.sqlite3
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+TESTING = sys.argv[1:2] == ["test"]
+
+if DATABASE_REPLICA_URL:
+    DATABASES["replica"] = dj_database_url.parse(DATABASE_REPLICA_URL)
+elif TESTING:
+    DATABASES["replica"] = dict(DATABASES["default"])
+
+# Tests always get a "replica" alias mirroring the test "default" database;
+# only the tests that opt in route to it (so the rest need not list it).
+if TESTING:
+    DATABASES["replica"]["TEST"] = {"MIRROR": "default"}
+elif DATABASE_REPLICA_URL:
+    DATABASE_ROUTERS = ["main.routers.PrimaryReplicaRouter"]
+
+# Seconds a browser keeps reading from the primary after it wrote something
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", "10"))
+
+# Connection reuse. DB_POOL_MODE:
+#   "persistent" - each worker thread keeps its connection for DB_CONN_MAX_AGE
+#                  seconds instead of reconnecting (TCP + TLS + auth) on every
+#                  request; health checks replace connections that died idle.
+#                  For WSGI workers.
+#   "pgbouncer"  - point DATABASE_URL at a transaction-mode PgBouncer (e.g. the
+#                  Heroku PgBouncer buildpack), which pools server connections
+#                  for every worker/process; Django's side stays short-lived
+#                  and server-side cursors are disabled as PgBouncer requires.
+#   "off"        - a new connection per request.
+# The Procfile's web process is WSGI, so production runs "persistent".
+# portfolio/asgi.py defaults this to "off": under ASGI each request runs in a
+# new thread, so thread-local persistent connections can't be reused.
+# Compare the modes with `manage.py benchmark_db_connections`.
+DB_POOL_MODE = os.getenv("DB_POOL_MODE", "persistent")
+DB_CONN_MAX_AGE = int(os.getenv("DB_CONN_MAX_AGE", "600"))
+
+if DB_POOL_MODE not in ("persistent", "pgbouncer", "off"):
+    raise ValueError(f"Unknown DB_POOL_MODE: {DB_POOL_MODE!r}")
+
+for _db in DATABASES.values():
+    if DB_POOL_MODE == "persistent":
+        _db["CONN_MAX_AGE"] = DB_CONN_MAX_AGE
+        _db["CONN_HEALTH_CHECKS"] = True
+    else:
+        _db["CONN_MAX_AGE"] = 0
+        if DB_POOL_MODE == "pgbouncer":
+            _db["DISABLE_SERVER_SIDE_CURSORS"] = True
+
+# Slow-query log (main.slow_queries): queries taking at least SLOW_QUERY_MS
+# are logged with their view and aggregated by fingerprint in the cache;
+# review them with `manage.py slow_queries` (needs the shared Redis cache;
+# otherwise read the "main.slow_queries" log). SLOW_QUERY_MS=off disables it.
+_slow_query_ms = os.getenv("SLOW_QUERY_MS", "100")
+SLOW_QUERY_MS = None if _slow_query_ms.lower() == "off" else float(_slow_query_ms)
+# EXPLAIN each new slow query (SQLite/Postgres). Off by default: the EXPLAIN
+# runs inside the request that was already slow.
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "False").lower() == "true"
+
+# Sampling profiler (main.profiling), opt-in: staff start sessions from
+# /_profiler/ and download per-view flamegraph stacks from it.
+SAMPLING_PROFILER = os.getenv("SAMPLING_PROFILER", "False").lower() == "true"
+# Seconds between stack samples of a profiled request
+SAMPLING_PROFILER_INTERVAL = float(os.getenv("SAMPLING_PROFILER_INTERVAL", "0.005"))
+
+# Response compression (main.compression) for dynamic responses; WhiteNoise
+# already serves precompressed static files. Pages with a CSRF form field
+# stay uncompressed (BREACH) unless COMPRESSION_EXCLUDE_CSRF=false, relying
+# on Django's per-response token masking instead; that includes the streamed
+# project page for signed-in visitors. Totals at /_metrics/.
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "True").lower() != "false"
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "500"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+COMPRESSION_EXCLUDE_CSRF = (
+    os.getenv("COMPRESSION_EXCLUDE_CSRF", "True").lower() != "false"
+)
+
+# Send the project page as it renders (main.streaming): the head and
+# above-the-fold content go out before comments are queried.
+PROJECT_PAGE_STREAMING = os.getenv("PROJECT_PAGE_STREAMING", "True").lower() != "false"
+
+# Project snapshots (main.snapshots) carry up to this many comments; busier
+# projects have their comments queried (and streamed) on each view.
+PROJECT_SNAPSHOT_COMMENTS = int(os.getenv("PROJECT_SNAPSHOT_COMMENTS", "100"))
+# Seconds a snapshot is cached for. Changes drop it straight away, but only
+# from the cache of the process that made them; this bounds how long other
+# workers keep a stale one under the local-memory fallback.
+PROJECT_SNAPSHOT_TIMEOUT = int(os.getenv("PROJECT_SNAPSHOT_TIMEOUT", "300"))
+
+# -------------------------------------------------------------------
+# Cache
+# -------------------------------------------------------------------
+# Shared Redis cache when REDIS_URL is set (needed for cached data such as
+# the tag index to stay consistent across gunicorn workers); per-process
+# local memory otherwise.
+REDIS_URL = os.getenv("REDIS_URL")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Whether every process sees the same cache. Reports built from cached
+# aggregates (e.g. `manage.py slow_queries`) refuse to run without it.
+CACHE_IS_SHARED = bool(REDIS_URL)
+
+# Seconds the tag index is cached for. Signals drop it on every change, but
+# with the local-memory fallback only in the worker that made the change,
+# so this bounds how long other workers can serve a stale copy.
+TAG_INDEX_TIMEOUT = int(os.getenv("TAG_INDEX_TIMEOUT", "300"))
+
+# -------------------------------------------------------------------
+# Sessions
+# -------------------------------------------------------------------
+# SESSION_BACKEND picks the engine:
+#   "db"             - a session-table read on every request that touches it
+#   "cached_db"      - reads served from the cache, writes go through to the
+#                      DB (default when the shared Redis cache is configured)
+#   "signed_cookies" - nothing stored server-side; fits the small sheet-auth
+#                      session (user_email/user_name) but is visible to the
+#                      client and cannot be revoked server-side
+# Compare them with `manage.py benchmark_sessions`; schedule
+# `manage.py clear_expired_sessions` for the DB-backed engines.
+SESSION_ENGINES = {
+    "db": "django.contrib.sessions.backends.db",
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+}
+SESSION_ENGINE = SESSION_ENGINES[
+    os.getenv("SESSION_BACKEND", "cached_db" if REDIS_URL else "db")
+]
+
 # -------------------------------------------------------------------
 # Password validation
 # -------------------------------------------------------------------
@@ -145,10 +293,23 @@ STATICFILES_DIRS = [
     BASE_DIR / "main" / "static",
 ]
 
+# collectstatic writes .gz and (with the Brotli package installed) .br next to
+# each compressible file; WhiteNoise picks the variant from Accept-Encoding.
+# Hashed manifest names are served with a far-future "immutable"
+# Cache-Control; everything else gets WHITENOISE_MAX_AGE.
+# `manage.py static_size_report` lists per-asset compressed sizes.
+# Outside DEBUG, collectstatic also builds the minified per-page bundles in
+# main/assets.py, which templates include with {% bundle %}.
 if DEBUG:
     STATICFILES_STORAGE = "whitenoise.storage.CompressedStaticFilesStorage"
 else:
-    STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
+    STATICFILES_STORAGE = "main.storage.BundledManifestStaticFilesStorage"
+
+ASSET_BUNDLES = not DEBUG
+# Inline per-page above-the-fold CSS and load full stylesheets non-blocking
+ASSET_CRITICAL_CSS = True
+
+WHITENOISE_MAX_AGE = 0 if DEBUG else 3600
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
@@ -158,10 +319,50 @@ MEDIA_ROOT = BASE_DIR / "media"
 # -------------------------------------------------------------------
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# -------------------------------------------------------------------
+# Email + contact form delivery
+# -------------------------------------------------------------------
+# Contact messages are stored by the view and sent by the Procfile `worker`
+# (`manage.py deliver_contact_messages`). Without EMAIL_HOST mail is printed
+# to the console.
+EMAIL_HOST = os.getenv("EMAIL_HOST", "")
+EMAIL_BACKEND = (
+    "django.core.mail.backends.smtp.EmailBackend"
+    if EMAIL_HOST
+    else "django.core.mail.backends.console.EmailBackend"
+)
+EMAIL_PORT = int(os.getenv("EMAIL_PORT", "587"))
+EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER", "")
+EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD", "")
+EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS", "True").lower() in ("1", "true", "yes")
+DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", "webmaster@localhost")
+
+# Comma-separated addresses that receive contact messages
+CONTACT_RECIPIENTS = [
+    a.strip() for a in os.getenv("CONTACT_RECIPIENTS", "").split(",") if a.strip()
+]
+# Per sender: at most CONTACT_SENDER_LIMIT deliveries per window (seconds)
+CONTACT_SENDER_LIMIT = int(os.getenv("CONTACT_SENDER_LIMIT", "3"))
+CONTACT_SENDER_WINDOW = int(os.getenv("CONTACT_SENDER_WINDOW", "3600"))
+# Identical messages from one sender within this many seconds are dropped
+CONTACT_DEDUP_WINDOW = int(os.getenv("CONTACT_DEDUP_WINDOW", "3600"))
+
+# -------------------------------------------------------------------
+# Spam pre-filter (main.spam) for comments and the contact form
+# -------------------------------------------------------------------
+SPAM_MAX_LINKS = int(os.getenv("SPAM_MAX_LINKS", "2"))
+# Submissions allowed per identity (viewer, else IP) per window (seconds)
+SPAM_RATE_LIMIT = int(os.getenv("SPAM_RATE_LIMIT", "5"))
+SPAM_RATE_WINDOW = int(os.getenv("SPAM_RATE_WINDOW", "60"))
+# Seconds an identical text is refused after first being accepted
+SPAM_DUPLICATE_WINDOW = int(os.getenv("SPAM_DUPLICATE_WINDOW", "3600"))
+
 # -------------------------------------------------------------------
 # Google Sheet config
 # -------------------------------------------------------------------
 GOOGLE_SHEET_ID = os.getenv("GOOGLE_SHEET_ID", "")
+# Function returning the sheet-auth users worksheet (see main/sheets.py)
+USER_SHEET_BACKEND = os.getenv("USER_SHEET_BACKEND", "main.sheets.google_users_sheet")
 
 # -------------------------------------------------------------------
 # Logging (console-friendly even with DEBUG=False)